@@ -1,42 +1,82 @@
 from dotenv import load_dotenv
+
+# Load environment variables before modules that read them at import time
+load_dotenv()
+
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import APIKeyHeader
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from datetime import datetime
 import os
 from .routes.deployments import router as deployment_router  # Updated import path
+from .routes.deployments import stream_router as deployment_stream_router
+from .security import API_KEY_NAME, is_valid_api_key, verify_api_key
+from .rate_limit import create_rate_limiter
 from src import db
+from src.job_queue import DeploymentJobQueue
+from src.clients.registry import client_registry
+from src.services.repository_service import repository_provisioner
+from src.services.docker_gc_service import docker_gc
+from src.services.reconciler_service import cloud_run_reconciler
+from src.services.deployment_cache import deployment_cache
+from src.container_manager import current_node_image_tags
+from src.utils.metrics import HTTP_REQUEST_DURATION, RATE_LIMIT_REJECTIONS
+from src.utils.tracing import correlation, tracer
 import time
+import uuid
 import logging
 from typing import Callable
-import secrets
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db.startup()
+
+    # Deployments run on a worker pool so they never block the event loop
+    on_submit = None
+    if repository_provisioner.preprovision:
+        repository_provisioner.warm_up(client_registry.gcp_client)
+        on_submit = lambda client_id: repository_provisioner.prefetch(client_registry.gcp_client, client_id)
+    # A finished deploy (or a failed one that left a service behind) is reconciled right away
+    on_finish = lambda job_id, status: cloud_run_reconciler.nudge()
+    app.state.job_queue = DeploymentJobQueue(on_submit=on_submit, on_finish=on_finish)
+    app.state.job_queue.start()
+
+    # Disk is reclaimed in the background instead of pruning before every build
+    for image_tag in current_node_image_tags():
+        docker_gc.pin(image_tag)
+    docker_gc.start()
+
+    # Deployment status comes from periodic list_services sweeps, not per-request lookups
+    cloud_run_reconciler.start()
+    yield
+    cloud_run_reconciler.stop()
+    docker_gc.stop()
+    deployment_cache.shutdown()
+    app.state.job_queue.shutdown()
+    repository_provisioner.shutdown()
+    client_registry.close()
+    await db.shutdown()
+    tracer.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Secure Deployment API",
     description="API for secure container deployments",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Security configurations
-API_KEY_NAME = "X-API-Key"
-api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
-API_KEY = os.getenv("API_KEY")
-if not API_KEY:
-    API_KEY = secrets.token_urlsafe(32)
-    logger.warning(f"API_KEY not found in environment variables. Generated new key: {API_KEY}")
-
-# Rate limiting configuration
+# Rate limiting configuration (defaults; see RATE_LIMIT_* in api/rate_limit.py)
 RATE_LIMIT_SECONDS = 60
 MAX_REQUESTS = 100
-request_history = {}
+rate_limiter = create_rate_limiter(MAX_REQUESTS, RATE_LIMIT_SECONDS)
 
 # Add CORS middleware with development settings
 app.add_middleware(
@@ -47,52 +87,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def check_rate_limit(client_ip: str) -> bool:
-    current_time = time.time()
-    
-    # Clean up old entries
-    request_history[client_ip] = [
-        timestamp for timestamp in request_history.get(client_ip, [])
-        if current_time - timestamp < RATE_LIMIT_SECONDS
-    ]
-    
-    # Check rate limit
-    if len(request_history.get(client_ip, [])) >= MAX_REQUESTS:
-        return False
-    
-    # Add new request timestamp
-    request_history.setdefault(client_ip, []).append(current_time)
-    return True
-
-async def verify_api_key(api_key: str = Depends(api_key_header)):
-    if api_key != API_KEY:
-        logger.warning(f"Invalid API key attempt")
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid API key"
-        )
-    return api_key
+def check_rate_limit(client_ip: str, api_key: str = None):
+    # Only recognised keys get their own bucket; rotating made-up keys must not bypass the IP limit
+    if api_key and not (is_valid_api_key(api_key) or api_key in rate_limiter.key_limits):
+        api_key = None
+    key = rate_limiter.client_key(client_ip, api_key)
+    result = rate_limiter.check(key, rate_limiter.limit_for(api_key))
+    if not result.allowed:
+        RATE_LIMIT_REJECTIONS.labels(bucket="key" if api_key else "ip").inc()
+    return result
+
+def _route_label(request: Request):
+    # Route templates keep label cardinality bounded (no service names or job ids)
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
 
 @app.middleware("http")
 async def security_middleware(request: Request, call_next: Callable):
+    # Tag this request's logs and spans (and any job it queues) with a request id
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with correlation(request_id), tracer.span("http.request", method=request.method, path=request.url.path) as span:
+        response = await _handle_request(request, call_next)
+        span.set_attribute("route", _route_label(request))
+        span.set_attribute("status", response.status_code)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+async def _handle_request(request: Request, call_next: Callable):
     start_time = time.time()
     client_ip = request.client.host
     
     try:
-        # Rate limiting check
-        if not check_rate_limit(client_ip):
-            raise HTTPException(
+        # Rate limiting check; the SQLite and Redis backends block, so only they run off the event loop
+        api_key = request.headers.get(API_KEY_NAME)
+        if rate_limiter.blocking:
+            rate_limit = await run_in_threadpool(check_rate_limit, client_ip, api_key)
+        else:
+            rate_limit = check_rate_limit(client_ip, api_key)
+        if not rate_limit.allowed:
+            logger.warning(f"Rate limit exceeded for {client_ip}")
+            return JSONResponse(
                 status_code=429,
-                detail="Too many requests. Please try again later."
+                content={"detail": "Too many requests. Please try again later."},
+                headers=rate_limit.headers(),
             )
         
         # Add security headers
         response = await call_next(request)
+        response.headers.update(rate_limit.headers())
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["X-XSS-Protection"] = "1; mode=block"
         
         # Log request details
         process_time = time.time() - start_time
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method, route=_route_label(request), status=str(response.status_code)
+        ).observe(process_time)
         logger.info(
             f"Method: {request.method} Path: {request.url.path} "
             f"Client: {client_ip} Status: {response.status_code} "
@@ -105,6 +155,10 @@ async def security_middleware(request: Request, call_next: Callable):
         logger.error(f"Error processing request from {client_ip}: {str(e)}")
         raise
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_api_key)])
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health():
     return {
@@ -121,6 +175,13 @@ app.include_router(
     dependencies=[Depends(verify_api_key)]
 )
 
+# Event streams authenticate inside the handler (WebSockets cannot use APIKeyHeader)
+app.include_router(
+    deployment_stream_router,
+    prefix="/deployments",
+    tags=["deployments"]
+)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,223 @@
+"""
+Sliding-window rate limiting with pluggable counter backends.
+
+Each key keeps two counters: the current fixed window and the previous one.
+The request rate is estimated as previous * (1 - elapsed / window) + current,
+which gives sliding-window accuracy in O(1) time and memory per key.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimitResult:
+    def __init__(self, allowed, limit, remaining, reset_after, retry_after=None):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_after = reset_after
+        self.retry_after = retry_after
+
+    def headers(self):
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset_after),
+        }
+        if self.retry_after is not None:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+class MemoryBackend:
+    """Per-process counters with LRU eviction; idle keys expire after two windows"""
+
+    blocking = False
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()  # key -> [window_id, current, previous]
+        self._lock = threading.Lock()
+
+    def incr(self, key, window_id, window):
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [window_id, 0, 0]
+            else:
+                self._counters.move_to_end(key)
+            _roll(counter, window_id)
+            counter[1] += 1
+            current, previous = counter[1], counter[2]
+
+            # Least recently used keys sit at the front
+            while self._counters:
+                oldest_key, oldest = next(iter(self._counters.items()))
+                if len(self._counters) <= self.max_keys and oldest[0] >= window_id - 1:
+                    break
+                del self._counters[oldest_key]
+            return current, previous
+
+    def __len__(self):
+        return len(self._counters)
+
+
+class SQLiteBackend:
+    """Counters in a SQLite file, shared by every worker process on the host"""
+
+    _UPSERT = """
+        INSERT INTO rate_limits (key, window_id, current, previous) VALUES (?, ?, 1, 0)
+        ON CONFLICT(key) DO UPDATE SET
+            previous = CASE
+                WHEN window_id = excluded.window_id THEN previous
+                WHEN window_id = excluded.window_id - 1 THEN current
+                ELSE 0 END,
+            current = CASE WHEN window_id = excluded.window_id THEN current + 1 ELSE 1 END,
+            window_id = excluded.window_id
+        RETURNING current, previous
+    """
+
+    blocking = True
+
+    def __init__(self, path, cleanup_every=1000):
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._calls = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits "
+                "(key TEXT PRIMARY KEY, window_id INTEGER, current INTEGER, previous INTEGER)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key, window_id, window):
+        conn = self._connection()
+        current, previous = conn.execute(self._UPSERT, (key, window_id)).fetchone()
+
+        self._calls += 1
+        if self._calls % self.cleanup_every == 0:
+            conn.execute("DELETE FROM rate_limits WHERE window_id < ?", (window_id - 1,))
+        return current, previous
+
+
+class RedisBackend:
+    """Counters in Redis (or any server speaking the same commands), shared across hosts"""
+
+    blocking = True
+
+    def __init__(self, client, prefix="ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("RATE_LIMIT_BACKEND=redis requires the redis package")
+        return cls(redis.Redis.from_url(url))
+
+    def incr(self, key, window_id, window):
+        current_key = f"{self.prefix}:{key}:{window_id}"
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(window * 2))
+        pipe.get(f"{self.prefix}:{key}:{window_id - 1}")
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+
+def _roll(counter, window_id):
+    if counter[0] == window_id:
+        return
+    counter[2] = counter[1] if counter[0] == window_id - 1 else 0
+    counter[1] = 0
+    counter[0] = window_id
+
+
+class RateLimiter:
+    def __init__(self, backend, limit, window, key_limits=None, clock=time.time):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        # Limit overrides keyed by API key
+        self.key_limits = key_limits or {}
+        self.clock = clock
+
+    @property
+    def blocking(self):
+        """Whether check() does I/O and should run off the event loop"""
+        return self.backend.blocking
+
+    def client_key(self, client_ip, api_key=None):
+        """Bucket per API key when one is sent, otherwise per IP; raw keys are never stored"""
+        if api_key:
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+        return f"ip:{client_ip}"
+
+    def limit_for(self, api_key=None):
+        return self.key_limits.get(api_key, self.limit) if api_key else self.limit
+
+    def check(self, key, limit=None):
+        limit = limit or self.limit
+        now = self.clock()
+        window_id = int(now // self.window)
+        elapsed = now - window_id * self.window
+
+        current, previous = self.backend.incr(key, window_id, self.window)
+        weight = 1 - elapsed / self.window
+        estimated = previous * weight + current
+
+        reset_after = math.ceil(self.window - elapsed)
+        if estimated <= limit:
+            return RateLimitResult(True, limit, max(int(limit - estimated), 0), reset_after)
+
+        if current > limit or previous == 0:
+            # The current window alone is over the limit
+            retry_after = reset_after
+        else:
+            # Wait until the previous window's weight has decayed enough
+            retry_after = math.ceil(self.window * (1 - (limit - current) / previous) - elapsed)
+        return RateLimitResult(False, limit, 0, reset_after, max(retry_after, 1))
+
+
+def _parse_key_limits(value):
+    key_limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, limit = item.rpartition(":")
+        key_limits[key] = int(limit)
+    return key_limits
+
+
+def create_rate_limiter(limit, window):
+    """Build the limiter configured by RATE_LIMIT_* environment variables"""
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if backend_name == "memory":
+        backend = MemoryBackend(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000")))
+    elif backend_name == "sqlite":
+        backend = SQLiteBackend(os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/docker-factory-ratelimit.db"))
+    elif backend_name == "redis":
+        backend = RedisBackend.from_url(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend_name}")
+
+    return RateLimiter(
+        backend,
+        limit=int(os.getenv("RATE_LIMIT_MAX_REQUESTS", str(limit))),
+        window=float(os.getenv("RATE_LIMIT_SECONDS", str(window))),
+        key_limits=_parse_key_limits(os.getenv("RATE_LIMIT_API_KEYS", "")),
+    )
@@ -1,15 +1,36 @@
-from fastapi import APIRouter, HTTPException, Query
-from src.container_manager import SecureGCPContainerManager
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from src.services.deployment_cache import MEMORY, deployment_cache
+from src.job_queue import QueueFullError, job_to_dict
+from src.job_events import job_events
+from src.profiles import PROFILES, get_profile
+from src import db
+from ..schemas.deployments import DeploymentJobStatus, DeploymentJobList, DeploymentList
+from ..security import API_KEY_NAME, is_valid_api_key, verify_api_key
+import json
 import logging
 import re
-from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 router = APIRouter()
+# Event streams: the WebSocket route cannot use the APIKeyHeader dependency
+stream_router = APIRouter()
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_SECONDS = 15
+
+
+def _validate_profile(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in PROFILES:
+        raise ValueError(f"profile must be one of: {', '.join(PROFILES)}")
+    return value
+
 
 class DeploymentRequest(BaseModel):
     client_id: str = Field(..., description="Client identifier")
+    profile: Optional[str] = Field(default=None, description="Performance profile; defaults to DEFAULT_NODE_PROFILE")
 
     @field_validator("client_id")
     def validate_client_id(cls, value: str) -> str:
@@ -19,23 +40,190 @@ class DeploymentRequest(BaseModel):
             raise ValueError("client_id must contain only lowercase letters, numbers, hyphens, and underscores")
         return value.lower()
 
+    @field_validator("profile")
+    def validate_profile(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_profile(value)
+
+
+class BatchDeploymentRequest(BaseModel):
+    nodes: List[DeploymentRequest] = Field(..., min_length=1, max_length=100, description="One entry per node")
+    max_parallel: Optional[int] = Field(default=None, ge=1, le=32, description="Concurrent service creations")
+    profile: Optional[str] = Field(default=None, description="Performance profile shared by every node")
 
-@router.post("/")
-async def create_deployment(request: DeploymentRequest):
+    @field_validator("profile")
+    def validate_profile(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_profile(value)
+
+    @model_validator(mode="after")
+    def nodes_share_profile(self):
+        # Every node in a batch runs the same image, and the profile is rendered into it
+        profiles = {node.profile for node in self.nodes if node.profile} | ({self.profile} if self.profile else set())
+        if len(profiles) > 1:
+            raise ValueError("All nodes in a batch must use the same profile")
+        if profiles:
+            self.profile = profiles.pop()
+        return self
+
+
+@router.post("/", status_code=202, response_model=DeploymentJobStatus)
+def create_deployment(request: DeploymentRequest, http_request: Request):
     try:
-        manager = SecureGCPContainerManager(request.client_id)
-        return manager.deploy()
+        job = http_request.app.state.job_queue.submit(request.client_id, profile=request.profile)
+        return job_to_dict(job)
+    except QueueFullError as e:
+        logger.warning(f"Deployment rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Deployment failed: {str(e)}")
+        logger.error(f"Failed to queue deployment: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/", response_model=DeploymentList)
+async def list_deployments(
+    client_id: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    try:
+        rows, next_cursor = await db.list_deployments_page_async(
+            client_id=client_id.lower() if client_id else None, status=status, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    deployments = [
+        {
+            "service_name": row.service_name,
+            "client_id": row.client_id,
+            "status": row.status,
+            "rpc_endpoint": row.rpc_endpoint,
+            "ws_endpoint": row.ws_endpoint,
+            "last_updated": row.created_at,
+        }
+        for row in rows
+    ]
+    return {"deployments": deployments, "page_size": limit, "next_cursor": next_cursor}
+
+
+@router.post("/batch", status_code=202, response_model=DeploymentJobStatus)
+def create_batch_deployment(request: BatchDeploymentRequest, http_request: Request):
+    try:
+        job = http_request.app.state.job_queue.submit_batch(
+            [node.client_id for node in request.nodes], profile=request.profile, max_parallel=request.max_parallel
+        )
+        return job_to_dict(job)
+    except QueueFullError as e:
+        logger.warning(f"Batch deployment rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to queue batch deployment: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profiles")
+def list_profiles():
+    """Performance profiles accepted by the profile field of deploy requests"""
+    return {"default": get_profile().name, "profiles": [profile.to_dict() for profile in PROFILES.values()]}
+
+
+@router.get("/jobs", response_model=DeploymentJobList)
+async def list_deployment_jobs(
+    client_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    jobs = await db.list_jobs_async(client_id=client_id, status=status, limit=limit)
+    return {"jobs": [job_to_dict(job) for job in jobs], "total": len(jobs)}
+
+
+@router.get("/jobs/{job_id}", response_model=DeploymentJobStatus)
+async def get_deployment_job(job_id: str):
+    job = await db.get_job_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Deployment job {job_id} not found")
+    return job_to_dict(job)
+
+
 @router.get("/{service_name}")
-async def get_deployment(service_name: str):
+async def get_deployment(service_name: str, response: Response):
     try:
-        manager = SecureGCPContainerManager("system")
-        service_info = manager.cloud_run_service.get_service_info(service_name=service_name, region="us-central1")
+        service_info, source, age = await deployment_cache.get_async(service_name)
+        response.headers["X-Cache"] = "HIT" if source == MEMORY else "MISS"
+        response.headers["X-Cache-Source"] = source
+        response.headers["Age"] = str(int(age))
         return service_info
     except Exception as e:
         logger.error(f"Failed to get deployment: {str(e)}")
         raise HTTPException(status_code=404, detail=str(e))
+
+
+async def _job_event_stream(job, last_id=0):
+    """Snapshot of the job, then its buffered and live events; None marks a heartbeat"""
+    yield {"type": "snapshot", "data": jsonable_encoder(job_to_dict(job))}
+
+    log = job_events.get(job.id)
+    if log is None:
+        # Finished before this process started; the snapshot is all there is
+        return
+
+    while True:
+        closed = log.closed
+        events, dropped = log.since(last_id)
+        if dropped:
+            yield {"type": "dropped", "data": {"count": dropped}}
+        for event in events:
+            last_id = event["id"]
+            yield event
+        if closed:
+            return
+        if not events:
+            await log.wait(last_id, HEARTBEAT_SECONDS)
+            if not log.closed and not log.since(last_id)[0]:
+                yield None
+
+
+@stream_router.get("/jobs/{job_id}/events", dependencies=[Depends(verify_api_key)])
+async def stream_deployment_job(job_id: str, last_event_id: Optional[str] = Header(None)):
+    job = await db.get_job_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Deployment job {job_id} not found")
+
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def sse():
+        async for event in _job_event_stream(job, resume_from):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            if "id" in event:
+                yield f"id: {event['id']}\n"
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@stream_router.websocket("/jobs/{job_id}/ws")
+async def stream_deployment_job_ws(websocket: WebSocket, job_id: str):
+    # Browsers cannot set headers on WebSocket requests, so the key may also come as ?api_key=
+    api_key = websocket.headers.get(API_KEY_NAME) or websocket.query_params.get("api_key")
+    if not is_valid_api_key(api_key):
+        logger.warning(f"Invalid API key attempt")
+        await websocket.close(code=1008)
+        return
+
+    job = await db.get_job_async(job_id)
+    if not job:
+        await websocket.close(code=1008, reason=f"Deployment job {job_id} not found")
+        return
+
+    await websocket.accept()
+    try:
+        async for event in _job_event_stream(job):
+            if event is not None:
+                await websocket.send_text(json.dumps(event, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
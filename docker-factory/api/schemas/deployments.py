@@ -21,12 +21,42 @@ class DeploymentResponse(BaseModel):
 
 class DeploymentStatus(BaseModel):
     service_name: str
+    client_id: str
     status: str
+    rpc_endpoint: str
+    ws_endpoint: str
     last_updated: datetime
 
 
 class DeploymentList(BaseModel):
     deployments: List[DeploymentStatus]
-    total: int
-    page: int
     page_size: int
+    next_cursor: Optional[str] = None
+
+
+class StageTiming(BaseModel):
+    name: str
+    status: str
+    started_at: str
+    duration: Optional[float] = None
+
+
+class DeploymentJobStatus(BaseModel):
+    job_id: str
+    # Empty for batch jobs, whose nodes are listed in batch
+    client_id: Optional[str] = None
+    profile: Optional[str] = None
+    batch: Optional[Dict] = None
+    status: str
+    stage: Optional[str] = None
+    stages: List[StageTiming] = []
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class DeploymentJobList(BaseModel):
+    jobs: List[DeploymentJobStatus]
+    total: int
@@ -0,0 +1,30 @@
+import logging
+import os
+import secrets
+
+from fastapi import Depends, HTTPException
+from fastapi.security import APIKeyHeader
+
+logger = logging.getLogger(__name__)
+
+# Security configurations
+API_KEY_NAME = "X-API-Key"
+api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
+API_KEY = os.getenv("API_KEY")
+if not API_KEY:
+    API_KEY = secrets.token_urlsafe(32)
+    logger.warning(f"API_KEY not found in environment variables. Generated new key: {API_KEY}")
+
+
+def is_valid_api_key(api_key):
+    return bool(api_key) and secrets.compare_digest(api_key, API_KEY)
+
+
+async def verify_api_key(api_key: str = Depends(api_key_header)):
+    if not is_valid_api_key(api_key):
+        logger.warning(f"Invalid API key attempt")
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid API key"
+        )
+    return api_key
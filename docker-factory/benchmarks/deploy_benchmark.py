@@ -0,0 +1,197 @@
+"""
+Hermetic benchmark of SecureGCPContainerManager.deploy().
+
+Runs the real pipeline (templates, stage graph, image cache, repository
+provisioning, Cloud Run request building, DB writes) against the fakes in
+benchmarks/fakes.py and a throwaway SQLite database, at increasing
+concurrency. Reports per-stage latency, deploys per minute and p50/p95/p99
+deploy latency, and writes them as JSON.
+
+    python -m benchmarks.deploy_benchmark --output bench.json
+    python -m benchmarks.deploy_benchmark --baseline bench.json --tolerance 0.2
+
+With --baseline, exits 1 if any concurrency level's p95 latency or
+throughput regressed by more than the tolerance.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .fakes import FakeClients, Latencies
+
+DEFAULT_LEVELS = "1,2,4,8,16,32,64"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "mean": round(sum(values) / len(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def run_level(concurrency, deploys, latencies, scenario):
+    """Run `deploys` deployments, `concurrency` at a time; returns the level's report"""
+    from src.container_manager import SecureGCPContainerManager
+
+    clients = FakeClients(latencies)
+    run_id = uuid.uuid4().hex[:8]
+    stage_durations = defaultdict(list)
+
+    def client_id(index):
+        # cold: every deploy targets a new repository, so it pushes; warm: one shared, already pushed image
+        return f"bench-{run_id}-{index}" if scenario == "cold" else f"bench-{run_id}"
+
+    def on_stage(stage, event, elapsed):
+        if event == "completed":
+            stage_durations[stage].append(elapsed)
+
+    def deploy(index):
+        started = time.monotonic()
+        SecureGCPContainerManager(client_id(index), on_stage=on_stage, clients=clients).deploy()
+        return time.monotonic() - started
+
+    if scenario == "warm":
+        SecureGCPContainerManager(client_id(0), clients=clients).deploy()
+        stage_durations.clear()
+
+    latencies_seen, errors = [], 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(deploy, index) for index in range(deploys)]
+        for future in futures:
+            try:
+                latencies_seen.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"deploy failed: {e}", file=sys.stderr)
+    wall = time.monotonic() - started
+
+    return {
+        "concurrency": concurrency,
+        "deploys": deploys,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "deploys_per_minute": round(len(latencies_seen) / wall * 60, 2) if wall else None,
+        "latency": summarize(latencies_seen),
+        "stages": {stage: summarize(values) for stage, values in sorted(stage_durations.items())},
+        "docker_builds": clients.docker_client.builds,
+        "docker_pushes": clients.docker_client.pushes,
+    }
+
+
+def run_benchmark(levels, deploys_per_level, latencies, scenario="cold"):
+    from src import db
+
+    db.Base.metadata.drop_all(bind=db.engine)
+    db.init_db()
+
+    results = []
+    for concurrency in levels:
+        deploys = deploys_per_level or max(2 * concurrency, 8)
+        result = run_level(concurrency, deploys, latencies, scenario)
+        latency = result["latency"] or {}
+        print(
+            f"concurrency={concurrency:>3} deploys={deploys:>4} errors={result['errors']} "
+            f"deploys/min={result['deploys_per_minute']} p50={latency.get('p50')} "
+            f"p95={latency.get('p95')} p99={latency.get('p99')}",
+            file=sys.stderr,
+        )
+        results.append(result)
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "scenario": scenario,
+        "latencies": latencies.to_dict(),
+        "levels": results,
+    }
+
+
+def find_regressions(report, baseline, tolerance):
+    """Levels whose p95 latency rose, or throughput fell, by more than tolerance"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in report["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before or not before["latency"] or not level["latency"]:
+            continue
+        if level["latency"]["p95"] > before["latency"]["p95"] * (1 + tolerance):
+            regressions.append(
+                f"concurrency {level['concurrency']}: p95 {before['latency']['p95']}s -> {level['latency']['p95']}s"
+            )
+        if level["deploys_per_minute"] < before["deploys_per_minute"] * (1 - tolerance):
+            regressions.append(
+                f"concurrency {level['concurrency']}: deploys/min "
+                f"{before['deploys_per_minute']} -> {level['deploys_per_minute']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="comma-separated concurrency levels")
+    parser.add_argument("--deploys", type=int, default=0, help="deploys per level (default: 2x concurrency, min 8)")
+    parser.add_argument("--scenario", choices=["cold", "warm"], default="cold", help="image not yet pushed, or cached")
+    parser.add_argument("--build-latency", type=float, default=2.0)
+    parser.add_argument("--push-latency", type=float, default=1.0)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--repository-latency", type=float, default=1.0, help="repository create LRO")
+    parser.add_argument("--lro-latency", type=float, default=5.0, help="Cloud Run service create LRO")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio")
+    args = parser.parse_args(argv)
+
+    # SQLite in place of Postgres; must be set before src.db is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    logging.disable(logging.INFO)
+
+    latencies = Latencies(
+        build=args.build_latency,
+        push=args.push_latency,
+        api=args.api_latency,
+        repository_create=args.repository_latency,
+        service_create=args.lro_latency,
+    )
+    levels = [int(level) for level in args.levels.split(",") if level]
+    report = run_benchmark(levels, args.deploys, latencies, args.scenario)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+In-process stand-ins for the Docker daemon and the Cloud Run / Artifact Registry
+APIs, with configurable latencies, for benchmarking the deploy pipeline
+without touching real infrastructure.
+"""
+
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+
+import google.api_core.exceptions
+from google.cloud import run_v2
+
+
+class Latencies:
+    """Simulated durations in seconds"""
+
+    def __init__(self, build=2.0, push=1.0, api=0.05, repository_create=1.0, service_create=5.0):
+        self.build = build
+        self.push = push
+        self.api = api
+        self.repository_create = repository_create
+        self.service_create = service_create
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class FakeOperation:
+    """Long-running operation whose result() blocks for a fixed time"""
+
+    def __init__(self, result, latency):
+        self._result = result
+        self._latency = latency
+
+    def result(self):
+        time.sleep(self._latency)
+        return self._result
+
+
+class FakeDockerClient:
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self._lock = threading.Lock()
+        self._images = set()
+        self.builds = 0
+        self.pushes = 0
+
+    def build_image(self, tag, path=None, fileobj=None, on_progress=None):
+        time.sleep(self.latencies.build)
+        if on_progress:
+            on_progress(f"Successfully tagged {tag}")
+        with self._lock:
+            self._images.add(tag)
+            self.builds += 1
+
+    def push_image(self, tag, on_progress=None):
+        time.sleep(self.latencies.push)
+        with self._lock:
+            self.pushes += 1
+        return "sha256:" + hashlib.sha256(tag.encode()).hexdigest()
+
+    def image_exists(self, tag):
+        with self._lock:
+            return tag in self._images
+
+    def tag_image(self, source, target):
+        with self._lock:
+            self._images.add(target)
+
+    def login_registry(self, registry, username, password):
+        pass
+
+    def disk_usage(self):
+        return {"LayersSize": 0, "Images": [], "BuildCache": [], "Containers": []}
+
+    def close(self):
+        pass
+
+
+class FakeArtifactClient:
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self._lock = threading.Lock()
+        self._repositories = set()
+
+    def get_repository(self, request):
+        time.sleep(self.latencies.api)
+        with self._lock:
+            if request.name not in self._repositories:
+                raise google.api_core.exceptions.NotFound(request.name)
+
+    def create_repository(self, request):
+        with self._lock:
+            self._repositories.add(f"{request.parent}/repositories/{request.repository_id}")
+        return FakeOperation(None, self.latencies.repository_create)
+
+
+class FakeCloudRunClient:
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self._lock = threading.Lock()
+        self.services = {}
+
+    def create_service(self, request):
+        time.sleep(self.latencies.api)
+        service = SimpleNamespace(
+            name=f"{request.parent}/services/{request.service_id}",
+            uri=f"https://{request.service_id}-abc123-uc.a.run.app",
+            latest_ready_revision=f"{request.service_id}-00001-abc",
+            reconciling=False,
+            terminal_condition=SimpleNamespace(state=run_v2.Condition.State.CONDITION_SUCCEEDED),
+        )
+        with self._lock:
+            self.services[request.service_id] = service
+        return FakeOperation(service, self.latencies.service_create)
+
+    def set_iam_policy(self, request):
+        time.sleep(self.latencies.api)
+
+    def get_service(self, request):
+        time.sleep(self.latencies.api)
+        with self._lock:
+            return self.services[request.name.rsplit("/", 1)[-1]]
+
+
+class FakeClients:
+    """Drop-in for the client registry passed to SecureGCPContainerManager(clients=...)"""
+
+    def __init__(self, latencies=None):
+        latencies = latencies or Latencies()
+        self.docker_client = FakeDockerClient(latencies)
+        self.gcp_client = SimpleNamespace(
+            project_id="benchmark-project",
+            cloud_run_client=FakeCloudRunClient(latencies),
+            artifact_client=FakeArtifactClient(latencies),
+            token_provider=SimpleNamespace(get_token=lambda: "fake-token"),
+        )
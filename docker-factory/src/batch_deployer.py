@@ -0,0 +1,133 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .container_manager import SecureGCPContainerManager
+from .db import save_deployments
+from .profiles import get_profile
+from .services.deployment_cache import deployment_cache
+from .services.repository_service import repository_provisioner
+from .utils.tracing import run_in_context, tracer
+
+logger = logging.getLogger(__name__)
+
+MAX_PARALLELISM = 32
+
+
+class BatchDeployer:
+    """Deploys many nodes from a single image.
+
+    The node image is resolved once per repository (built and pushed only on
+    a cache miss): once in total with ARTIFACT_REPOSITORY_MODE=shared, once per
+    client otherwise, with at most `max_parallel` repositories at a time.
+    Cloud Run services are then created
+    concurrently, at most `max_parallel` at a time, and the successful
+    deployments are inserted in one transaction. A node that fails, or whose
+    repository's image could not be resolved, does not fail the batch; its
+    error is reported in its result.
+
+    on_stage(stage, event, elapsed) reports the "image" and "services" stages,
+    and on_progress("node", result) each node as it finishes, the same way
+    deployment jobs report a single deploy.
+    """
+
+    def __init__(self, manager_factory=None, max_parallel=None, on_stage=None, on_progress=None):
+        self.manager_factory = manager_factory or SecureGCPContainerManager
+        if max_parallel is None:
+            max_parallel = int(os.getenv("BATCH_DEPLOY_PARALLELISM", "8"))
+        self.max_parallel = max(1, min(max_parallel, MAX_PARALLELISM))
+        self.on_stage = on_stage
+        self.on_progress = on_progress
+
+    def deploy(self, client_ids, profile=None):
+        with tracer.span("deploy.batch", nodes=len(client_ids)):
+            return self._deploy(client_ids, profile)
+
+    def _deploy(self, client_ids, profile):
+        profile = get_profile(profile).name
+        # Same rule as single deploys: the shared repository only when configured
+        repositories = {client_id: repository_provisioner.repository_name(client_id) for client_id in client_ids}
+        images = self._stage("image", lambda: self._resolve_images(repositories, profile))
+
+        def create_all():
+            workers = min(self.max_parallel, len(client_ids))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-deploy") as executor:
+                futures = [
+                    run_in_context(
+                        executor, self._create, client_id, repositories[client_id], images[repositories[client_id]], profile
+                    )
+                    for client_id in client_ids
+                ]
+                return [future.result() for future in futures]
+
+        results = self._stage("services", create_all)
+
+        succeeded = [result for result in results if result["status"] == "succeeded"]
+        if succeeded:
+            save_deployments([(result["deployment"], result["client_id"]) for result in succeeded])
+            for result in succeeded:
+                deployment_cache.invalidate(result["deployment"]["service_name"])
+
+        return {
+            "images": [{"repository": repository, **image} for repository, image in images.items()],
+            "profile": profile,
+            "requested": len(client_ids),
+            "succeeded": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "results": results,
+        }
+
+    def _resolve_images(self, repositories, profile):
+        """repository -> {image_tag, image_cache, error}, resolving distinct repositories concurrently"""
+        first_client = {}
+        for client_id, repository in repositories.items():
+            first_client.setdefault(repository, client_id)
+
+        workers = min(self.max_parallel, len(first_client))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-image") as executor:
+            futures = {
+                repository: run_in_context(executor, self._resolve_image, client_id, repository, profile)
+                for repository, client_id in first_client.items()
+            }
+            return {repository: future.result() for repository, future in futures.items()}
+
+    def _resolve_image(self, client_id, repository, profile):
+        try:
+            manager = self.manager_factory(client_id, repository_name=repository, profile=profile)
+            image_uri, cache_hit = manager.resolve_image()
+        except Exception as e:
+            # Only the nodes in this repository fail
+            logger.error(f"Batch image for {repository} failed: {e}")
+            return {"image_tag": None, "image_cache": None, "error": str(e)}
+        logger.info(f"Batch image for {repository}: {image_uri} (cache {'hit' if cache_hit else 'miss'})")
+        return {"image_tag": image_uri, "image_cache": "hit" if cache_hit else "miss", "error": None}
+
+    def _stage(self, name, fn):
+        start = time.perf_counter()
+        self._notify_stage(name, "started", None)
+        try:
+            result = fn()
+        except Exception:
+            self._notify_stage(name, "failed", time.perf_counter() - start)
+            raise
+        self._notify_stage(name, "completed", time.perf_counter() - start)
+        return result
+
+    def _notify_stage(self, name, event, elapsed):
+        if self.on_stage:
+            self.on_stage(name, event, elapsed)
+
+    def _create(self, client_id, repository, image, profile):
+        try:
+            if image["error"]:
+                raise RuntimeError(f"Image for {repository} failed: {image['error']}")
+            manager = self.manager_factory(client_id, repository_name=repository, profile=profile)
+            deployment = manager.create_service(image["image_tag"])
+            result = {"client_id": client_id, "status": "succeeded", "deployment": deployment, "error": None}
+        except Exception as e:
+            logger.error(f"Batch deployment for {client_id} failed: {e}")
+            result = {"client_id": client_id, "status": "failed", "deployment": None, "error": str(e)}
+        if self.on_progress:
+            self.on_progress("node", {key: value for key, value in result.items() if key != "deployment"})
+        return result
@@ -1,5 +1,9 @@
 import docker
+import docker.errors
 import logging
+import threading
+
+from ..utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -7,46 +11,106 @@ logger = logging.getLogger(__name__)
 class DockerClient:
     def __init__(self):
         self.client = docker.from_env()
+        # registry -> password of the login the client currently holds
+        self._logins = {}
+        self._login_lock = threading.Lock()
+
+    @traced("docker.build_image")
+    def build_image(self, tag, path=None, fileobj=None, on_progress=None):
+        """Build from a directory, or from a tar archive streamed to the daemon.
 
-    def build_image(self, path, tag):
+        on_progress(line) receives each build output line as the daemon streams it.
+        """
         try:
             logger.info(f"Building Docker image: {tag}")
-            self.client.images.build(path=str(path), tag=tag, rm=True)
+            if fileobj is not None:
+                source = {"fileobj": fileobj, "custom_context": True}
+            else:
+                source = {"path": str(path)}
+            for chunk in self.client.api.build(tag=tag, rm=True, decode=True, **source):
+                # The daemon reports build failures in-stream rather than as an HTTP error
+                if "error" in chunk:
+                    raise docker.errors.BuildError(chunk["error"], build_log=[])
+                line = chunk.get("stream", "").rstrip()
+                if line and on_progress:
+                    on_progress(line)
             logger.info("Docker image build completed")
         except Exception as e:
             logger.error(f"Failed to build Docker image: {e}")
             raise
 
-    def push_image(self, tag):
+    @traced("docker.push_image")
+    def push_image(self, tag, on_progress=None):
+        """Push an image and return its registry digest (None if the daemon did not report one).
+
+        on_progress(layer) receives per-layer status dicts: id, status, current, total.
+        """
         try:
             logger.info(f"Pushing Docker image: {tag}")
-            result = self.client.images.push(tag)
+            digest = None
+            for line in self.client.images.push(tag, stream=True, decode=True):
+                # The daemon reports push failures in-stream rather than as an HTTP error
+                if "error" in line:
+                    raise docker.errors.APIError(line["error"])
+                digest = line.get("aux", {}).get("Digest", digest)
+                if on_progress and "id" in line:
+                    detail = line.get("progressDetail") or {}
+                    on_progress(
+                        {
+                            "id": line["id"],
+                            "status": line.get("status"),
+                            "current": detail.get("current"),
+                            "total": detail.get("total"),
+                        }
+                    )
             logger.info("Docker image pushed successfully")
-            return result
+            return digest
         except Exception as e:
             logger.error(f"Failed to push Docker image: {e}")
             raise
-    
-    """Aggressively clean Docker build cache and unused objects"""        
-    def prune_builds(self):
+
+    @traced("docker.image_exists")
+    def image_exists(self, tag):
         try:
-            # Remove build cache
-            self.client.api.prune_builds()
-            
-            # Remove unused containers
-            self.client.containers.prune()
-            
-            # Remove unused images
-            self.client.images.prune()
-            
-            # Force remove dangling images
-            dangling_images = self.client.images.list(filters={'dangling': True})
-            for image in dangling_images:
-                try:
-                    self.client.images.remove(image.id, force=True)
-                except Exception:
-                    pass
-                    
-        except Exception as e:
-            logger.error(f"Error during Docker cleanup: {e}")
-            raise
+            self.client.images.get(tag)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+
+    @traced("docker.tag_image")
+    def tag_image(self, source, target):
+        repository, _, tag = target.rpartition(":")
+        self.client.images.get(source).tag(repository, tag=tag)
+    
+    @traced("docker.login_registry")
+    def login_registry(self, registry, username, password):
+        """Log in once per registry and credential; concurrent pushes reuse the session"""
+        if self._logins.get(registry) == password:
+            return
+        with self._login_lock:
+            if self._logins.get(registry) == password:
+                return
+            self.client.login(username=username, password=password, registry=registry)
+            self._logins[registry] = password
+            logger.info(f"Logged in to registry: {registry}")
+
+    def close(self):
+        self.client.close()
+
+    @traced("docker.disk_usage")
+    def disk_usage(self):
+        """Raw `docker system df` data"""
+        return self.client.df()
+
+    @traced("docker.prune_build_cache")
+    def prune_build_cache(self, keep_storage=None):
+        """Drop least recently used build cache until at most keep_storage bytes remain"""
+        return self.client.api.prune_builds(keep_storage=keep_storage)
+
+    @traced("docker.prune_containers")
+    def prune_containers(self):
+        return self.client.containers.prune()
+
+    @traced("docker.remove_image")
+    def remove_image(self, ref):
+        self.client.images.remove(ref)
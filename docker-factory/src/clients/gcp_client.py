@@ -4,6 +4,8 @@ from google.oauth2 import service_account
 from google.cloud import run_v2
 from google.cloud import artifactregistry_v1
 
+from .token_provider import TokenProvider
+
 
 class GCPClient:
     def __init__(self):
@@ -46,6 +48,9 @@ class GCPClient:
                 ],
             )
 
+            # Cached access token for registry logins
+            self.token_provider = TokenProvider(self.credentials)
+
             # Initialize clients with credentials
             self.cloud_run_client = run_v2.ServicesClient(credentials=self.credentials)
             self.artifact_client = artifactregistry_v1.ArtifactRegistryClient(credentials=self.credentials)
@@ -58,3 +63,12 @@ class GCPClient:
     @property
     def project_id(self):
         return self._project_id
+
+    def close(self):
+        """Close the gRPC channels held by the API clients"""
+        self.token_provider.close()
+        for client in (self.cloud_run_client, self.artifact_client):
+            try:
+                client.transport.close()
+            except Exception:
+                pass
@@ -0,0 +1,49 @@
+import threading
+
+from . import docker_client, gcp_client
+from ..utils.logging import setup_logging
+
+logger = setup_logging(__name__)
+
+
+class ClientRegistry:
+    """Process-wide GCP and Docker clients, built on first use and shared across requests and workers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gcp_client = None
+        self._docker_client = None
+
+    @property
+    def gcp_client(self):
+        if self._gcp_client is None:
+            with self._lock:
+                if self._gcp_client is None:
+                    logger.info("Initializing shared GCP client")
+                    self._gcp_client = gcp_client.GCPClient()
+        return self._gcp_client
+
+    @property
+    def docker_client(self):
+        if self._docker_client is None:
+            with self._lock:
+                if self._docker_client is None:
+                    logger.info("Initializing shared Docker client")
+                    self._docker_client = docker_client.DockerClient()
+        return self._docker_client
+
+    def close(self):
+        """Release channels and connections; clients are rebuilt if used again"""
+        with self._lock:
+            clients, self._gcp_client, self._docker_client = (self._gcp_client, self._docker_client), None, None
+
+        for client in clients:
+            if client is None:
+                continue
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close {type(client).__name__}: {e}")
+
+
+client_registry = ClientRegistry()
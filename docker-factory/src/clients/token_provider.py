@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+from datetime import datetime
+
+import google.auth.transport.requests
+
+from ..utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+class TokenProvider:
+    """Caches the OAuth access token of a credentials object until it nears expiry.
+
+    The first get_token() starts a daemon thread that refreshes the token
+    ahead of expiry, so callers normally get the cached token without a
+    round trip to the token endpoint.
+    """
+
+    def __init__(self, credentials, refresh_margin=None, request_factory=None):
+        self.credentials = credentials
+        # Tokens with less than this many seconds left are refreshed in the foreground
+        self.refresh_margin = refresh_margin if refresh_margin is not None else int(
+            os.getenv("GCP_TOKEN_REFRESH_MARGIN", "300")
+        )
+        self.request_factory = request_factory or google.auth.transport.requests.Request
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get_token(self):
+        token = self._cached_token()
+        if token is None:
+            with self._lock:
+                token = self._cached_token() or self._refresh()
+        self._start_background_refresh()
+        return token
+
+    def close(self):
+        self._stop.set()
+
+    def _seconds_left(self):
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return float("inf")
+        # google-auth keeps expiry as a naive UTC datetime
+        return (expiry - datetime.utcnow()).total_seconds()
+
+    def _cached_token(self):
+        if self.credentials.token and self._seconds_left() > self.refresh_margin:
+            return self.credentials.token
+        return None
+
+    @traced("gcp.refresh_token")
+    def _refresh(self):
+        self.credentials.refresh(self.request_factory())
+        logger.info("Refreshed GCP access token")
+        return self.credentials.token
+
+    def _start_background_refresh(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name="gcp-token-refresh", daemon=True)
+                self._thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            # Refresh once the token enters the second-to-last margin window,
+            # well before foreground callers would have to wait for it
+            delay = max(self._seconds_left() - 2 * self.refresh_margin, 1)
+            if self._stop.wait(min(delay, 3600)):
+                return
+            if self._seconds_left() > 2 * self.refresh_margin:
+                continue
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+                if self._stop.wait(30):
+                    return
@@ -1,36 +1,70 @@
+from contextlib import contextmanager
 from datetime import datetime
 import random
 import string
-from pathlib import Path
+import time
 
-from .clients.gcp_client import GCPClient
-from .clients.docker_client import DockerClient
+from .clients.registry import client_registry
+from .profiles import PROFILES, get_profile
 from .services.artifact_service import ArtifactService
 from .services.cloud_run_service import CloudRunService
 from .services.container_service import ContainerService
+from .services.deployment_cache import deployment_cache
+from .services.image_cache import node_image_cache
+from .services.repository_service import repository_provisioner
+from .services.docker_gc_service import docker_gc
+from .pipeline import Stage, StagePipeline
+from .utils.single_flight import SingleFlight
 from .utils.security import SecurityUtils
 from .utils.logging import setup_logging
+from .utils.tracing import tracer
+from .utils.metrics import DEPLOY_DURATION, DEPLOY_STAGE_DURATION, DEPLOYS_IN_FLIGHT
 from . import db
-import shutil
 
 logger = setup_logging(__name__)
 
+IMAGE_NAME = "secure-app"
+
+# Local image builds, shared by deploys targeting different repositories
+_local_builds = SingleFlight()
+
+
+def local_image_tag(context_hash):
+    return f"{IMAGE_NAME}:{context_hash[:16]}"
+
+
+def current_node_image_tags():
+    """Local tags of the images the current templates build, one per performance profile"""
+    return [
+        local_image_tag(ContainerService(docker_client=None, profile=profile).context_hash())
+        for profile in PROFILES.values()
+    ]
+
 
 class SecureGCPContainerManager:
-    def __init__(self, client_id):
+    def __init__(self, client_id, on_stage=None, clients=None, on_progress=None, repository_name=None, profile=None):
         self.client_id = client_id
+        self._repository_override = repository_name
+        # Performance profile: rippled.cfg tuning and Cloud Run limits; raises ValueError if unknown
+        self.profile = get_profile(profile)
+
+        # Optional progress listeners: on_stage(stage, event, elapsed) and
+        # on_progress(kind, data) for build output ("build") and layer pushes ("push")
+        self.on_stage = on_stage
+        self.on_progress = on_progress
 
         # Initialize security utils
         self.security = SecurityUtils(client_id)
 
-        # Initialize clients
-        self.gcp_client = GCPClient()
-        self.docker_client = DockerClient()
+        # Shared, process-wide clients
+        clients = clients or client_registry
+        self.gcp_client = clients.gcp_client
+        self.docker_client = clients.docker_client
 
         # Initialize services
         self.artifact_service = ArtifactService(self.gcp_client, self.docker_client)
         self.cloud_run_service = CloudRunService(self.gcp_client)
-        self.container_service = ContainerService(self.docker_client)
+        self.container_service = ContainerService(self.docker_client, self.profile)
 
         # Set up unique identifiers
         self._setup_identifiers()
@@ -42,97 +76,238 @@ class SecureGCPContainerManager:
 
         # Set up deployment variables
         self.region = "us-central1"
-        repo_name = self.client_id.split("@")[0].lower().replace("_", "-")
-        self.repository_name = f"secure-app-{repo_name}"
+        self.repository_name = self._repository_override or repository_provisioner.repository_name(self.client_id)
         self.registry_location = f"{self.region}-docker.pkg.dev"
-        self.image_name = "secure-app"
+        self.image_name = IMAGE_NAME
         self.service_name = f"secure-app-{self.unique_id}"
 
-        # Build image tag components
+        # Build image path components
         registry = self.registry_location
         project = self.gcp_client.project_id
         repo = self.repository_name
         image = self.image_name
-        tag = self.unique_id
 
-        # Combine components into full image tag
-        self.image_tag = f"{registry}/{project}/{repo}/{image}:{tag}"
+        # The tag is the build-context hash, resolved at deploy time
+        self.image_repository = f"{registry}/{project}/{repo}/{image}"
+        self.context_hash = None
+        self.image_tag = None
+        self._image_critical_path = None
 
     def deploy(self):
         """Main deployment orchestration"""
-        app_dir = None  # Track app directory for cleanup
+        with tracer.span("deploy", client_id=self.client_id, service_name=self.service_name):
+            return self._deploy()
+
+    def _deploy(self):
+        started = time.monotonic()
+        outcome = "failed"
+        DEPLOYS_IN_FLIGHT.inc()
         try:
-            self._cleanup_docker()
-            
             logger.info(
                 f"Starting secure deployment for client: {self.client_id}")
 
-            # Create app files
-            app_dir = self.container_service.create_app_files(self.unique_id)
-            logger.info(f"App files created at: {app_dir}")
+            # Repository creation overlaps the build, and the IAM binding is set
+            # while Cloud Run is still rolling out the service
+            pipeline = StagePipeline(
+                [
+                    Stage("template", lambda results: self._resolve_context()),
+                    Stage("image", lambda results: self._get_or_build_image(), after=["template"]),
+                    *self._service_stages(lambda results: results["image"][0], after=["image"]),
+                    Stage("db", self._save_deployment, after=["cloud_run_ready", "iam"]),
+                ],
+                run_stage=self._run_stage,
+            )
+            deployment_info = pipeline.run()["db"]
 
-            # Build and push container
-            self.container_service.build_container(app_dir, self.image_tag)
-            self.artifact_service.create_repository(self.repository_name, self.region)
-            self.artifact_service.push_to_registry(self.image_tag, self.registry_location)
+            critical_path = self._expand_critical_path(pipeline.critical_path())
+            deployment_info["critical_path"] = critical_path
+            logger.info(
+                f"Deployment {self.service_name} critical path: "
+                + " -> ".join(f"{step['stage']} ({step['duration']}s)" for step in critical_path)
+            )
+            outcome = "succeeded"
+            return deployment_info
 
-            # Deploy to Cloud Run
-            deployment_result = self.cloud_run_service.deploy(
+        except Exception as e:
+            logger.error(f"Secure deployment workflow failed: {e}")
+            raise
+        finally:
+            DEPLOYS_IN_FLIGHT.dec()
+            DEPLOY_DURATION.labels(outcome=outcome).observe(time.monotonic() - started)
+
+    def resolve_image(self):
+        """Return (image_uri, cache_hit) for the current templates, building and pushing on a miss"""
+        with self._stage("template"):
+            self._resolve_context()
+        return self._get_or_build_image()
+
+    def create_service(self, image_uri, cache_hit=None):
+        """Create this node's Cloud Run service from a pushed image; returns deployment info without saving it"""
+        pipeline = StagePipeline(self._service_stages(lambda results: image_uri), run_stage=self._run_stage)
+        with DEPLOYS_IN_FLIGHT.track_inprogress():
+            results = pipeline.run()
+        return self._deployment_info(results["cloud_run_ready"], image_uri, cache_hit)
+
+    def _resolve_context(self):
+        # Identical build contexts produce identical images, so only build
+        # and push when this content is not in the repository yet
+        self.context_hash = self.container_service.context_hash()
+        self.image_tag = f"{self.image_repository}:{self.context_hash[:16]}"
+
+    def _get_or_build_image(self):
+        return node_image_cache.get_or_build(
+            self.context_hash,
+            self.image_repository,
+            self._build_and_push_image,
+            exists=self.artifact_service.image_exists,
+        )
+
+    def _service_stages(self, image_uri, after=()):
+        """Create the service, then wait for it to be ready while the IAM binding is applied"""
+
+        def create(results):
+            return self.cloud_run_service.start_deploy(
                 self.service_name,
-                self.image_tag,
+                image_uri(results),
                 self.region,
                 self.security.get_env_vars(),
+                self.profile.resource_limits(),
             )
 
-            # Generate deployment info
-            service_info = self.cloud_run_service.get_service_info(self.service_name, self.region)
+        def ready(results):
+            # The finished create operation already carries the service URI
+            with tracer.span("cloud_run.wait_operation", service_name=self.service_name):
+                service = results["cloud_run_create"].result()
+            logger.info(f"Secure service deployed successfully: {service.uri}")
+            return self.cloud_run_service.service_info(self.service_name, service)
 
-            # Add database storage
-            deployment_info = {
-                **service_info,
-                "image_tag": self.image_tag,
-                "access_token": self.security.generate_access_token(),
-                "deployment_time": datetime.now().isoformat(),
-            }
+        def set_iam_policy(results):
+            self.cloud_run_service.set_iam_policy(self.service_name, self.region)
 
-            # Store in database
-            db.save_deployment(deployment_info, self.client_id)
+        return [
+            Stage("cloud_run_create", create, after=after),
+            Stage("cloud_run_ready", ready, after=["cloud_run_create"]),
+            Stage("iam", set_iam_policy, after=["cloud_run_create"]),
+        ]
 
-            return deployment_info
+    def _save_deployment(self, results):
+        image_uri, cache_hit = results["image"]
+        deployment_info = self._deployment_info(results["cloud_run_ready"], image_uri, cache_hit)
+        db.save_deployment(deployment_info, self.client_id)
+        deployment_cache.invalidate(self.service_name)
+        return deployment_info
 
-        except Exception as e:
-            logger.error(f"Secure deployment workflow failed: {e}")
-            raise
+    def _deployment_info(self, service_info, image_uri, cache_hit):
+        deployment_info = {
+            **service_info,
+            "image_tag": image_uri,
+            "profile": self.profile.name,
+            "access_token": self.security.generate_access_token(),
+            "deployment_time": datetime.now().isoformat(),
+        }
+        if cache_hit is not None:
+            deployment_info["image_cache"] = "hit" if cache_hit else "miss"
+        return deployment_info
 
-        finally:
-            if app_dir:
-                try:
-                    logger.info(f"Attempting to remove app files at: {app_dir}")
-                    self.remove_app_files(app_dir)
-                    logger.info(f"App files cleaned up successfully: {app_dir}")
-                except Exception as cleanup_error:
-                    logger.warning(
-                        f"Failed to remoe app files: {cleanup_error}")
-
-    def _cleanup_docker(self):
-        """Aggressive Docker cleanup to free space"""
-        try:
-            logger.info("Starting Docker cleanup")
-            self.docker_client.prune_builds()  # Add this method to your DockerClient class
-            logger.info("Completed Docker cleanup")
-        except Exception as e:
-            logger.warning(f"Docker cleanup failed: {e}")
+    def _build_and_push_image(self):
+        """Build (or reuse) the local image, push it and return its digest reference"""
+        local_tag = local_image_tag(self.context_hash)
 
+        def build(results):
+            _local_builds.do(local_tag, lambda: self._build_local_image(local_tag))
+            self.docker_client.tag_image(local_tag, self.image_tag)
+            docker_gc.touch(local_tag)
 
-    def remove_app_files(self, app_dir):
-        """Remove app files after deployment"""
+        def push(results):
+            return self.artifact_service.push_to_registry(
+                self.image_tag,
+                self.registry_location,
+                on_progress=self._progress_callback("push"),
+                repository_path=results["repository"],
+            )
+
+        def create_repository(results):
+            return self.artifact_service.create_repository(self.repository_name, self.region)
+
+        pipeline = StagePipeline(
+            [
+                Stage("build", build),
+                Stage("repository", create_repository),
+                Stage("push", push, after=["build", "repository"]),
+            ],
+            run_stage=self._run_stage,
+        )
+
+        # Keep the garbage collector away from the images this deploy is using
+        docker_gc.pin(local_tag)
+        docker_gc.pin(self.image_tag)
         try:
-            path = Path(app_dir)
-            if path.exists() and path.is_dir():
-                shutil.rmtree(path)
-                logger.info(f"Removed app files at: {app_dir}")
+            digest = pipeline.run()["push"]
+        finally:
+            docker_gc.unpin(self.image_tag)
+            docker_gc.unpin(local_tag)
+
+        self._image_critical_path = pipeline.critical_path()
+        return f"{self.image_repository}@{digest}" if digest else self.image_tag
+
+    def _expand_critical_path(self, path):
+        """Replace the image step with the build/push stages it ran, if it built anything"""
+        steps = []
+        for name, duration in path:
+            if name == "image" and self._image_critical_path:
+                steps.extend(self._image_critical_path)
             else:
-                logger.warning(f"App directory not found or not a directory: {app_dir}")
-        except Exception as e:
-            logger.error(f"Error cleaning up app files at {app_dir}: {e}")
+                steps.append((name, duration))
+        return [{"stage": name, "duration": round(duration, 3)} for name, duration in steps]
+
+    def _build_local_image(self, local_tag):
+        if self.docker_client.image_exists(local_tag):
+            logger.info(f"Reusing local image: {local_tag}")
+            return
+
+        # The build context is rendered and streamed from memory
+        self.container_service.build_container(local_tag, on_progress=self._progress_callback("build"))
+
+    def _progress_callback(self, kind):
+        if not self.on_progress:
+            return None
+
+        def report(data):
+            try:
+                self.on_progress(kind, data)
+            except Exception as e:
+                logger.warning(f"Progress listener failed for {kind}: {e}")
+
+        return report
+
+    def _run_stage(self, name, call):
+        # "image" only wraps the cache lookup and the build/push stages it may run
+        if name == "image":
+            return call()
+        with self._stage(name):
+            return call()
+
+    @contextmanager
+    def _stage(self, name):
+        """Time a pipeline stage and report it to the progress listener"""
+        self._notify(name, "started")
+        started = time.monotonic()
+        try:
+            with tracer.span(f"stage.{name}"):
+                yield
+        except Exception:
+            elapsed = time.monotonic() - started
+            DEPLOY_STAGE_DURATION.labels(stage=name, outcome="failed").observe(elapsed)
+            self._notify(name, "failed", elapsed)
             raise
+        elapsed = time.monotonic() - started
+        DEPLOY_STAGE_DURATION.labels(stage=name, outcome="completed").observe(elapsed)
+        self._notify(name, "completed", elapsed)
+
+    def _notify(self, stage, event, elapsed=None):
+        if not self.on_stage:
+            return
+        try:
+            self.on_stage(stage, event, elapsed)
+        except Exception as e:
+            logger.warning(f"Stage listener failed for {stage}: {e}")
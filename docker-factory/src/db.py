@@ -1,31 +1,82 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, Column, Index, Integer, String, DateTime, Text, JSON, UniqueConstraint, tuple_
+from sqlalchemy import insert, inspect, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 from contextlib import contextmanager
+import base64
 import os
 
+from .utils.tracing import instrument_engine
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the .env file")
 
-# Configure engine with connection pool settings to handle SSL EOF errors
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Key setting to detect stale connections
-    pool_size=5,  # Adjust based on your needs
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    connect_args={"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 5, "keepalives_count": 5},
-)
 
-SessionLocal = sessionmaker(bind=engine)
+def _engine_options(url):
+    """Pool settings for the configured backend"""
+    if url.startswith("sqlite"):
+        # Local/test databases are used from worker threads too
+        return {"connect_args": {"check_same_thread": False}}
+
+    # Configure engine with connection pool settings to handle SSL EOF errors
+    return {
+        "pool_pre_ping": True,  # Key setting to detect stale connections
+        "pool_size": 5,  # Adjust based on your needs
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 3600,  # Recycle connections after 1 hour
+        "connect_args": {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 5, "keepalives_count": 5},
+    }
+
+
+def _async_url(url):
+    """Same database through an asyncio driver: asyncpg for Postgres, aiosqlite for SQLite"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    query = dict(url.query)
+    if "sslmode" in query:
+        # asyncpg spells libpq's sslmode as ssl
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+def _async_engine_options(url):
+    if url.startswith("sqlite"):
+        return {}
+    return {key: value for key, value in _engine_options(url).items() if key != "connect_args"}
+
+
+# Worker threads (deploy jobs, background services) use the sync engine;
+# request handlers use the async one so they never block the event loop.
+# Neither connects until first use; call startup() before serving requests.
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+async_engine = create_async_engine(_async_url(DATABASE_URL), **_async_engine_options(DATABASE_URL))
+
+# DB queries show up as spans inside sampled traces
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Objects stay readable after commit, so inserts need no refresh round trip
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 Base = declarative_base()
 
 
 class Deployment(Base):
     __tablename__ = "deployments"
+    # Keyset pagination walks (created_at, id) newest first, optionally within a client or status
+    __table_args__ = (
+        Index("ix_deployments_created_id", "created_at", "id"),
+        Index("ix_deployments_client_created_id", "client_id", "created_at", "id"),
+        Index("ix_deployments_status_created_id", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     service_name = Column(String, unique=True)
@@ -36,6 +87,42 @@ class Deployment(Base):
     ws_endpoint = Column(String)
     access_token = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Kept current by the Cloud Run reconciler
+    latest_revision = Column(String)
+    uri = Column(String)
+    last_seen_at = Column(DateTime)
+
+
+class DeploymentJob(Base):
+    __tablename__ = "deployment_jobs"
+
+    id = Column(String(32), primary_key=True)
+    client_id = Column(String, index=True)
+    profile = Column(String)
+    # Batch jobs: {"client_ids": [...], "max_parallel": n}; client_id is then empty
+    batch = Column(JSON)
+    status = Column(String, index=True)
+    stage = Column(String)
+    stages = Column(JSON, default=list)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # The process running the job keeps extending its lease; an expired lease means it died
+    owner = Column(String)
+    lease_expires_at = Column(DateTime)
+
+
+class NodeImage(Base):
+    __tablename__ = "node_images"
+    __table_args__ = (UniqueConstraint("context_hash", "repository"),)
+
+    id = Column(Integer, primary_key=True)
+    context_hash = Column(String(64), index=True)
+    repository = Column(String)
+    image_uri = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 @contextmanager
@@ -48,38 +135,312 @@ def get_db():
 
 
 def save_deployment(deployment_info, client_id):
+    save_deployments([(deployment_info, client_id)])
+
+
+def _deployment_values(deployment_info, client_id):
+    return {
+        "service_name": deployment_info["service_name"],
+        "client_id": client_id,
+        "image_tag": deployment_info.get("image_tag", ""),
+        # service_info reports Cloud Run's condition as "state"
+        "status": deployment_info.get("state", "RUNNING"),
+        "rpc_endpoint": deployment_info.get("rpc_endpoint", ""),
+        "ws_endpoint": deployment_info.get("ws_endpoint", ""),
+        "access_token": deployment_info.get("access_token", ""),
+        # service_info reports the serving revision as its status
+        "latest_revision": deployment_info.get("status"),
+        "uri": deployment_info.get("rpc_endpoint", "").rstrip("/") or None,
+        "created_at": datetime.utcnow(),
+        "last_seen_at": datetime.utcnow(),
+    }
+
+
+# A redeploy keeps the row's reconciled status and its place in the listing
+REDEPLOY_KEEPS = ("status", "created_at")
+
+
+def save_deployments(deployments):
+    """Upsert many (deployment_info, client_id) pairs with one multi-row statement"""
+    values = [_deployment_values(deployment_info, client_id) for deployment_info, client_id in deployments]
+    if not values:
+        return
+    with engine.begin() as connection:
+        connection.execute(_upsert_statement(engine.dialect.name, values, keep=REDEPLOY_KEEPS))
+
+
+def _upsert_statement(dialect_name, rows, keep=()):
+    """INSERT ... ON CONFLICT (service_name) DO UPDATE for the columns present in rows, except keep"""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(Deployment).values(rows)
+    columns = {key for row in rows for key in row} - {"service_name", *keep}
+    return statement.on_conflict_do_update(
+        index_elements=[Deployment.service_name],
+        set_={column: statement.excluded[column] for column in columns},
+    )
+
+
+def upsert_deployment_statuses(rows):
+    """Write status fields for many services in one statement.
+
+    rows are dicts with service_name plus the columns to set (all rows must
+    carry the same keys). Unknown services are inserted.
+    """
+    if not rows:
+        return
+    with engine.begin() as connection:
+        connection.execute(_upsert_statement(engine.dialect.name, rows))
+
+
+def get_deployment(service_name):
     with get_db() as db:
-        try:
-            deployment = Deployment(
-                service_name=deployment_info["service_name"],
-                client_id=client_id,
-                image_tag=deployment_info.get("image_tag", ""),
-                status="RUNNING",
-                rpc_endpoint=deployment_info.get("rpc_endpoint", ""),
-                ws_endpoint=deployment_info.get("ws_endpoint", ""),
-                access_token=deployment_info.get("access_token", ""),
+        return db.query(Deployment).filter_by(service_name=service_name).first()
+
+
+def list_deployments(client_id):
+    with get_db() as db:
+        return db.query(Deployment).filter_by(client_id=client_id).all()
+
+
+# Columns returned by list_deployments_page_async
+DEPLOYMENT_SUMMARY_COLUMNS = (
+    Deployment.id,
+    Deployment.service_name,
+    Deployment.client_id,
+    Deployment.status,
+    Deployment.rpc_endpoint,
+    Deployment.ws_endpoint,
+    Deployment.created_at,
+)
+
+
+def encode_cursor(created_at, deployment_id):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{deployment_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, deployment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(deployment_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _deployment_page_query(client_id, status, cursor, limit):
+    query = select(*DEPLOYMENT_SUMMARY_COLUMNS)
+    if client_id:
+        query = query.where(Deployment.client_id == client_id)
+    if status:
+        query = query.where(Deployment.status == status)
+    if cursor:
+        query = query.where(tuple_(Deployment.created_at, Deployment.id) < decode_cursor(cursor))
+    # One extra row tells whether another page exists without counting
+    return query.order_by(Deployment.created_at.desc(), Deployment.id.desc()).limit(limit + 1)
+
+
+def _deployment_page(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+
+
+def list_deployment_states():
+    """Reconciled fields of every deployment that has not been deleted"""
+    with get_db() as db:
+        return db.execute(
+            select(Deployment.service_name, Deployment.status, Deployment.latest_revision, Deployment.uri).where(
+                Deployment.status != "DELETED"
             )
-            db.add(deployment)
+        ).all()
+
+
+def save_job(job_id, client_id, status, profile=None, batch=None):
+    with get_db() as db:
+        try:
+            job = DeploymentJob(id=job_id, client_id=client_id, profile=profile, batch=batch, status=status, stages=[])
+            db.add(job)
             db.commit()
-            db.refresh(deployment)
-            return deployment
-        except Exception as e:
+            return job
+        except Exception:
             db.rollback()
             raise
 
 
-def get_deployment(service_name):
+def update_job(job_id, **fields):
     with get_db() as db:
-        return db.query(Deployment).filter_by(service_name=service_name).first()
+        try:
+            db.query(DeploymentJob).filter_by(id=job_id).update(fields)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
 
 
-def list_deployments(client_id):
+def claim_job(job_id, owner, lease_seconds):
+    """Move a QUEUED job to RUNNING for owner; False if another process claimed it first"""
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        result = connection.execute(
+            update(DeploymentJob)
+            .where(DeploymentJob.id == job_id, DeploymentJob.status == "QUEUED")
+            .values(status="RUNNING", owner=owner, started_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        )
+    return result.rowcount == 1
+
+
+def renew_job_leases(job_ids, owner, lease_seconds):
+    """Extend the leases of RUNNING jobs that owner still holds"""
+    if not job_ids:
+        return
+    with engine.begin() as connection:
+        connection.execute(
+            update(DeploymentJob)
+            .where(DeploymentJob.id.in_(job_ids), DeploymentJob.owner == owner, DeploymentJob.status == "RUNNING")
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        )
+
+
+def fail_expired_jobs(error):
+    """Fail RUNNING jobs whose lease ran out (or that never had one); returns their ids"""
+    now = datetime.utcnow()
+    expired = (DeploymentJob.status == "RUNNING") & or_(
+        DeploymentJob.lease_expires_at.is_(None), DeploymentJob.lease_expires_at < now
+    )
+    failed = []
+    with engine.begin() as connection:
+        for job_id in connection.execute(select(DeploymentJob.id).where(expired)).scalars().all():
+            # The condition is repeated so a lease renewed in between is left alone
+            result = connection.execute(
+                update(DeploymentJob)
+                .where(DeploymentJob.id == job_id, expired)
+                .values(status="FAILED", error=error, finished_at=now)
+            )
+            if result.rowcount == 1:
+                failed.append(job_id)
+    return failed
+
+
+def get_job(job_id):
     with get_db() as db:
-        return db.query(Deployment).filter_by(client_id=client_id).all()
+        return db.query(DeploymentJob).filter_by(id=job_id).first()
+
+
+def list_jobs(client_id=None, status=None, limit=50):
+    with get_db() as db:
+        query = db.query(DeploymentJob)
+        if client_id:
+            query = query.filter_by(client_id=client_id)
+        if status:
+            query = query.filter_by(status=status)
+        return query.order_by(DeploymentJob.created_at.desc()).limit(limit).all()
+
+
+def list_jobs_by_status(*statuses):
+    with get_db() as db:
+        return (
+            db.query(DeploymentJob)
+            .filter(DeploymentJob.status.in_(statuses))
+            .order_by(DeploymentJob.created_at)
+            .all()
+        )
+
+
+def get_node_image(context_hash, repository):
+    with get_db() as db:
+        return db.query(NodeImage).filter_by(context_hash=context_hash, repository=repository).first()
+
+
+def save_node_image(context_hash, repository, image_uri):
+    with get_db() as db:
+        try:
+            db.add(NodeImage(context_hash=context_hash, repository=repository, image_uri=image_uri))
+            db.commit()
+        except IntegrityError:
+            # Another process indexed the same image first
+            db.rollback()
+        except Exception:
+            db.rollback()
+            raise
+
+
+def delete_node_image(context_hash, repository):
+    with get_db() as db:
+        db.query(NodeImage).filter_by(context_hash=context_hash, repository=repository).delete()
+        db.commit()
+
+
+# Async API, for request handlers
+
+
+async def get_deployment_async(service_name):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Deployment).filter_by(service_name=service_name).limit(1))
+        return result.scalars().first()
+
+
+async def list_deployments_page_async(client_id=None, status=None, cursor=None, limit=50):
+    """One page of deployment summaries, newest first; returns (rows, next_cursor)"""
+    query = _deployment_page_query(client_id, status, cursor, limit)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return _deployment_page(rows, limit)
+
+
+async def get_job_async(job_id):
+    async with AsyncSessionLocal() as db:
+        return await db.get(DeploymentJob, job_id)
+
+
+async def list_jobs_async(client_id=None, status=None, limit=50):
+    query = select(DeploymentJob)
+    if client_id:
+        query = query.filter_by(client_id=client_id)
+    if status:
+        query = query.filter_by(status=status)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query.order_by(DeploymentJob.created_at.desc()).limit(limit))
+        return result.scalars().all()
+
+
+def _add_missing_columns(connection):
+    """Add nullable columns introduced after a table was first created"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def _create_schema(connection):
+    _add_missing_columns(connection)
+    Base.metadata.create_all(bind=connection)
+    # create_all skips indexes of tables that already exist
+    for index in Deployment.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
 
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Create missing tables and indexes from synchronous code (scripts, tests)"""
+    with engine.begin() as connection:
+        _create_schema(connection)
+
+
+async def startup():
+    """Create missing tables and indexes; run once before the API serves requests"""
+    async with async_engine.begin() as connection:
+        await connection.run_sync(_create_schema)
 
 
-init_db()
+async def shutdown():
+    """Close both connection pools"""
+    await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class JobEventLog:
+    """Bounded ring buffer of one job's progress events.
+
+    Producers are deploy worker threads; consumers are async subscribers that
+    replay everything after the last event id they saw, then wait for more.
+    Events older than the buffer are dropped, so memory per job is bounded.
+    """
+
+    def __init__(self, maxlen):
+        self._events = deque(maxlen=maxlen)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self.closed = False
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            self._events.append({"id": self._last_id, "type": event_type, "time": time.time(), "data": data})
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    def since(self, last_id):
+        """Events after last_id, and how many in between were already dropped"""
+        with self._lock:
+            events = [event for event in self._events if event["id"] > last_id]
+        dropped = events[0]["id"] - last_id - 1 if events else 0
+        return events, dropped
+
+    async def wait(self, last_id, timeout):
+        """Wait until an event after last_id exists, the log closes, or timeout passes"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self.closed or self._last_id > last_id:
+                return
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _wake(self, waiters):
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+
+class JobEventBus:
+    """Event logs for active jobs plus the most recently finished ones"""
+
+    def __init__(self, buffer_size=None, retained=None):
+        self.buffer_size = buffer_size or int(os.getenv("JOB_EVENT_BUFFER_SIZE", "500"))
+        self.retained = retained or int(os.getenv("JOB_EVENT_RETAINED_JOBS", "100"))
+        self._lock = threading.Lock()
+        self._logs = OrderedDict()
+
+    def open(self, job_id):
+        with self._lock:
+            log = self._logs.get(job_id)
+            if log is None:
+                log = self._logs[job_id] = JobEventLog(self.buffer_size)
+            return log
+
+    def get(self, job_id):
+        with self._lock:
+            return self._logs.get(job_id)
+
+    def publish(self, job_id, event_type, data):
+        self.open(job_id).publish(event_type, data)
+
+    def close(self, job_id):
+        log = self.get(job_id)
+        if log is None:
+            return
+        log.close()
+        with self._lock:
+            self._logs.move_to_end(job_id)
+            closed = [key for key, value in self._logs.items() if value.closed]
+            for key in closed[: max(len(closed) - self.retained, 0)]:
+                del self._logs[key]
+
+
+job_events = JobEventBus()
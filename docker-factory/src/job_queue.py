@@ -0,0 +1,236 @@
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from . import db
+from .job_events import job_events
+from .utils.metrics import DEPLOY_JOBS_PENDING
+from .utils.tracing import correlation, run_in_context, tracer
+from .utils.logging import setup_logging
+
+logger = setup_logging(__name__)
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+
+
+class QueueFullError(Exception):
+    """Raised when too many deployment jobs are already waiting"""
+
+
+class DeploymentJobQueue:
+    """Runs deployments on a bounded worker pool, persisting job state through db.
+
+    Several API processes may share one database. A worker claims a QUEUED job
+    with a conditional update before running it, so each job runs once, and
+    renews the job's lease every JOB_LEASE_SECONDS / 3 while it runs. Only
+    RUNNING jobs whose lease has expired (their process died) are failed.
+    """
+
+    def __init__(
+        self, manager_factory=None, max_workers=None, max_pending=None, on_submit=None, batch_factory=None,
+        lease_seconds=None, on_finish=None,
+    ):
+        if manager_factory is None:
+            from .container_manager import SecureGCPContainerManager
+
+            manager_factory = SecureGCPContainerManager
+        if batch_factory is None:
+            from .batch_deployer import BatchDeployer
+
+            batch_factory = BatchDeployer
+
+        self.manager_factory = manager_factory
+        self.batch_factory = batch_factory
+        # Optional hook to start per-client preparation (e.g. repository provisioning) early
+        self.on_submit = on_submit
+        # Optional hook called with (job_id, status) once a job succeeds or fails
+        self.on_finish = on_finish
+        self.max_workers = max_workers or int(os.getenv("DEPLOY_WORKERS", "2"))
+        self.max_pending = max_pending or int(os.getenv("DEPLOY_MAX_PENDING", "100"))
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._executor = None
+        self._pending = 0
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def start(self):
+        """Start the worker pool and resume jobs persisted before a restart"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deploy-worker")
+        DEPLOY_JOBS_PENDING.set_function(lambda: self._pending)
+        logger.info(f"Deployment job queue started with {self.max_workers} workers as {self.owner}")
+        self._recover()
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="deploy-job-lease", daemon=True)
+        self._heartbeat.start()
+
+    def shutdown(self, wait=False):
+        """Stop accepting work; queued jobs stay QUEUED in the database"""
+        self._stop.set()
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Deployment job queue stopped")
+
+    def submit(self, client_id, profile=None):
+        """Persist a new job and hand it to the worker pool"""
+        return self._submit(client_id, profile)
+
+    def submit_batch(self, client_ids, profile=None, max_parallel=None):
+        """Queue one job that deploys every node from a single image"""
+        return self._submit(None, profile, {"client_ids": list(client_ids), "max_parallel": max_parallel})
+
+    def _submit(self, client_id, profile, batch=None):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Deployment queue is full ({self.max_pending} pending jobs)")
+            self._pending += 1
+
+        try:
+            job_id = uuid.uuid4().hex
+            job = db.save_job(job_id, client_id, QUEUED, profile=profile, batch=batch)
+            job_events.publish(job_id, "status", {"status": QUEUED})
+            # The job's trace continues the submitting request's
+            run_in_context(self._executor, self._run, job_id, client_id, profile, batch)
+            client_ids = batch["client_ids"] if batch else [client_id]
+            logger.info(f"Queued deployment job {job_id} for {len(client_ids)} client(s)")
+            for submitted in dict.fromkeys(client_ids):
+                self._notify_submit(submitted)
+            return job
+        except Exception:
+            self._release()
+            raise
+
+    def get(self, job_id):
+        return db.get_job(job_id)
+
+    def list(self, client_id=None, status=None, limit=50):
+        return db.list_jobs(client_id=client_id, status=status, limit=limit)
+
+    def _recover(self):
+        self._fail_expired()
+        # Other processes may resume the same jobs; the claim in _run_job lets only one run each
+        for job in db.list_jobs_by_status(QUEUED):
+            job_events.open(job.id)
+            with self._lock:
+                self._pending += 1
+            self._executor.submit(self._run, job.id, job.client_id, job.profile, job.batch)
+            logger.info(f"Resumed queued deployment job {job.id}")
+
+    def _fail_expired(self):
+        # A job whose process died was cut off mid-pipeline; re-running it could
+        # create a duplicate service, so it is failed instead of resumed.
+        for job_id in db.fail_expired_jobs("Interrupted: the API process running it stopped"):
+            logger.warning(f"Marked interrupted deployment job {job_id} as failed")
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                db.renew_job_leases(running, self.owner, self.lease_seconds)
+                self._fail_expired()
+            except Exception as e:
+                logger.warning(f"Failed to renew deployment job leases: {e}")
+
+    def _notify_submit(self, client_id):
+        if not self.on_submit:
+            return
+        try:
+            self.on_submit(client_id)
+        except Exception as e:
+            logger.warning(f"Submit hook failed for client {client_id}: {e}")
+
+    def _notify_finish(self, job_id, status):
+        if not self.on_finish:
+            return
+        try:
+            self.on_finish(job_id, status)
+        except Exception as e:
+            logger.warning(f"Finish hook failed for job {job_id}: {e}")
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, job_id, client_id, profile=None, batch=None):
+        # Logs and spans from every stage carry the job id
+        with correlation(job_id), tracer.span("deploy.job", job_id=job_id, client_id=client_id):
+            self._run_job(job_id, client_id, profile, batch)
+
+    def _run_job(self, job_id, client_id, profile, batch):
+        stages = []
+        # Independent stages report from different pipeline threads
+        stages_lock = threading.Lock()
+
+        def on_stage(stage, event, elapsed):
+            with stages_lock:
+                if event == "started":
+                    stages.append({"name": stage, "status": "running", "started_at": datetime.utcnow().isoformat()})
+                else:
+                    entry = next(entry for entry in reversed(stages) if entry["name"] == stage)
+                    entry.update(status=event, duration=round(elapsed, 3))
+                job_events.publish(job_id, "stage", {"name": stage, "status": event, "duration": elapsed})
+                db.update_job(job_id, stage=stage, stages=[dict(entry) for entry in stages])
+
+        def on_progress(kind, data):
+            job_events.publish(job_id, kind, data)
+
+        try:
+            if not db.claim_job(job_id, self.owner, self.lease_seconds):
+                logger.info(f"Deployment job {job_id} was claimed by another worker")
+                return
+            with self._lock:
+                self._running.add(job_id)
+            job_events.publish(job_id, "status", {"status": RUNNING})
+            if batch:
+                deployer = self.batch_factory(
+                    max_parallel=batch.get("max_parallel"), on_stage=on_stage, on_progress=on_progress
+                )
+                result = deployer.deploy(batch["client_ids"], profile=profile)
+            else:
+                manager = self.manager_factory(client_id, on_stage=on_stage, on_progress=on_progress, profile=profile)
+                result = manager.deploy()
+            db.update_job(job_id, status=SUCCEEDED, result=result, finished_at=datetime.utcnow())
+            job_events.publish(job_id, "status", {"status": SUCCEEDED})
+            logger.info(f"Deployment job {job_id} succeeded")
+            self._notify_finish(job_id, SUCCEEDED)
+        except Exception as e:
+            logger.error(f"Deployment job {job_id} failed: {e}")
+            job_events.publish(job_id, "status", {"status": FAILED, "error": str(e)})
+            try:
+                db.update_job(job_id, status=FAILED, error=str(e), finished_at=datetime.utcnow())
+            except Exception as db_error:
+                logger.error(f"Failed to record failure of job {job_id}: {db_error}")
+            self._notify_finish(job_id, FAILED)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            job_events.close(job_id)
+            self._release()
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "client_id": job.client_id,
+        "profile": job.profile,
+        "batch": job.batch,
+        "status": job.status,
+        "stage": job.stage,
+        "stages": job.stages or [],
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
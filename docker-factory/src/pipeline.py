@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .utils.tracing import run_in_context
+
+
+class Stage:
+    """One step of a pipeline: fn(results) runs once every stage in `after` has finished"""
+
+    def __init__(self, name, fn, after=()):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+
+
+class StagePipeline:
+    """Runs a DAG of stages, starting each one as soon as its dependencies are done.
+
+    Independent stages run concurrently on a private thread pool. `results`
+    maps stage names to return values and `timings` to (started, finished)
+    monotonic times. If a stage fails, no further stages are started, running
+    ones are allowed to finish, and the first error is raised.
+    """
+
+    def __init__(self, stages, run_stage=None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.after if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        # Wraps every stage call, e.g. to report progress: run_stage(name, call)
+        self.run_stage = run_stage or (lambda name, call: call())
+        self.results = {}
+        self.timings = {}
+
+    def run(self):
+        pending = dict(self.stages)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=len(self.stages) or 1, thread_name_prefix="pipeline") as executor:
+            while pending or running:
+                if error is None:
+                    for name, stage in list(pending.items()):
+                        if all(dep in self.results for dep in stage.after):
+                            del pending[name]
+                            running[run_in_context(executor, self._execute, stage)] = name
+                if not running:
+                    if pending and error is None:
+                        raise ValueError(f"Pipeline has a dependency cycle: {sorted(pending)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        error = error or e
+
+        if error is not None:
+            raise error
+        return self.results
+
+    def _execute(self, stage):
+        started = time.monotonic()
+        try:
+            return self.run_stage(stage.name, lambda: stage.fn(self.results))
+        finally:
+            self.timings[stage.name] = (started, time.monotonic())
+
+    def critical_path(self):
+        """Chain of stages that determined the total duration, as (name, seconds) pairs"""
+        if not self.timings:
+            return []
+
+        name = max(self.timings, key=lambda key: self.timings[key][1])
+        path = []
+        while name is not None:
+            started, finished = self.timings[name]
+            path.append((name, finished - started))
+            # The dependency that finished last is the one this stage waited for
+            deps = [dep for dep in self.stages[name].after if dep in self.timings]
+            name = max(deps, key=lambda dep: self.timings[dep][1]) if deps else None
+        return list(reversed(path))
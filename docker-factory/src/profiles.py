@@ -0,0 +1,108 @@
+import os
+
+# Cloud Run's CPU choices and the memory range (GiB) each one allows
+CLOUD_RUN_MEMORY_RANGE_GI = {1: (0.5, 4), 2: (0.5, 8), 4: (2, 16), 6: (4, 24), 8: (4, 32)}
+
+# Smallest memory (GiB) each rippled node_size is sized for
+NODE_SIZE_MIN_MEMORY_GI = {"tiny": 2, "small": 4, "medium": 8, "large": 16, "huge": 32}
+
+# rippled refuses to delete history more often than this
+MIN_ONLINE_DELETE = 256
+
+
+class PerformanceProfile:
+    """rippled tuning and the Cloud Run resources it is sized for, applied together.
+
+    The rippled values render into rippled.cfg, so every profile builds its
+    own node image; cpu and memory become the service's resource limits.
+    """
+
+    def __init__(self, name, description, cpu, memory_gi, node_size, ledger_history, online_delete, workers=None):
+        self.name = name
+        self.description = description
+        self.cpu = cpu
+        self.memory_gi = memory_gi
+        self.node_size = node_size
+        self.ledger_history = ledger_history
+        self.online_delete = online_delete
+        # rippled sizes its job queue from the host's cores, not the container's limit
+        self.workers = workers or cpu
+
+    def template_values(self):
+        """safe_substitute kwargs for the rippled.cfg template"""
+        return {
+            "node_size": self.node_size,
+            "ledger_history": str(self.ledger_history),
+            "online_delete": str(self.online_delete),
+            "workers": str(self.workers),
+        }
+
+    def resource_limits(self):
+        """Cloud Run container limits"""
+        return {"cpu": str(self.cpu), "memory": f"{self.memory_gi}Gi"}
+
+    def validate(self):
+        """Raise ValueError if Cloud Run or rippled would reject, or starve, this combination"""
+        if self.cpu not in CLOUD_RUN_MEMORY_RANGE_GI:
+            raise ValueError(f"Profile {self.name}: Cloud Run does not offer {self.cpu} CPUs")
+        low, high = CLOUD_RUN_MEMORY_RANGE_GI[self.cpu]
+        if not low <= self.memory_gi <= high:
+            raise ValueError(f"Profile {self.name}: {self.cpu} CPUs allow {low}-{high}Gi, not {self.memory_gi}Gi")
+        if self.node_size not in NODE_SIZE_MIN_MEMORY_GI:
+            raise ValueError(f"Profile {self.name}: unknown node_size {self.node_size}")
+        if self.memory_gi < NODE_SIZE_MIN_MEMORY_GI[self.node_size]:
+            raise ValueError(f"Profile {self.name}: node_size {self.node_size} needs at least "
+                             f"{NODE_SIZE_MIN_MEMORY_GI[self.node_size]}Gi")
+        if self.online_delete < MIN_ONLINE_DELETE:
+            raise ValueError(f"Profile {self.name}: online_delete must be at least {MIN_ONLINE_DELETE}")
+        if self.ledger_history > self.online_delete:
+            raise ValueError(f"Profile {self.name}: ledger_history cannot exceed online_delete")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            **self.resource_limits(),
+            "node_size": self.node_size,
+            "ledger_history": self.ledger_history,
+            "online_delete": self.online_delete,
+            "workers": self.workers,
+        }
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        PerformanceProfile(
+            "light-client",
+            "Recent ledgers only, for wallets and light API use",
+            cpu=2, memory_gi=4, node_size="tiny", ledger_history=256, online_delete=256,
+        ),
+        PerformanceProfile(
+            "standard",
+            "The original node sizing",
+            cpu=8, memory_gi=4, node_size="small", ledger_history=256, online_delete=256,
+        ),
+        PerformanceProfile(
+            "api-heavy",
+            "Larger caches and more job threads for high request rates",
+            cpu=8, memory_gi=16, node_size="medium", ledger_history=2048, online_delete=2048,
+        ),
+        PerformanceProfile(
+            # Cloud Run's filesystem lives in memory, so history is bounded by the memory limit
+            "full-history-lite",
+            "About two days of ledger history for indexers and explorers",
+            cpu=8, memory_gi=32, node_size="large", ledger_history=32768, online_delete=32768,
+        ),
+    )
+}
+
+DEFAULT_PROFILE = os.getenv("DEFAULT_NODE_PROFILE", "standard")
+
+
+def get_profile(name=None):
+    """Look up a profile by name; None means DEFAULT_NODE_PROFILE"""
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile {name}; choose one of {', '.join(PROFILES)}")
+    return PROFILES[name]
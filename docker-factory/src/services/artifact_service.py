@@ -1,10 +1,10 @@
 import logging
-import requests
-import subprocess
-import time
+
 import google.api_core.exceptions
 from google.cloud import artifactregistry_v1
-import jwt
+
+from ..utils.tracing import traced
+from .repository_service import repository_provisioner
 
 logger = logging.getLogger(__name__)
 
@@ -19,100 +19,62 @@ class ArtifactService:
         """Create Artifact Registry repository"""
         try:
             logger.info(f"Creating/checking Artifact Registry repository: {repository_name}")
-
-            parent = f"projects/{self.gcp_client.project_id}/locations/{region}"
-            repository_path = f"{parent}/repositories/{repository_name}"
-
-            try:
-                # Try to get existing repository
-                request = artifactregistry_v1.GetRepositoryRequest(name=repository_path)
-                return self.artifact_client.get_repository(request=request)
-            except Exception:
-                # Create new repository if it doesn't exist
-                logger.info("Repository not found, creating new one...")
-                repository = artifactregistry_v1.Repository()
-                repository.format_ = artifactregistry_v1.Repository.Format.DOCKER
-
-                request = artifactregistry_v1.CreateRepositoryRequest(
-                    parent=parent, repository_id=repository_name, repository=repository
-                )
-                operation = self.artifact_client.create_repository(request=request)
-                return operation.result()
-
+            return repository_provisioner.ensure(self.gcp_client, repository_name, region)
         except Exception as e:
             logger.error(f"Failed to create repository: {e}")
             raise
 
-    def _get_docker_auth_token(self, registry):
-        # Generate short-lived token for Docker authentication
-        token = jwt.encode(
-            {
-                "iat": time.time(),
-                "exp": time.time() + 3600,
-                "aud": "https://oauth2.googleapis.com/token",
-                "iss": self.gcp_client.credentials.service_account_email,
-                "target_audience": registry,
-            },
-            self.gcp_client.credentials.private_key,
-            algorithm="RS256",
-        )
-
-        # Exchange JWT for OAuth2 token
-        auth_req = requests.Request()
-        token_response = auth_req.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
-                "assertion": token,
-            },
-        )
-
-        return token_response.json()["access_token"]
-
-    def push_to_registry(self, image_tag, registry_location):
-        """Push container to Artifact Registry"""
+    @traced("artifact_registry.push")
+    def push_to_registry(self, image_tag, registry_location, on_progress=None, repository_path=None):
+        """Push container to Artifact Registry.
+
+        A failed push forgets that repository_path exists, so the next deploy checks it again.
+        """
         try:
             logger.info("Pushing container to Artifact Registry...")
 
-            # Get authentication token
-            auth_request = google.auth.transport.requests.Request()
-            self.gcp_client.credentials.refresh(auth_request)
-            token = self.gcp_client.credentials.token
+            # Cached token; only a new token needs a new registry login
+            token = self.gcp_client.token_provider.get_token()
 
             # Configure Docker with correct registry URL
             registry_url = f"https://{registry_location}"
-            self.docker_client.client.login(username="oauth2accesstoken", password=token, registry=registry_url)
+            self.docker_client.login_registry(registry_url, "oauth2accesstoken", token)
 
             # Push image
-            result = self.docker_client.push_image(image_tag)
+            digest = self.docker_client.push_image(image_tag, on_progress=on_progress)
             logger.info(f"Successfully pushed image: {image_tag}")
-            return result
+            return digest
 
         except Exception as e:
             logger.error(f"Failed to push container: {e}")
+            if repository_path:
+                repository_provisioner.invalidate(repository_path)
             raise
 
-    def _configure_docker_auth(self, registry_location):
-        """Configure Docker authentication using GCP credentials"""
-        try:
-            # Create auth request
-            auth_request = google.auth.transport.requests.Request()
-
-            # Refresh credentials if needed
-            self.gcp_client.credentials.refresh(auth_request)
-
-            # Get the token
-            token = self.gcp_client.credentials.token
-
-            # Configure Docker client with token
-            self.docker_client.client.login(username="oauth2accesstoken", password=token, registry=registry_location)
-
-            logger.info(
-                f"Successfully configured Docker authentication for {registry_location}")
+    @traced("artifact_registry.get_image")
+    def image_exists(self, image_uri):
+        """Check that a pushed image reference (repo/image@digest or repo/image:tag) is still in the registry.
 
+        Only a NotFound answer counts as missing; on other errors the image is assumed present.
+        """
+        host, project, repository, image = image_uri.split("/", 3)
+        location = host.split("-docker.pkg.dev")[0]
+        repository_path = f"projects/{project}/locations/{location}/repositories/{repository}"
+        try:
+            if "@" in image:
+                request = artifactregistry_v1.GetDockerImageRequest(name=f"{repository_path}/dockerImages/{image}")
+                self.artifact_client.get_docker_image(request=request)
+            else:
+                package, tag = image.rsplit(":", 1)
+                request = artifactregistry_v1.GetTagRequest(name=f"{repository_path}/packages/{package}/tags/{tag}")
+                self.artifact_client.get_tag(request=request)
+        except google.api_core.exceptions.NotFound:
+            # The repository may have been deleted along with the image
+            repository_provisioner.invalidate(repository_path)
+            return False
         except Exception as e:
-            logger.error(f"Failed to configure Docker authentication: {e}")
-            raise
+            logger.warning(f"Could not verify image {image_uri}: {e}")
+        return True
 
     def _verify_image_exists(self, image_tag):
         try:
@@ -2,16 +2,59 @@ import logging
 from google.cloud import run_v2
 from google.iam.v1 import iam_policy_pb2, policy_pb2
 
+from ..profiles import get_profile
+from ..utils.tracing import traced
+
 logger = logging.getLogger(__name__)
 
+RUNNING = "RUNNING"
+DEPLOYING = "DEPLOYING"
+FAILED = "FAILED"
+DELETED = "DELETED"
+
+
+def service_status(service):
+    """Deployment status for a Cloud Run Service message"""
+    state = service.terminal_condition.state
+    if service.reconciling or state in (
+        run_v2.Condition.State.CONDITION_PENDING,
+        run_v2.Condition.State.CONDITION_RECONCILING,
+    ):
+        return DEPLOYING
+    if state == run_v2.Condition.State.CONDITION_FAILED:
+        return FAILED
+    return RUNNING
+
+
+def connection_examples(uri):
+    """Request snippets for a node's endpoints"""
+    return {
+        "curl": f'curl -X POST {uri}/ -H "Content-Type: application/json" -d \'{{"method": "server_info"}}\'',
+        "python": f"""
+import requests
+response = requests.post("{uri}/",
+    json={{"method": "server_info"}})
+print(response.json())
+""",
+        "websocket": f"""
+import websockets
+async with websockets.connect("{uri}/ws") as ws:
+    await ws.send({{"command": "subscribe", "streams": ["ledger"]}})
+""",
+    }
+
 
 class CloudRunService:
     def __init__(self, gcp_client):
         self.gcp_client = gcp_client
 
-    def deploy(self, service_name, image_tag, region, env_vars):
+    @traced("cloud_run.create_service")
+    def start_deploy(self, service_name, image_tag, region, env_vars, resource_limits=None):
+        """Submit the create request and return the long-running operation without waiting for it.
+
+        resource_limits defaults to the default performance profile's cpu and memory.
+        """
         try:
-            """Deploy container to Cloud Run with security configurations"""
             logger.info(f"Deploying secure service to Cloud Run: {service_name}")
 
             service = run_v2.Service()
@@ -35,7 +78,7 @@ class CloudRunService:
                 raise ValueError("CLIENT_ID environment variable not set")
 
             # Set resource limits
-            container.resources = run_v2.ResourceRequirements(limits={"cpu": "8", "memory": "4Gi"})
+            container.resources = run_v2.ResourceRequirements(limits=resource_limits or get_profile().resource_limits())
 
             service.template.containers = [container]
 
@@ -52,38 +95,45 @@ class CloudRunService:
                 service=service,
             )
 
-            operation = self.gcp_client.cloud_run_client.create_service(request=request)
-            result = operation.result()
-
-            # Set IAM policy
-            self._set_service_iam_policy(service_name, region)
-
-            logger.info(f"Secure service deployed successfully: {result.uri}")
-            return result
+            return self.gcp_client.cloud_run_client.create_service(request=request)
 
         except Exception as e:
             logger.error(f"Failed to deploy secure service: {e}")
             raise
 
+    @traced("cloud_run.get_service")
     def get_service_info(self, service_name, region):
         try:
             request = run_v2.GetServiceRequest(name=f"projects/{self.gcp_client.project_id}/locations/{region}/services/{service_name}")
 
             service = self.gcp_client.cloud_run_client.get_service(request=request)
 
-            return {
-                "service_name": service_name,
-                "rpc_endpoint": f"{service.uri}/",
-                "ws_endpoint": f"wss://{service.uri.split('https://')[1]}/ws",
-                "status": service.latest_ready_revision,
-                "connection_examples": self._generate_connection_examples(service.uri),
-            }
+            return self.service_info(service_name, service)
 
         except Exception as e:
             logger.error(f"Failed to retrieve service info: {e}")
             raise
 
-    def _set_service_iam_policy(self, service_name, region):
+    @traced("cloud_run.get_service")
+    def get_service_status(self, service_name, region):
+        """Serving revision of a service, the only deployment field that changes after creation"""
+        request = run_v2.GetServiceRequest(name=f"projects/{self.gcp_client.project_id}/locations/{region}/services/{service_name}")
+        return self.gcp_client.cloud_run_client.get_service(request=request).latest_ready_revision
+
+    def service_info(self, service_name, service):
+        """Deployment info for a Service message, e.g. the one create_service's operation returns"""
+        return {
+            "service_name": service_name,
+            "rpc_endpoint": f"{service.uri}/",
+            "ws_endpoint": f"wss://{service.uri.split('https://')[1]}/ws",
+            "status": service.latest_ready_revision,
+            "state": service_status(service),
+            "connection_examples": connection_examples(service.uri),
+        }
+
+    @traced("cloud_run.set_iam_policy")
+    def set_iam_policy(self, service_name, region):
+        """Allow unauthenticated invocations; the service exists as soon as its create operation starts"""
         try:
             service_path = f"projects/{self.gcp_client.project_id}/locations/{region}/services/{service_name}"
 
@@ -98,19 +148,3 @@ class CloudRunService:
         except Exception as e:
             logger.error(f"Failed to set IAM policy: {e}")
             raise
-
-    def _generate_connection_examples(self, uri):
-        return {
-            "curl": f'curl -X POST {uri}/ -H "Content-Type: application/json" -d \'{{"method": "server_info"}}\'',
-            "python": f"""
-import requests
-response = requests.post("{uri}/",
-    json={{"method": "server_info"}})
-print(response.json())
-""",
-            "websocket": f"""
-import websockets
-async with websockets.connect("{uri}/ws") as ws:
-    await ws.send({{"command": "subscribe", "streams": ["ledger"]}})
-""",
-        }
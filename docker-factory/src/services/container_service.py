@@ -1,51 +1,83 @@
+import hashlib
+import io
 import logging
-from pathlib import Path
+import tarfile
+from ..profiles import get_profile
 from ..templates import TemplateManager
 
 logger = logging.getLogger(__name__)
 
+# Template name -> path inside the build context
+BUILD_FILES = {
+    "app.py": "app.py",
+    "gunicorn.conf.py": "gunicorn.conf.py",
+    "rippled_client.py": "rippled_client.py",
+    "json_rpc.py": "json_rpc.py",
+    "ws_hub.py": "ws_hub.py",
+    "token_verifier.py": "token_verifier.py",
+    "node_metrics.py": "node_metrics.py",
+    "health_poller.py": "health_poller.py",
+    "requirements.txt": "requirements.txt",
+    "dockerfile": "Dockerfile",
+    "rippled.cfg": "rippled.cfg",
+    "validators.txt": "validators.txt",
+    "supervisord.conf": "supervisord.conf",
+}
+
+# Templates the performance profile is rendered into; every placeholder must get a value
+PROFILE_TEMPLATES = ("rippled.cfg",)
+
 class ContainerService:
-    def __init__(self, docker_client):
+    def __init__(self, docker_client, profile=None):
         self.docker_client = docker_client
         self.template_manager = TemplateManager()
-        # Create base data directory if it doesn't exist
-        self.base_data_dir = Path("./data")
-        self.base_data_dir.mkdir(exist_ok=True)
-
-    def create_app_files(self, unique_id):
-        """Create necessary application files with security middleware"""
-        app_dir = self.base_data_dir / f"secure-app-{unique_id}"
-        app_dir.mkdir(exist_ok=True)
-        # Create files from templates
-        self.template_manager.write_template("app.py", app_dir / "app.py")
-        self.template_manager.write_template("requirements.txt", app_dir / "requirements.txt")
-        self.template_manager.write_template("dockerfile", app_dir / "Dockerfile")
-        
-        self.template_manager.write_template("rippled.cfg", app_dir / "rippled.cfg")
-        self.template_manager.write_template("validators.txt", app_dir / "validators.txt")
-        self.template_manager.write_template("supervisord.conf", app_dir / "supervisord.conf")
-        return app_dir
-
-    def build_container(self, app_dir, image_tag):
+        # Performance profile whose rippled settings are rendered into the image
+        self.profile = profile or get_profile()
+
+    def render_context(self):
+        """Render every build file; returns {context path: bytes}"""
+        values = self.profile.template_values()
+        return {
+            context_path: (
+                self.template_manager.render_template(template_name, strict=True, **values)
+                if template_name in PROFILE_TEMPLATES
+                else self.template_manager.render_template(template_name)
+            ).encode()
+            for template_name, context_path in BUILD_FILES.items()
+        }
+
+    def context_hash(self, files=None):
+        """SHA-256 of the rendered build context; identical contexts build identical images"""
+        files = files or self.render_context()
+        digest = hashlib.sha256()
+        for context_path in sorted(files):
+            content = files[context_path]
+            digest.update(context_path.encode() + b"\0")
+            digest.update(str(len(content)).encode() + b"\0")
+            digest.update(content)
+        return digest.hexdigest()
+
+    def build_context(self, files=None):
+        """Pack the rendered build files into an in-memory tar archive"""
+        files = files or self.render_context()
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for context_path in sorted(files):
+                content = files[context_path]
+                # Fixed metadata keeps the archive identical for identical content
+                info = tarfile.TarInfo(name=context_path)
+                info.size = len(content)
+                info.mode = 0o644
+                info.mtime = 0
+                tar.addfile(info, io.BytesIO(content))
+        buffer.seek(0)
+        return buffer
+
+    def build_container(self, image_tag, on_progress=None):
         """Build container using Docker SDK with security best practices"""
         try:
             logger.info("Building secure container image...")
-            self.docker_client.build_image(path=str(app_dir), tag=image_tag)
+            self.docker_client.build_image(image_tag, fileobj=self.build_context(), on_progress=on_progress)
         except Exception as e:
             logger.error(f"Failed to build container: {e}")
             raise
-
-    def remove_app_files(self, unique_id):
-        """Remove application files and clean up the directory"""
-        app_dir = self.base_data_dir / f"secure-app-{unique_id}"
-        try:
-            if app_dir.exists() and app_dir.is_dir():
-                for file in app_dir.iterdir():
-                    file.unlink()  # Remove each file
-                app_dir.rmdir()  # Remove the directory itself
-                logger.info(f"Application files for {unique_id} removed successfully.")
-            else:
-                logger.warning(f"Application directory {app_dir} does not exist or is not a directory.")
-        except Exception as e:
-            logger.error(f"Failed to remove application files for {unique_id}: {e}")
-            raise
\ No newline at end of file
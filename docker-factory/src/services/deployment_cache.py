@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .. import db
+from ..clients.registry import client_registry
+from ..utils.single_flight import SingleFlight
+from .cloud_run_service import CloudRunService, connection_examples
+from .repository_service import DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+DATABASE = "database"
+CLOUD_RUN = "cloud-run"
+
+
+class DeploymentInfoCache:
+    """Read-through lookup of deployment info for GET /deployments/{service_name}.
+
+    Layers, cheapest first: an in-process LRU whose entries live for
+    DEPLOYMENT_CACHE_TTL seconds, then the `deployments` row, then Cloud Run.
+    The row alone answers when the reconciler has seen the service within
+    DEPLOYMENT_STATUS_MAX_AGE seconds; otherwise Cloud Run is asked for the
+    serving revision, or for everything when the service has no row.
+    Concurrent misses for one service share a single lookup.
+
+    get_async() is the request handlers' path: it reads the row through the
+    async engine and answers a stale row as stored, refreshing the revision
+    from Cloud Run in the background instead of waiting for it.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, cloud_run_factory=None, max_status_age=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("DEPLOYMENT_CACHE_TTL", "30"))
+        self.max_status_age = (
+            max_status_age if max_status_age is not None else float(os.getenv("DEPLOYMENT_STATUS_MAX_AGE", "180"))
+        )
+        self.max_entries = max_entries or int(os.getenv("DEPLOYMENT_CACHE_SIZE", "1000"))
+        self.cloud_run_factory = cloud_run_factory or (lambda: CloudRunService(client_registry.gcp_client))
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # service name -> (info, source, stored_at)
+        self._flights = SingleFlight()
+        self._refreshing = set()
+        self._executor = None
+
+    async def get_async(self, service_name):
+        """Return (info, source, age_seconds); source is where the info was loaded from.
+
+        A stale row is returned as stored and refreshed from Cloud Run in the background.
+        """
+        cached = self._cached(service_name)
+        if cached is not None:
+            info, _, stored_at = cached
+            return info, MEMORY, time.monotonic() - stored_at
+
+        deployment = await db.get_deployment_async(service_name)
+        if deployment is None:
+            # Nothing stored to answer with; only Cloud Run knows this service
+            info, source = await asyncio.to_thread(self._flights.do, service_name, lambda: self._load(service_name))
+            return info, source, 0.0
+
+        info = self._row_info(deployment, deployment.latest_revision or deployment.status)
+        self._store(service_name, info, DATABASE)
+        if not self._is_fresh(deployment.last_seen_at) or not deployment.latest_revision:
+            self._refresh_in_background(deployment)
+        return info, DATABASE, 0.0
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def invalidate(self, service_name):
+        with self._lock:
+            self._entries.pop(service_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _cached(self, service_name):
+        with self._lock:
+            entry = self._entries.get(service_name)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self._entries.move_to_end(service_name)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def _load(self, service_name):
+        deployment = db.get_deployment(service_name)
+        if deployment is None:
+            info, source = self.cloud_run_factory().get_service_info(service_name, DEFAULT_REGION), CLOUD_RUN
+        else:
+            info, source = self._from_row(deployment), DATABASE
+
+        self._store(service_name, info, source)
+        return info, source
+
+    def _store(self, service_name, info, source):
+        with self._lock:
+            self._entries[service_name] = (info, source, time.monotonic())
+            self._entries.move_to_end(service_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh_in_background(self, deployment):
+        with self._lock:
+            if deployment.service_name in self._refreshing:
+                return
+            self._refreshing.add(deployment.service_name)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deployment-refresh")
+            executor = self._executor
+        executor.submit(self._refresh, deployment)
+
+    def _refresh(self, deployment):
+        try:
+            info = self._from_row(deployment)
+            self._store(deployment.service_name, info, DATABASE)
+        finally:
+            with self._lock:
+                self._refreshing.discard(deployment.service_name)
+
+    def _from_row(self, deployment):
+        # "status" is the serving revision, as in Cloud Run's service info
+        revision = deployment.latest_revision
+        if not self._is_fresh(deployment.last_seen_at) or not revision:
+            try:
+                revision = self.cloud_run_factory().get_service_status(deployment.service_name, DEFAULT_REGION)
+            except Exception as e:
+                # Endpoints are still valid; report what was last recorded
+                logger.warning(f"Falling back to stored status for {deployment.service_name}: {e}")
+                revision = revision or deployment.status
+        return self._row_info(deployment, revision)
+
+    def _row_info(self, deployment, revision):
+        uri = deployment.uri or deployment.rpc_endpoint.rstrip("/")
+        return {
+            "service_name": deployment.service_name,
+            "rpc_endpoint": deployment.rpc_endpoint,
+            "ws_endpoint": deployment.ws_endpoint,
+            "status": revision,
+            "state": deployment.status,
+            "last_seen_at": deployment.last_seen_at.isoformat() if deployment.last_seen_at else None,
+            "connection_examples": connection_examples(uri),
+        }
+
+    def _is_fresh(self, last_seen_at):
+        return last_seen_at is not None and (datetime.utcnow() - last_seen_at).total_seconds() < self.max_status_age
+
+
+deployment_cache = DeploymentInfoCache()
@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from ..clients.registry import client_registry
+from ..utils.metrics import DOCKER_DISK_USAGE
+
+logger = logging.getLogger(__name__)
+
+GB = 1024**3
+
+
+class DockerGarbageCollector:
+    """Background Docker disk reclamation driven by high/low watermarks.
+
+    Every DOCKER_GC_INTERVAL seconds the collector reads `docker system df`.
+    Once usage passes DOCKER_GC_HIGH_WATERMARK_GB it trims build cache (least
+    recently used first, via BuildKit's keep-storage) and then removes
+    least-recently-used images until usage is back under
+    DOCKER_GC_LOW_WATERMARK_GB. Pinned images (DOCKER_GC_PINNED, plus
+    anything pinned at runtime) and images used by containers are never removed.
+    """
+
+    def __init__(self, docker_client_factory, interval=None, high_watermark=None, low_watermark=None, pinned=None):
+        self.docker_client_factory = docker_client_factory
+        self.interval = interval if interval is not None else float(os.getenv("DOCKER_GC_INTERVAL", "60"))
+        self.high_watermark = (
+            high_watermark if high_watermark is not None else float(os.getenv("DOCKER_GC_HIGH_WATERMARK_GB", "20")) * GB
+        )
+        self.low_watermark = (
+            low_watermark if low_watermark is not None else float(os.getenv("DOCKER_GC_LOW_WATERMARK_GB", "10")) * GB
+        )
+        if pinned is None:
+            pinned = [ref for ref in os.getenv("DOCKER_GC_PINNED", "ubuntu:22.04").split(",") if ref]
+
+        self.last_usage = None
+        self._lock = threading.Lock()
+        self._pins = Counter(pinned)
+        self._last_used = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="docker-gc", daemon=True)
+            self._thread.start()
+            logger.info("Docker garbage collector started")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def pin(self, ref):
+        with self._lock:
+            self._pins[ref] += 1
+
+    def unpin(self, ref):
+        with self._lock:
+            self._pins[ref] -= 1
+            if self._pins[ref] <= 0:
+                del self._pins[ref]
+
+    def touch(self, ref):
+        """Record that an image was just used, for LRU ordering"""
+        with self._lock:
+            self._last_used[ref] = time.time()
+
+    def collect(self):
+        """Run one watermark check and eviction pass; returns bytes in use afterwards"""
+        docker_client = self.docker_client_factory()
+        usage = self._usage(docker_client.disk_usage())
+        self._record_usage(usage)
+        if usage <= self.high_watermark:
+            return usage
+
+        logger.info(f"Docker disk usage {usage / GB:.1f}GB above high watermark, collecting")
+        docker_client.prune_containers()
+
+        df = docker_client.disk_usage()
+        usage = self._usage(df)
+        build_cache = sum(entry.get("Size", 0) for entry in df.get("BuildCache") or [] if not entry.get("Shared"))
+        excess = usage - self.low_watermark
+        if excess > 0 and build_cache > 0:
+            docker_client.prune_build_cache(keep_storage=max(build_cache - excess, 0))
+            df = docker_client.disk_usage()
+            usage = self._usage(df)
+
+        for image in self._eviction_candidates(df):
+            if usage <= self.low_watermark:
+                break
+            try:
+                for tag in image.get("RepoTags") or [image["Id"]]:
+                    docker_client.remove_image(tag)
+                usage -= image.get("Size", 0) - max(image.get("SharedSize", 0), 0)
+                logger.info(f"Evicted image {image.get('RepoTags') or image['Id']}")
+            except Exception as e:
+                logger.warning(f"Failed to evict image {image['Id']}: {e}")
+
+        self._record_usage(usage)
+        logger.info(f"Docker disk usage after collection: {usage / GB:.1f}GB")
+        return usage
+
+    def _record_usage(self, usage):
+        self.last_usage = usage
+        DOCKER_DISK_USAGE.set(usage)
+
+    def _usage(self, df):
+        build_cache = sum(entry.get("Size", 0) for entry in df.get("BuildCache") or [] if not entry.get("Shared"))
+        containers = sum(container.get("SizeRw", 0) for container in df.get("Containers") or [])
+        return df.get("LayersSize", 0) + build_cache + containers
+
+    def _eviction_candidates(self, df):
+        with self._lock:
+            pins = set(self._pins)
+            last_used = dict(self._last_used)
+
+        candidates = []
+        for image in df.get("Images") or []:
+            tags = [tag for tag in image.get("RepoTags") or [] if tag != "<none>:<none>"]
+            image["RepoTags"] = tags
+            if image.get("Containers", 0) > 0 or pins.intersection(tags) or image["Id"] in pins:
+                continue
+            used_at = max([last_used.get(tag, 0) for tag in tags] + [image.get("Created", 0)])
+            candidates.append((used_at, image))
+        return [image for _, image in sorted(candidates, key=lambda item: item[0])]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logger.warning(f"Docker garbage collection failed: {e}")
+
+
+docker_gc = DockerGarbageCollector(lambda: client_registry.docker_client)
@@ -0,0 +1,72 @@
+import logging
+import threading
+
+from .. import db
+from ..utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class NodeImageCache:
+    """Index of pushed node images keyed by build-context hash and repository.
+
+    A hit returns the pushed image reference so build and push can be skipped.
+    Concurrent misses for the same key run the build only once.
+    A hit whose image was deleted from the registry is dropped and rebuilt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._flights = SingleFlight()
+
+    def lookup(self, context_hash, repository):
+        key = (context_hash, repository)
+        with self._lock:
+            image_uri = self._index.get(key)
+        if image_uri:
+            return image_uri
+
+        record = db.get_node_image(context_hash, repository)
+        if record:
+            with self._lock:
+                self._index[key] = record.image_uri
+            return record.image_uri
+        return None
+
+    def get_or_build(self, context_hash, repository, build, exists=None):
+        """Return (image_uri, cache_hit); build() must return the pushed image reference.
+
+        exists(image_uri), if given, confirms a cached image is still in the registry.
+        """
+        image_uri = self.lookup(context_hash, repository)
+        if image_uri and exists is not None and not exists(image_uri):
+            logger.warning(f"Cached node image {image_uri} is no longer in the registry, rebuilding")
+            self.invalidate(context_hash, repository)
+            image_uri = None
+        if image_uri:
+            logger.info(f"Node image cache hit for {context_hash[:12]} in {repository}")
+            return image_uri, True
+
+        def build_once():
+            # A previous flight may have finished between our lookup and now
+            image_uri = self.lookup(context_hash, repository)
+            if image_uri:
+                return image_uri, True
+
+            logger.info(f"Node image cache miss for {context_hash[:12]} in {repository}, building")
+            image_uri = build()
+            db.save_node_image(context_hash, repository, image_uri)
+            with self._lock:
+                self._index[(context_hash, repository)] = image_uri
+            return image_uri, False
+
+        return self._flights.do((context_hash, repository), build_once)
+
+    def invalidate(self, context_hash, repository):
+        with self._lock:
+            self._index.pop((context_hash, repository), None)
+        db.delete_node_image(context_hash, repository)
+
+
+node_image_cache = NodeImageCache()
@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+from datetime import datetime
+
+from google.cloud import run_v2
+
+from .. import db
+from ..clients.registry import client_registry
+from ..utils.tracing import tracer
+from .cloud_run_service import DELETED, DEPLOYING, FAILED, RUNNING, service_status
+from .deployment_cache import deployment_cache
+from .repository_service import DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+
+class CloudRunReconciler:
+    """Keeps the deployments table in sync with Cloud Run.
+
+    Each pass pages through list_services once per region in
+    CLOUD_RUN_REGIONS, diffs the result against the table, and writes status,
+    latest revision, URI and last-seen time for every tracked service in one
+    statement. Tracked services missing from Cloud Run are marked DELETED.
+
+    Passes run every CLOUD_RUN_RECONCILE_INTERVAL seconds, or every
+    CLOUD_RUN_RECONCILE_FAST_INTERVAL seconds while a service is rolling out
+    or right after nudge(). Failed passes back off up to the idle interval.
+    """
+
+    def __init__(self, gcp_client_factory, regions=None, interval=None, fast_interval=None):
+        self.gcp_client_factory = gcp_client_factory
+        if regions is None:
+            regions = [region for region in os.getenv("CLOUD_RUN_REGIONS", DEFAULT_REGION).split(",") if region]
+        self.regions = regions
+        self.interval = interval if interval is not None else float(os.getenv("CLOUD_RUN_RECONCILE_INTERVAL", "60"))
+        self.fast_interval = (
+            fast_interval if fast_interval is not None else float(os.getenv("CLOUD_RUN_RECONCILE_FAST_INTERVAL", "5"))
+        )
+
+        self.last_reconciled_at = None
+        self._delay = self.interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cloud-run-reconciler", daemon=True)
+            self._thread.start()
+            logger.info(f"Cloud Run reconciler started for {', '.join(self.regions)}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def nudge(self):
+        """Reconcile soon, e.g. after a service was created or changed"""
+        self._delay = self.fast_interval
+        self._wake.set()
+
+    def reconcile(self):
+        """Run one pass; returns the number of deployments whose state changed"""
+        tracked = {row.service_name: row for row in db.list_deployment_states()}
+        if not tracked:
+            self.last_reconciled_at = datetime.utcnow()
+            return 0
+
+        gcp_client = self.gcp_client_factory()
+        now = datetime.utcnow()
+        seen = []
+        for region in self.regions:
+            request = run_v2.ListServicesRequest(parent=f"projects/{gcp_client.project_id}/locations/{region}")
+            with tracer.span("cloud_run.list_services", region=region):
+                services = list(gcp_client.cloud_run_client.list_services(request=request))
+            for service in services:
+                service_name = service.name.rsplit("/", 1)[-1]
+                if service_name in tracked:
+                    seen.append(
+                        {
+                            "service_name": service_name,
+                            "status": service_status(service),
+                            "latest_revision": service.latest_ready_revision,
+                            "uri": service.uri,
+                            "last_seen_at": now,
+                        }
+                    )
+
+        seen_names = {row["service_name"] for row in seen}
+        missing = [
+            {"service_name": service_name, "status": DELETED} for service_name in tracked if service_name not in seen_names
+        ]
+        db.upsert_deployment_statuses(seen)
+        db.upsert_deployment_statuses(missing)
+
+        changed = [row["service_name"] for row in missing]
+        changed += [row["service_name"] for row in seen if self._changed(tracked[row["service_name"]], row)]
+        for service_name in changed:
+            deployment_cache.invalidate(service_name)
+        if changed:
+            logger.info(f"Reconciled {len(tracked)} deployments, {len(changed)} changed")
+
+        self.last_reconciled_at = now
+        self._delay = self.fast_interval if any(row["status"] == DEPLOYING for row in seen) else self.interval
+        return len(changed)
+
+    def _changed(self, current, row):
+        return (current.status, current.latest_revision, current.uri) != (row["status"], row["latest_revision"], row["uri"])
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.warning(f"Cloud Run reconciliation failed: {e}")
+                self._delay = min(max(self._delay * 2, self.fast_interval), self.interval)
+            self._wake.wait(self._delay)
+            self._wake.clear()
+
+
+cloud_run_reconciler = CloudRunReconciler(lambda: client_registry.gcp_client)
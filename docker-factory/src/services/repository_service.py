@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google.api_core.exceptions
+from google.cloud import artifactregistry_v1
+
+from ..utils.single_flight import SingleFlight
+from ..utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = "us-central1"
+
+
+class RepositoryProvisioner:
+    """Process-wide Artifact Registry repository provisioning.
+
+    Known repositories are cached for ARTIFACT_REPOSITORY_CACHE_TTL seconds, and
+    concurrent deploys for the same repository share one get/create call.
+
+    ARTIFACT_REPOSITORY_MODE=shared puts every client's images in
+    ARTIFACT_SHARED_REPOSITORY instead of one repository per client.
+    ARTIFACT_REPOSITORY_PREPROVISION=true creates repositories in the background
+    when a deployment is queued (and the shared one at startup), so deploys do
+    not wait for the create operation.
+    """
+
+    def __init__(self, mode=None, shared_repository=None, preprovision=None, ttl=None):
+        self.mode = mode or os.getenv("ARTIFACT_REPOSITORY_MODE", "per-client")
+        self.shared_repository = shared_repository or os.getenv("ARTIFACT_SHARED_REPOSITORY", "secure-app-nodes")
+        if preprovision is None:
+            preprovision = os.getenv("ARTIFACT_REPOSITORY_PREPROVISION", "false").lower() == "true"
+        self.preprovision = preprovision
+        self.ttl = ttl if ttl is not None else float(os.getenv("ARTIFACT_REPOSITORY_CACHE_TTL", "3600"))
+
+        self._lock = threading.Lock()
+        self._known = {}  # repository path -> expiry (monotonic)
+        self._flights = SingleFlight()
+        self._executor = None
+
+    def repository_name(self, client_id):
+        if self.mode == "shared":
+            return self.shared_repository
+        repo_name = client_id.split("@")[0].lower().replace("_", "-")
+        return f"secure-app-{repo_name}"
+
+    def ensure(self, gcp_client, repository_name, region=DEFAULT_REGION):
+        """Make sure the repository exists; returns its resource path"""
+        parent = f"projects/{gcp_client.project_id}/locations/{region}"
+        repository_path = f"{parent}/repositories/{repository_name}"
+        if self._is_known(repository_path):
+            return repository_path
+
+        return self._flights.do(
+            repository_path, lambda: self._get_or_create(gcp_client, parent, repository_name, repository_path)
+        )
+
+    def prefetch(self, gcp_client, client_id, region=DEFAULT_REGION):
+        """Start provisioning a client's repository off the request path (pre-provision mode only)"""
+        if not self.preprovision:
+            return None
+        return self._submit(gcp_client, self.repository_name(client_id), region)
+
+    def warm_up(self, gcp_client, region=DEFAULT_REGION):
+        """Pre-create the shared repository at startup"""
+        if self.preprovision and self.mode == "shared":
+            return self._submit(gcp_client, self.shared_repository, region)
+        return None
+
+    def invalidate(self, repository_path):
+        """Forget a repository that turned out to be missing; the next ensure() checks it again"""
+        with self._lock:
+            self._known.pop(repository_path, None)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit(self, gcp_client, repository_name, region):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="repo-provisioner")
+            executor = self._executor
+
+        def provision():
+            try:
+                return self.ensure(gcp_client, repository_name, region)
+            except Exception as e:
+                # The deploy retries on its own path
+                logger.warning(f"Background provisioning of {repository_name} failed: {e}")
+
+        return executor.submit(provision)
+
+    def _is_known(self, repository_path):
+        with self._lock:
+            expires_at = self._known.get(repository_path)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def _remember(self, repository_path):
+        with self._lock:
+            self._known[repository_path] = time.monotonic() + self.ttl
+
+    def _get_or_create(self, gcp_client, parent, repository_name, repository_path):
+        # Another caller may have finished provisioning while we waited for the flight
+        if self._is_known(repository_path):
+            return repository_path
+
+        artifact_client = gcp_client.artifact_client
+        try:
+            request = artifactregistry_v1.GetRepositoryRequest(name=repository_path)
+            with tracer.span("artifact_registry.get_repository", repository=repository_name):
+                artifact_client.get_repository(request=request)
+        except google.api_core.exceptions.NotFound:
+            logger.info(f"Repository {repository_name} not found, creating new one...")
+            repository = artifactregistry_v1.Repository()
+            repository.format_ = artifactregistry_v1.Repository.Format.DOCKER
+
+            request = artifactregistry_v1.CreateRepositoryRequest(
+                parent=parent, repository_id=repository_name, repository=repository
+            )
+            try:
+                with tracer.span("artifact_registry.create_repository", repository=repository_name):
+                    artifact_client.create_repository(request=request).result()
+            except google.api_core.exceptions.AlreadyExists:
+                logger.info(f"Repository {repository_name} was created concurrently")
+
+        self._remember(repository_path)
+        return repository_path
+
+
+repository_provisioner = RepositoryProvisioner()
@@ -1,24 +1,38 @@
 import os
+import threading
 from pathlib import Path
 from string import Template
 
 
 class TemplateManager:
+    # Parsed templates, shared by every instance; the files ship with the code
+    # and do not change while the process runs
+    _cache = {}
+    _cache_lock = threading.Lock()
+
     def __init__(self):
         self.template_dir = Path(__file__).parent
 
     def load_template(self, template_name: str) -> Template:
         """Load a template file and return a Template object."""
         template_path = self.template_dir / template_name
+        template = self._cache.get(template_path)
+        if template is not None:
+            return template
+
         if not template_path.exists():
             raise FileNotFoundError(f"Template {template_name} not found")
 
         with open(template_path, "r") as f:
-            return Template(f.read())
+            template = Template(f.read())
+        with self._cache_lock:
+            return self._cache.setdefault(template_path, template)
 
-    def render_template(self, template_name: str, **kwargs) -> str:
-        """Render a template with the given kwargs."""
+    def render_template(self, template_name: str, strict: bool = False, **kwargs) -> str:
+        """Render a template with the given kwargs; strict raises KeyError for a placeholder without a value."""
         template = self.load_template(template_name)
+        if strict:
+            return template.substitute(**kwargs)
         return template.safe_substitute(**kwargs)
 
     def write_template(self, template_name: str, output_path: Path, **kwargs):
@@ -1,12 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
+from flask_sock import Sock
 import jwt
+import json
+import websocket
 from functools import wraps
 import os
 import logging
 import sys
+import threading
+import time
 from datetime import datetime
-import requests
 from flasgger import Swagger
+from rippled_client import RippledClient
+from json_rpc import BatchRunner, MethodPolicy, parse_calls
+from ws_hub import SubscriptionHub, parse_subscription
+from token_verifier import TokenVerifier
+from health_poller import HealthPoller
+from node_metrics import AUTH_DURATION, AUTH_FAILURES, render as render_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -47,29 +57,77 @@ swagger = Swagger(app, template={
 # Rippled node connection URL
 RIPPLED_URL = "http://localhost:5005"
 
+# One pooled client per worker process, shared by its greenlets
+rippled = RippledClient(
+    RIPPLED_URL,
+    timeout=5,
+    pool_size=int(os.getenv('RIPPLED_POOL_SIZE', 16)),
+    cache_ttl=float(os.getenv('RIPPLED_CACHE_TTL', 1.0))
+)
+
 def query_rippled(method, params=None):
     """Helper function to query the rippled node."""
+    return rippled.query(method, params)
+
+# JSON-RPC passthrough: batch limits and node-wide method rules (comma-separated)
+RPC_MAX_BATCH = int(os.getenv('RPC_MAX_BATCH', 100))
+RPC_ALLOWED_METHODS = [m for m in os.getenv('RPC_ALLOWED_METHODS', '').split(',') if m] or None
+RPC_DENIED_METHODS = [m for m in os.getenv('RPC_DENIED_METHODS', '').split(',') if m]
+rpc_runner = BatchRunner(
+    query_rippled,
+    workers=int(os.getenv('RPC_BATCH_WORKERS', 32)),
+    parallelism=int(os.getenv('RPC_BATCH_PARALLELISM', 8))
+)
+
+# Auth configuration, read once when the worker starts
+JWT_SECRET = os.environ.get('JWT_SECRET')
+CLIENT_ID = os.environ.get('CLIENT_ID')
+if not JWT_SECRET:
+    logger.error("JWT_SECRET not set in environment")
+if not CLIENT_ID:
+    logger.error("CLIENT_ID not set in environment")
+token_verifier = TokenVerifier(JWT_SECRET, CLIENT_ID, max_entries=int(os.getenv('AUTH_CACHE_SIZE', 1024)))
+
+def auth_failure(reason, message, status=401):
+    AUTH_FAILURES.labels(reason).inc()
+    return jsonify({'error': message}), status
+
+def authenticate(token):
+    """
+    Verify a JWT "Bearer ..." credential; returns an error response, or None
+    and stores the token's claims in g.token_claims.
+    """
+    started = time.perf_counter()
+    result = 'rejected'
     try:
-        payload = {
-            "method": method,
-            "params": [params] if params else []
-        }
-        response = requests.post(
-            RIPPLED_URL, 
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=5
-        )
-        if response.status_code != 200:
-            logger.error(f"Rippled returned status {response.status_code}")
-            return {"error": f"Rippled error: {response.status_code}"}
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        logger.error("Failed to connect to rippled")
-        return {"error": "Rippled connection failed"}
+        if not token:
+            logger.warning("No Authorization header present")
+            return auth_failure('missing', 'Missing token')
+        if not JWT_SECRET or not CLIENT_ID:
+            return auth_failure('configuration', 'Configuration error', 500)
+
+        if not token.startswith('Bearer '):
+            logger.warning("Token doesn't start with Bearer")
+            return auth_failure('malformed', 'Invalid token')
+
+        payload, cached = token_verifier.verify(token.split(' ')[1])
+        if not cached:
+            # Logged once per token and worker rather than on every request
+            logger.info(f"Token verified for client: {payload.get('client_id')}")
+        result = 'cache_hit' if cached else 'verified'
+        g.token_claims = payload
+        return None
+    except jwt.ExpiredSignatureError:
+        logger.warning("Token expired")
+        return auth_failure('expired', 'Token expired')
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Invalid token: {str(e)}")
+        return auth_failure('invalid', 'Invalid token')
     except Exception as e:
-        logger.error(f"Error querying rippled: {str(e)}")
-        return {"error": str(e)}
+        logger.error(f"Unexpected error in auth: {str(e)}")
+        return auth_failure('error', 'Authentication error')
+    finally:
+        AUTH_DURATION.labels(result).observe(time.perf_counter() - started)
 
 def require_auth(f):
     @wraps(f)
@@ -77,51 +135,21 @@ def require_auth(f):
         """
         Decorator to require authentication using JWT.
         """
-        token = request.headers.get('Authorization')
-        if not token:
-            logger.warning("No Authorization header present")
-            return jsonify({'error': 'Missing token'}), 401
-            
-        try:
-            if not token.startswith('Bearer '):
-                logger.warning("Token doesn't start with Bearer")
-                raise jwt.InvalidTokenError
-                
-            token = token.split(' ')[1]
-            jwt_secret = os.environ.get('JWT_SECRET')
-            if not jwt_secret:
-                logger.error("JWT_SECRET not set in environment")
-                return jsonify({'error': 'Configuration error'}), 500
-                
-            payload = jwt.decode(
-                token, 
-                jwt_secret,
-                algorithms=['HS256']
-            )
-            logger.info(f"Token decoded successfully for client: {payload.get('client_id')}")
-            
-            expected_client_id = os.environ.get('CLIENT_ID')
-            if not expected_client_id:
-                logger.error("CLIENT_ID not set in environment")
-                return jsonify({'error': 'Configuration error'}), 500
-                
-            if payload['client_id'] != expected_client_id:
-                logger.warning(f"Client ID mismatch: expected {expected_client_id}, got {payload['client_id']}")
-                raise jwt.InvalidTokenError
-                
-        except jwt.ExpiredSignatureError:
-            logger.error("Token expired")
-            return jsonify({'error': 'Token expired'}), 401
-        except jwt.InvalidTokenError as e:
-            logger.error(f"Invalid token: {str(e)}")
-            return jsonify({'error': 'Invalid token'}), 401
-        except Exception as e:
-            logger.error(f"Unexpected error in auth: {str(e)}")
-            return jsonify({'error': 'Authentication error'}), 401
-            
+        error = authenticate(request.headers.get('Authorization'))
+        if error:
+            return error
         return f(*args, **kwargs)
     return decorated
 
+# Probes are answered from a snapshot that a background thread refreshes
+health_poller = HealthPoller(
+    query_rippled,
+    interval=float(os.getenv('HEALTH_POLL_INTERVAL', 2)),
+    min_peers=int(os.getenv('READY_MIN_PEERS', 1)),
+    max_load_factor=float(os.getenv('READY_MAX_LOAD_FACTOR', 256))
+)
+health_poller.start()
+
 @app.route('/health')
 def health():
     """
@@ -131,21 +159,47 @@ def health():
       200:
         description: Application health status
     """
+    return jsonify(health_poller.liveness())
+
+@app.route('/ready')
+def ready():
+    """
+    Readiness check: rippled is synced, has complete ledgers and peers, and is not overloaded.
+    ---
+    responses:
+      200:
+        description: Node is ready to serve
+      503:
+        description: Node is not ready; reasons lists why
+    """
+    body, is_ready = health_poller.readiness()
+    return jsonify(body), 200 if is_ready else 503
+
+@app.route('/', methods=['POST'])
+@require_auth
+def json_rpc():
+    """
+    JSON-RPC passthrough to rippled.
+    ---
+    description: >
+      Accepts one rippled call ({"method": ..., "params": [...], "id": ...}) or a
+      JSON array of calls, which run concurrently; results come back in request order.
+      Admin methods, and methods the token does not allow, return noPermission.
+    responses:
+      200:
+        description: rippled response, or a list of responses for a batch
+      400:
+        description: Body is not a call or a list of calls
+    """
+    body = request.get_json(silent=True)
     try:
-        rippled_status = query_rippled("server_info")
-        node_status = "healthy" if "result" in rippled_status else "rippled not responding"
-        return jsonify({
-            'status': 'healthy',
-            'rippled_status': node_status,
-            'timestamp': datetime.utcnow().isoformat()
-        })
-    except Exception as e:
-        logger.error(f"Health check error: {str(e)}")
-        return jsonify({
-            'status': 'healthy',
-            'rippled_status': 'error',
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        calls, is_batch = parse_calls(body, RPC_MAX_BATCH)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    policy = MethodPolicy.for_claims(g.token_claims, RPC_ALLOWED_METHODS, RPC_DENIED_METHODS)
+    results = rpc_runner.run(calls, policy)
+    return jsonify(results if is_batch else results[0])
 
 @app.route('/')
 @require_auth
@@ -157,8 +211,8 @@ def hello():
       200:
         description: Main API endpoint with authentication
     """
-    client_id = os.environ.get('CLIENT_ID', 'unknown')
-    logger.info(f"Successful request for client: {client_id}")
+    client_id = CLIENT_ID or 'unknown'
+    logger.debug(f"Successful request for client: {client_id}")
     server_info = query_rippled("server_info")
     return jsonify({
         'client_id': client_id,
@@ -204,6 +258,127 @@ def validators():
     validators_info = query_rippled("validators")
     return jsonify(validators_info)
 
+@app.route('/metrics')
+@require_auth
+def metrics():
+    """
+    Prometheus metrics of every API worker.
+    ---
+    responses:
+      200:
+        description: Metrics in the Prometheus text format
+    """
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+# WebSocket proxy: one upstream rippled subscription per stream and worker, shared by the worker's clients
+RIPPLED_WS_URL = "ws://127.0.0.1:6006"
+WS_MAX_ACCOUNTS = int(os.getenv('WS_MAX_ACCOUNTS', 100))
+# Each client holds two greenlets; half of the worker's connections stay free for HTTP
+WS_MAX_CLIENTS = int(os.getenv('WS_MAX_CLIENTS', int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 2000)) // 2))
+sock = Sock(app)
+ws_hub = SubscriptionHub(
+    lambda: websocket.create_connection(RIPPLED_WS_URL, enable_multithread=True),
+    max_queue=int(os.getenv('WS_QUEUE_SIZE', 256)),
+    max_dropped=int(os.getenv('WS_MAX_DROPPED', 1024)),
+    max_clients=WS_MAX_CLIENTS
+)
+
+@app.before_request
+def authenticate_websocket():
+    """WebSocket clients authenticate before the handshake; browsers may pass ?token= instead of a header"""
+    if request.path == '/ws':
+        token = request.headers.get('Authorization')
+        if not token and request.args.get('token'):
+            token = f"Bearer {request.args['token']}"
+        error = authenticate(token)
+        if error:
+            return error
+        if not ws_hub.admit():
+            logger.warning(f"Rejecting WebSocket client: {WS_MAX_CLIENTS} already connected")
+            return jsonify({'error': 'Too many WebSocket clients'}), 503
+        g.ws_slot = True
+
+@app.teardown_request
+def release_websocket_slot(exc):
+    # Runs whether or not the handshake and handler completed
+    if g.pop('ws_slot', False):
+        ws_hub.release()
+
+def handle_ws_command(text, subscriber, policy):
+    """Answer one client command: subscriptions go to the hub, anything else to rippled JSON-RPC"""
+    try:
+        command = json.loads(text)
+    except ValueError:
+        command = None
+    if not isinstance(command, dict) or not isinstance(command.get('command'), str):
+        return {'type': 'response', 'status': 'error', 'error': 'missingCommand'}
+
+    response = {'type': 'response'}
+    if 'id' in command:
+        response['id'] = command['id']
+
+    name = command['command']
+    if name in ('subscribe', 'unsubscribe'):
+        try:
+            streams, accounts = parse_subscription(command, WS_MAX_ACCOUNTS)
+        except ValueError as e:
+            response.update(status='error', error=str(e))
+            return response
+        if name == 'subscribe':
+            ws_hub.subscribe(subscriber, streams, accounts)
+        else:
+            ws_hub.unsubscribe(subscriber, streams, accounts)
+        response.update(status='success', result={})
+        return response
+
+    params = {key: value for key, value in command.items() if key not in ('command', 'id')}
+    result = rpc_runner.run([{'method': name, 'params': [params]}], policy)[0]
+    result = result.get('result', result)
+    response.update(status='error' if 'error' in result else 'success', result=result)
+    return response
+
+@sock.route('/ws')
+def ws_proxy(ws):
+    """
+    rippled-compatible WebSocket API. subscribe/unsubscribe share upstream
+    subscriptions with every other client; other commands run as JSON-RPC.
+    Clients that fall too far behind are disconnected.
+    """
+    policy = MethodPolicy.for_claims(g.token_claims, RPC_ALLOWED_METHODS, RPC_DENIED_METHODS)
+    subscriber = ws_hub.add_subscriber()
+    send_lock = threading.Lock()
+
+    def send(text):
+        with send_lock:
+            ws.send(text)
+
+    def send_messages():
+        # Blocks on the subscriber's queue; exits when the subscriber is closed
+        try:
+            subscriber.pump(send)
+        except Exception:
+            subscriber.closed.set()
+        if subscriber.dropped > subscriber.max_dropped:
+            logger.warning(f"Closing slow WebSocket client after {subscriber.dropped} dropped messages")
+            try:
+                ws.close(reason=1008, message='Too slow')
+            except Exception:
+                pass
+
+    sender = threading.Thread(target=send_messages, name='ws-sender', daemon=True)
+    sender.start()
+    try:
+        # Blocks until the client sends a command or disconnects (ConnectionClosed)
+        while not subscriber.closed.is_set():
+            text = ws.receive()
+            if text is not None:
+                send(json.dumps(handle_ws_command(text, subscriber, policy)))
+    finally:
+        ws_hub.unsubscribe(subscriber)
+        subscriber.close()
+        sender.join(timeout=5)
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8080))
     app.run(host='0.0.0.0', port=port)
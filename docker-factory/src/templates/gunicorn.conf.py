@@ -0,0 +1,82 @@
+"""
+Gunicorn settings for the node API.
+
+Worker count follows the container's CPU limit (cgroup quota, falling back to
+the host CPU count), leaving rippled its share. Workers are gevent-based, so a
+request blocked on rippled or an open WebSocket costs a greenlet rather than an
+OS thread, and one worker holds thousands of them. Timeouts fit Cloud Run: it
+closes idle connections itself and sends SIGTERM 10 seconds before killing the
+container.
+"""
+
+import math
+import os
+import shutil
+
+# Each worker writes its metrics here and /metrics adds them up; set before workers import prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """CPUs available to the container, rounded up"""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return max(1, math.ceil(int(quota) / int(period)))
+
+    quota, period = _read(CGROUP_V1_CPU_QUOTA), _read(CGROUP_V1_CPU_PERIOD)
+    if quota and period and int(quota) > 0:
+        return max(1, math.ceil(int(quota) / int(period)))
+
+    return os.cpu_count() or 1
+
+
+def default_workers(cpus):
+    # rippled runs in the same container and needs most of the CPU; the API
+    # mostly waits on it, so greenlets carry the concurrency
+    return max(2, cpus // 2)
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "gevent"
+workers = int(os.getenv("GUNICORN_WORKERS", "0")) or default_workers(cpu_limit())
+# Concurrent connections per worker, HTTP and WebSocket together
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))
+
+# Cloud Run enforces the request timeout; only kill workers that stop heartbeating
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "0"))
+# Keep connections from the Cloud Run front end open between requests
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+# Finish in-flight requests within Cloud Run's 10 second SIGTERM window
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "8"))
+
+# Worker heartbeats on tmpfs; the container filesystem can stall them
+worker_tmp_dir = "/dev/shm"
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Files left from a previous run would be counted again
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
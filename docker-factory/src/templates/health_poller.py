@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger('secure-app')
+
+# server_state values of a node that follows the network
+SYNCED_STATES = ('full', 'validating', 'proposing')
+
+
+class HealthPoller:
+    """Samples rippled's server_info in the background and answers probes from the last sample.
+
+    /health and /ready read the snapshot instead of calling rippled, so a slow
+    or stuck rippled never ties up request threads. A snapshot older than
+    `stale_after` seconds counts as rippled not responding.
+    """
+
+    def __init__(self, query, interval=2.0, stale_after=None, min_peers=1, max_load_factor=256, clock=time.time):
+        self.query = query
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else 3 * interval
+        self.min_peers = min_peers
+        self.max_load_factor = max_load_factor
+        self.clock = clock
+
+        self.snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='health-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self):
+        """Take one sample; the snapshot is replaced in one assignment, so readers need no lock"""
+        response = self.query('server_info')
+        result = response.get('result') or {}
+        info = result.get('info')
+        if info is None:
+            error = response.get('error') or result.get('error')
+            self.snapshot = {'sampled_at': self.clock(), 'reachable': False, 'error': error}
+            return self.snapshot
+
+        self.snapshot = {
+            'sampled_at': self.clock(),
+            'reachable': True,
+            'server_state': info.get('server_state'),
+            'complete_ledgers': info.get('complete_ledgers'),
+            'peers': info.get('peers', 0),
+            'load_factor': info.get('load_factor', 1),
+            'validated_ledger_seq': info.get('validated_ledger', {}).get('seq'),
+            'validated_ledger_age': info.get('validated_ledger', {}).get('age'),
+        }
+        return self.snapshot
+
+    def _fresh_snapshot(self):
+        snapshot = self.snapshot
+        if snapshot is None or self.clock() - snapshot['sampled_at'] > self.stale_after:
+            return None
+        return snapshot
+
+    def liveness(self):
+        """The API is alive whenever it can answer; rippled's state is informational"""
+        snapshot = self._fresh_snapshot()
+        return {
+            'status': 'healthy',
+            'rippled_status': 'healthy' if snapshot and snapshot['reachable'] else 'rippled not responding',
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+    def readiness(self):
+        """(body, ready): ready once rippled is synced, has ledgers and peers, and is not overloaded"""
+        snapshot = self._fresh_snapshot()
+        reasons = []
+        if snapshot is None:
+            reasons.append('no recent sample from rippled')
+        elif not snapshot['reachable']:
+            reasons.append('rippled not responding')
+        else:
+            if snapshot['server_state'] not in SYNCED_STATES:
+                reasons.append(f"server_state is {snapshot['server_state']}")
+            if not snapshot['complete_ledgers'] or snapshot['complete_ledgers'] == 'empty':
+                reasons.append('no complete ledgers')
+            if snapshot['peers'] < self.min_peers:
+                reasons.append(f"{snapshot['peers']} peers, need {self.min_peers}")
+            if snapshot['load_factor'] > self.max_load_factor:
+                reasons.append(f"load factor {snapshot['load_factor']} over {self.max_load_factor}")
+
+        body = {
+            'ready': not reasons,
+            'reasons': reasons,
+            'rippled': snapshot,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        return body, not reasons
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Health poll failed: {e}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# rippled's public API; anything else, including methods added to rippled later, is refused
+PUBLIC_METHODS = frozenset({
+    # Accounts
+    'account_channels', 'account_currencies', 'account_info', 'account_lines', 'account_nfts',
+    'account_objects', 'account_offers', 'account_tx', 'gateway_balances', 'noripple_check',
+    # Ledgers
+    'ledger', 'ledger_closed', 'ledger_current', 'ledger_data', 'ledger_entry',
+    # Transactions
+    'submit', 'submit_multisigned', 'transaction_entry', 'tx', 'tx_history',
+    # Paths, order books and other ledger objects
+    'amm_info', 'book_changes', 'book_offers', 'deposit_authorized', 'get_aggregate_price',
+    'nft_buy_offers', 'nft_sell_offers', 'ripple_path_find', 'channel_verify',
+    # Server information and utilities
+    'fee', 'manifest', 'server_definitions', 'server_info', 'server_state', 'ping', 'random', 'version',
+})
+
+
+class MethodPolicy:
+    """Which rippled methods a token may call.
+
+    Only PUBLIC_METHODS can ever be allowed. The node's RPC_ALLOWED_METHODS
+    and a token's `rpc_allow` claim narrow that set; `rpc_deny` and
+    RPC_DENIED_METHODS remove methods from it.
+    """
+
+    def __init__(self, allow=None, deny=()):
+        self.allow = PUBLIC_METHODS & frozenset(allow) if allow is not None else PUBLIC_METHODS
+        self.deny = frozenset(deny)
+
+    @classmethod
+    def for_claims(cls, claims, allow=None, deny=()):
+        if claims.get('rpc_allow') is not None:
+            token_allow = set(claims['rpc_allow'])
+            allow = token_allow if allow is None else token_allow & set(allow)
+        return cls(allow, set(deny) | set(claims.get('rpc_deny') or ()))
+
+    def permits(self, method):
+        return method in self.allow and method not in self.deny
+
+
+def parse_calls(body, max_batch):
+    """Return (calls, is_batch) for a JSON-RPC body of one call or a list of calls"""
+    if not isinstance(body, (dict, list)):
+        raise ValueError("Body must be a JSON-RPC call or a list of calls")
+    is_batch = isinstance(body, list)
+    calls = body if is_batch else [body]
+    if not calls:
+        raise ValueError("Empty batch")
+    if len(calls) > max_batch:
+        raise ValueError(f"Batch too large: {len(calls)} calls, at most {max_batch}")
+    return calls, is_batch
+
+
+def _error(call, error, message):
+    result = {'error': error, 'error_message': message, 'status': 'error'}
+    if isinstance(call, dict) and 'id' in call:
+        return {'id': call['id'], 'result': result}
+    return {'result': result}
+
+
+class BatchRunner:
+    """Runs JSON-RPC calls against rippled concurrently, answering in request order.
+
+    Worker threads are shared by all requests; each batch has at most
+    `parallelism` calls in flight so one large batch cannot take them all.
+    """
+
+    def __init__(self, query, workers=32, parallelism=8):
+        self.query = query
+        self.parallelism = parallelism
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rpc')
+
+    def run(self, calls, policy):
+        results = [None] * len(calls)
+        slots = threading.Semaphore(self.parallelism)
+        futures = []
+
+        for index, call in enumerate(calls):
+            if not isinstance(call, dict) or not isinstance(call.get('method'), str):
+                results[index] = _error(call, 'invalidParams', 'Each call needs a "method"')
+                continue
+            if not policy.permits(call['method']):
+                results[index] = _error(call, 'noPermission', f"Method {call['method']} is not allowed")
+                continue
+
+            slots.acquire()
+            future = self.executor.submit(self._call, call)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append((index, future))
+
+        for index, future in futures:
+            results[index] = future.result()
+        return results
+
+    def _call(self, call):
+        params = call.get('params') or []
+        if isinstance(params, list):
+            params = params[0] if params else None
+        response = self.query(call['method'], params)
+        if 'id' in call:
+            response = dict(response, id=call['id'])
+        return response
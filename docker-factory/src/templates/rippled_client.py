@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('secure-app')
+
+# Methods whose answers change at most once per ledger close; cached for RIPPLED_CACHE_TTL seconds
+CACHED_METHODS = ('server_info', 'server_state', 'validators')
+MAX_CACHE_ENTRIES = 256
+
+# Read-only methods where identical concurrent calls can share one answer. Anything
+# else (submit, random, ...) must reach rippled once per caller
+COALESCED_METHODS = frozenset(CACHED_METHODS) | frozenset({
+    'account_channels', 'account_currencies', 'account_info', 'account_lines', 'account_nfts',
+    'account_objects', 'account_offers', 'account_tx', 'gateway_balances', 'noripple_check',
+    'ledger', 'ledger_closed', 'ledger_current', 'ledger_data', 'ledger_entry',
+    'transaction_entry', 'tx', 'tx_history',
+    'amm_info', 'book_changes', 'book_offers', 'deposit_authorized', 'get_aggregate_price',
+    'nft_buy_offers', 'nft_sell_offers', 'ripple_path_find', 'channel_verify',
+    'fee', 'manifest', 'server_definitions', 'version',
+})
+
+
+class _Call:
+    """An in-flight rippled request that identical callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class RippledClient:
+    """JSON-RPC client for the local rippled node, shared by every thread in the process.
+
+    Requests go over a pool of keep-alive connections. Identical requests to
+    COALESCED_METHODS that arrive while one is in flight wait for its answer
+    instead of reaching rippled, and successful answers to CACHED_METHODS are
+    reused for `cache_ttl` seconds. Other methods are sent straight through.
+    """
+
+    def __init__(self, url, timeout=5, pool_size=16, cache_ttl=1.0, cached_methods=CACHED_METHODS,
+                 coalesced_methods=COALESCED_METHODS):
+        self.url = url
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cached_methods = set(cached_methods)
+        self.coalesced_methods = set(coalesced_methods) | self.cached_methods
+
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'application/json'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._cache = {}
+
+    def query(self, method, params=None):
+        """Call a rippled method; errors come back as {"error": ...} like rippled's own"""
+        if method not in self.coalesced_methods:
+            return self._post(method, params)
+
+        key = (method, json.dumps(params, sort_keys=True))
+        cacheable = method in self.cached_methods and self.cache_ttl > 0
+
+        with self._lock:
+            if cacheable:
+                cached = self._cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1]
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            return call.result
+
+        try:
+            call.result = self._post(method, params)
+            if cacheable and 'error' not in call.result:
+                with self._lock:
+                    self._store(key, call.result)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    def _store(self, key, result):
+        now = time.monotonic()
+        if len(self._cache) >= MAX_CACHE_ENTRIES:
+            self._cache = {k: entry for k, entry in self._cache.items() if entry[0] > now}
+        if len(self._cache) < MAX_CACHE_ENTRIES:
+            self._cache[key] = (now + self.cache_ttl, result)
+
+    def _post(self, method, params):
+        try:
+            payload = {
+                "method": method,
+                "params": [params] if params else []
+            }
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.error(f"Rippled returned status {response.status_code}")
+                return {"error": f"Rippled error: {response.status_code}"}
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            logger.error("Failed to connect to rippled")
+            return {"error": "Rippled connection failed"}
+        except Exception as e:
+            logger.error(f"Error querying rippled: {str(e)}")
+            return {"error": str(e)}
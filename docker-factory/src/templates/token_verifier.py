@@ -0,0 +1,55 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+
+class TokenVerifier:
+    """Verifies the node's JWTs, remembering tokens that already passed.
+
+    Verified claims are kept in an LRU of `max_entries` tokens keyed by the
+    token's SHA-256 digest, so a client reusing one token pays for the HMAC
+    check once. A cached token stops being accepted at its `exp`, exactly
+    like a fresh decode would. Rejected tokens are never cached.
+    """
+
+    def __init__(self, secret, client_id, max_entries=1024, clock=time.time):
+        self.secret = secret
+        self.client_id = client_id
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._verified = OrderedDict()
+
+    def verify(self, token):
+        """Return (claims, cached); raises jwt.ExpiredSignatureError or jwt.InvalidTokenError"""
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._verified.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at is None or self.clock() < expires_at:
+                    self._verified.move_to_end(key)
+                    self.hits += 1
+                    return claims, True
+                del self._verified[key]
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            self.misses += 1
+
+        claims = jwt.decode(token, self.secret, algorithms=['HS256'])
+        if claims.get('client_id') != self.client_id:
+            raise jwt.InvalidTokenError(f"Client ID mismatch: expected {self.client_id}, got {claims.get('client_id')}")
+
+        with self._lock:
+            self._verified[key] = (claims, claims.get('exp'))
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+        return claims, False
+
+    def __len__(self):
+        return len(self._verified)
@@ -0,0 +1,306 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger('secure-app')
+
+# rippled streams clients may subscribe to, by the "type" of the messages they carry
+STREAM_TYPES = {
+    'ledger': 'ledgerClosed',
+    'validations': 'validationReceived',
+    'manifests': 'manifestReceived',
+    'consensus': 'consensusPhase',
+    'server': 'serverStatus',
+    'book_changes': 'bookChanges',
+    'transactions': 'transaction',
+    'transactions_proposed': 'transaction',
+}
+
+
+def parse_subscription(command, max_accounts):
+    """(streams, accounts) of a subscribe/unsubscribe command; ValueError carries rippled's error code"""
+    streams = command.get('streams') or []
+    accounts = command.get('accounts') or []
+    if not isinstance(streams, list) or not all(stream in STREAM_TYPES for stream in streams):
+        raise ValueError('malformedStream')
+    if not isinstance(accounts, list) or not all(isinstance(account, str) and account for account in accounts):
+        raise ValueError('actMalformed')
+    if len(accounts) > max_accounts:
+        raise ValueError('invalidParams')
+    return streams, accounts
+
+
+# Ledger entry fields that name the accounts a transaction's metadata touches
+ACCOUNT_FIELDS = ('Account', 'Destination', 'Owner', 'Issuer', 'RegularKey')
+LIMIT_FIELDS = ('HighLimit', 'LowLimit')
+
+
+def affected_accounts(message):
+    """Accounts a transaction message touches: sender, destination and the owners of changed ledger entries"""
+    accounts = set()
+
+    def collect(fields):
+        if not isinstance(fields, dict):
+            return
+        for field in ACCOUNT_FIELDS:
+            if isinstance(fields.get(field), str):
+                accounts.add(fields[field])
+        for field in LIMIT_FIELDS:
+            limit = fields.get(field)
+            if isinstance(limit, dict) and isinstance(limit.get('issuer'), str):
+                accounts.add(limit['issuer'])
+
+    transaction = message.get('transaction')
+    if isinstance(transaction, dict):
+        for field in ('Account', 'Destination'):
+            if isinstance(transaction.get(field), str):
+                accounts.add(transaction[field])
+
+    meta = message.get('meta')
+    nodes = meta.get('AffectedNodes') if isinstance(meta, dict) else None
+    for node in nodes if isinstance(nodes, list) else ():
+        if not isinstance(node, dict):
+            continue
+        for change in node.values():
+            if isinstance(change, dict):
+                for key in ('NewFields', 'FinalFields', 'PreviousFields'):
+                    collect(change.get(key))
+    return accounts
+
+
+def stream_topic(stream):
+    return ('streams', stream)
+
+
+def account_topic(account):
+    return ('accounts', account)
+
+
+# Queued by close(); wakes the sender so it can stop
+_CLOSED = object()
+
+
+class Subscriber:
+    """One local WebSocket client: the topics it follows and a bounded queue of messages for it.
+
+    When the queue is full the oldest message is dropped; a client that has
+    dropped more than `max_dropped` messages is closed as too slow.
+    """
+
+    def __init__(self, max_queue=256, max_dropped=1024):
+        self.topics = set()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_dropped = max_dropped
+        self.dropped = 0
+        self.closed = threading.Event()
+        # Keeps offer() from dropping the close sentinel or queueing behind it
+        self._lock = threading.Lock()
+
+    def offer(self, message):
+        with self._lock:
+            while not self.closed.is_set():
+                try:
+                    self.queue.put_nowait(message)
+                    return
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    self.dropped += 1
+                    if self.dropped > self.max_dropped:
+                        self._close()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        while True:
+            try:
+                self.queue.put_nowait(_CLOSED)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        try:
+            message = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return None if message is _CLOSED else message
+
+    def pump(self, send):
+        """Send queued messages until close(); blocks between messages instead of polling"""
+        while True:
+            message = self.queue.get()
+            if message is _CLOSED:
+                return
+            send(message)
+
+
+class SubscriptionHub:
+    """Shares one upstream rippled WebSocket between all local subscribers.
+
+    Each stream or account is subscribed upstream once, when its first local
+    subscriber arrives, and unsubscribed when its last one leaves. Upstream
+    messages are routed to the subscribers of the matching topics. The
+    upstream connection starts on first use and is re-established, with all
+    current topics resubscribed, if it drops.
+    """
+
+    def __init__(self, connect, max_queue=256, max_dropped=1024, reconnect_delay=1.0, max_clients=4):
+        # connect() returns an object with send(text), recv() -> text and close()
+        self.connect = connect
+        # Every client holds a server thread, so only this many may be connected at once
+        self._slots = threading.BoundedSemaphore(max_clients)
+        self.max_queue = max_queue
+        self.max_dropped = max_dropped
+        self.reconnect_delay = reconnect_delay
+
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._topics = {}
+        self._connection = None
+        self._thread = None
+
+    def admit(self):
+        """Reserve a client slot; False when the worker already has max_clients connected"""
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    def add_subscriber(self):
+        return Subscriber(self.max_queue, self.max_dropped)
+
+    def subscribe(self, subscriber, streams=(), accounts=()):
+        topics = [stream_topic(stream) for stream in streams] + [account_topic(account) for account in accounts]
+        added = []
+        # Holding the send lock keeps upstream subscribe/unsubscribe in the same order as local changes
+        with self._send_lock:
+            with self._lock:
+                for topic in topics:
+                    subscribers = self._topics.setdefault(topic, set())
+                    if not subscribers:
+                        added.append(topic)
+                    subscribers.add(subscriber)
+                    subscriber.topics.add(topic)
+                self._start()
+            self._send_upstream('subscribe', added)
+
+    def unsubscribe(self, subscriber, streams=None, accounts=None):
+        """Drop the given topics for a subscriber, or all of them"""
+        if streams is None and accounts is None:
+            topics = list(subscriber.topics)
+        else:
+            topics = [stream_topic(stream) for stream in streams or ()]
+            topics += [account_topic(account) for account in accounts or ()]
+
+        removed = []
+        with self._send_lock:
+            with self._lock:
+                for topic in topics:
+                    subscriber.topics.discard(topic)
+                    subscribers = self._topics.get(topic)
+                    if subscribers is not None:
+                        subscribers.discard(subscriber)
+                        if not subscribers:
+                            del self._topics[topic]
+                            removed.append(topic)
+            self._send_upstream('unsubscribe', removed)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({subscriber for subscribers in self._topics.values() for subscriber in subscribers})
+
+    def dispatch(self, text):
+        """Route one upstream message to every subscriber of a matching topic"""
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+        message_type = message.get('type')
+        if message_type == 'response':
+            return
+
+        # Work out the candidate topics before taking the lock; only the lookups hold it
+        topics = [
+            stream_topic(stream) for stream, stream_type in STREAM_TYPES.items()
+            if stream_type == message_type and (stream != 'transactions' or message.get('validated', True))
+        ]
+        if message_type == 'transaction':
+            topics += [account_topic(account) for account in affected_accounts(message)]
+
+        matched = []
+        with self._lock:
+            for topic in topics:
+                subscribers = self._topics.get(topic)
+                if subscribers:
+                    matched.append(list(subscribers))
+
+        targets = {subscriber for subscribers in matched for subscriber in subscribers}
+        for subscriber in targets:
+            subscriber.offer(text)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='ws-upstream', daemon=True)
+            self._thread.start()
+
+    def _request(self, command, topics):
+        request = {'command': command}
+        streams = [name for kind, name in topics if kind == 'streams']
+        accounts = [name for kind, name in topics if kind == 'accounts']
+        if streams:
+            request['streams'] = streams
+        if accounts:
+            request['accounts'] = accounts
+        return json.dumps(request)
+
+    def _send_upstream(self, command, topics):
+        """Called with the send lock held"""
+        if not topics or self._connection is None:
+            # Without a connection, topics are subscribed on (re)connect
+            return
+        try:
+            self._connection.send(self._request(command, topics))
+        except Exception as e:
+            logger.warning(f"Failed to {command} upstream: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                connection = self.connect()
+                with self._send_lock:
+                    with self._lock:
+                        topics = list(self._topics)
+                    self._connection = connection
+                    if topics:
+                        connection.send(self._request('subscribe', topics))
+                logger.info(f"Upstream WebSocket connected with {len(topics)} subscriptions")
+                while True:
+                    text = connection.recv()
+                    if not text:
+                        raise ConnectionError("Connection closed")
+                    self.dispatch(text)
+            except Exception as e:
+                logger.warning(f"Upstream WebSocket lost: {e}")
+            with self._send_lock:
+                if self._connection is not None:
+                    try:
+                        self._connection.close()
+                    except Exception:
+                        pass
+                    self._connection = None
+            time.sleep(self.reconnect_delay)
@@ -1,11 +1,14 @@
 import logging
 
+# Installs the log record factory that adds correlation_id
+from . import tracing  # noqa: F401
+
 
 def setup_logging(name):
     logger = logging.getLogger(name)
     if not logger.handlers:
         logging.basicConfig(
             level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            format="%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s",
         )
     return logger
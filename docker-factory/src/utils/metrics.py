@@ -0,0 +1,36 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Deploy stages range from sub-second DB writes to multi-minute builds
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+)
+
+DEPLOY_STAGE_DURATION = Histogram(
+    "deploy_stage_duration_seconds",
+    "Duration of each deployment pipeline stage",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+DEPLOY_DURATION = Histogram(
+    "deploy_duration_seconds",
+    "End-to-end duration of deployments",
+    ["outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+DEPLOYS_IN_FLIGHT = Gauge("deploys_in_flight", "Deployments currently running")
+
+DEPLOY_JOBS_PENDING = Gauge("deploy_jobs_pending", "Deployment jobs queued or running")
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ["bucket"],
+)
+
+DOCKER_DISK_USAGE = Gauge("docker_disk_usage_bytes", "Docker disk usage at the last garbage collector check")
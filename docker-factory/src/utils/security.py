@@ -21,12 +21,20 @@ class SecurityUtils:
             "JWT_SECRET": self._jwt_secret,
         }
 
-    def generate_access_token(self, expiration_minutes=60):
-        """Generate JWT access token using stored secret"""
+    def generate_access_token(self, expiration_minutes=60, allow_methods=None, deny_methods=None):
+        """Generate JWT access token using stored secret.
+
+        allow_methods/deny_methods restrict the rippled methods the token may
+        call through the node's JSON-RPC endpoint.
+        """
         payload = {
             "client_id": self.client_id,
             "exp": datetime.now(timezone.utc) + timedelta(minutes=expiration_minutes),
             "iat": datetime.now(timezone.utc),
             "jti": secrets.token_hex(16),
         }
+        if allow_methods is not None:
+            payload["rpc_allow"] = list(allow_methods)
+        if deny_methods:
+            payload["rpc_deny"] = list(deny_methods)
         return jwt.encode(payload, self._jwt_secret, algorithm="HS256")
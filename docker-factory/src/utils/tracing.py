@@ -0,0 +1,339 @@
+"""
+Lightweight tracing with context-propagated correlation ids.
+
+Spans nest through a context variable, so a deploy's stages, external calls
+and DB queries share one trace. Sampling is decided once per trace
+(TRACE_SAMPLE_RATE, default 0 = off); with sampling off, span() returns a
+shared no-op context and costs one context-variable lookup.
+
+Finished spans go to the configured exporters: TRACE_JSONL_PATH appends one
+JSON object per span, TRACE_OTLP_ENDPOINT posts OTLP/HTTP JSON batches to a
+collector (e.g. http://localhost:4318).
+
+Every log record carries `correlation_id` (the deployment job or request id
+in scope), whether or not the trace is sampled.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+class correlation:
+    """Context manager that tags logs and spans in its scope with an id"""
+
+    def __init__(self, correlation_id):
+        self.correlation_id = correlation_id
+        self._token = None
+
+    def __enter__(self):
+        self._token = _correlation_id.set(self.correlation_id)
+        return self.correlation_id
+
+    def __exit__(self, exc_type, exc, tb):
+        _correlation_id.reset(self._token)
+        return False
+
+
+class Span:
+    recording = True
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    recording = False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _NoopContext:
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_CONTEXT = _NoopContext()
+
+
+class _SpanContext:
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if self.span.recording:
+            self.span.end_ns = time.time_ns()
+            if exc is not None:
+                self.span.error = f"{exc_type.__name__}: {exc}"
+            self.tracer._export(self.span)
+        return False
+
+
+class JsonlExporter:
+    """Appends finished spans to a local JSON Lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+class OtlpHttpExporter:
+    """Batches spans in the background and posts them to an OTLP/HTTP collector as JSON"""
+
+    def __init__(self, endpoint, service_name="docker-factory", max_queue=2048, batch_size=256, interval=2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Tracing must never slow down the traced code
+            pass
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._flush()
+
+    def _flush(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self._session.post(self.url, json=self.payload(batch), timeout=5)
+            except Exception as e:
+                logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def payload(self, spans):
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "docker-factory"}, "spans": [_otlp_span(span) for span in spans]}],
+                }
+            ]
+        }
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span):
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+
+class Tracer:
+    def __init__(self, sample_rate=0.0, exporters=None):
+        self.configure(sample_rate, exporters)
+
+    def configure(self, sample_rate, exporters=None):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters or [])
+
+    @classmethod
+    def from_env(cls):
+        exporters = []
+        if os.getenv("TRACE_JSONL_PATH"):
+            exporters.append(JsonlExporter(os.getenv("TRACE_JSONL_PATH")))
+        if os.getenv("TRACE_OTLP_ENDPOINT"):
+            exporters.append(OtlpHttpExporter(os.getenv("TRACE_OTLP_ENDPOINT")))
+        sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0")) if exporters else 0.0
+        return cls(sample_rate, exporters)
+
+    def span(self, name, **attributes):
+        """Context manager for a span; starts a new trace (subject to sampling) when none is active"""
+        parent = _current_span.get()
+        if parent is None:
+            if self.sample_rate <= 0:
+                return _NOOP_CONTEXT
+            if random.random() >= self.sample_rate:
+                # Remember the decision so child spans are skipped without re-sampling
+                return _SpanContext(self, NOOP_SPAN)
+            trace_id, parent_id = os.urandom(16).hex(), None
+        elif not parent.recording:
+            return _NOOP_CONTEXT
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+
+        correlation_id = _correlation_id.get()
+        if correlation_id:
+            attributes["correlation_id"] = correlation_id
+        return _SpanContext(self, Span(name, trace_id, parent_id, attributes))
+
+    def child_span(self, name, **attributes):
+        """Like span(), but never starts a trace of its own"""
+        parent = _current_span.get()
+        if parent is None or not parent.recording:
+            return _NOOP_CONTEXT
+        return self.span(name, **attributes)
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+    def _export(self, span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span exporter failed: {e}")
+
+
+tracer = Tracer.from_env()
+
+
+def traced(name, **attributes):
+    """Decorator that wraps each call in a span"""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_engine(engine):
+    """Record a db.query span for every statement run inside a sampled trace"""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span_context = tracer.child_span("db.query", statement=statement.split(None, 1)[0].upper())
+        span_context.__enter__()
+        conn.info.setdefault("trace_spans", []).append(span_context)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().__exit__(None, None, None)
+
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            error = exception_context.original_exception
+            spans.pop().__exit__(type(error), error, None)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def run_in_context(executor, fn, *args):
+    """executor.submit() that carries the caller's trace and correlation id into the worker thread"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+_record_factory = logging.getLogRecordFactory()
+
+
+def _record_with_correlation(*args, **kwargs):
+    record = _record_factory(*args, **kwargs)
+    record.correlation_id = _correlation_id.get() or "-"
+    return record
+
+
+logging.setLogRecordFactory(_record_with_correlation)
@@ -0,0 +1,18 @@
+import atexit
+import contextlib
+import os
+import tempfile
+
+# Run the suite against a throwaway SQLite database instead of Postgres,
+# removed again when the test process exits
+if not os.getenv("DATABASE_URL"):
+    TEST_DATABASE = os.path.join(tempfile.gettempdir(), f"docker-factory-tests-{os.getpid()}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DATABASE}"
+
+    @atexit.register
+    def _remove_test_database():
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(TEST_DATABASE)
+
+# Modules of the node image (src/templates) import each other by bare name, as they do in /app
+NODE_TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "templates")
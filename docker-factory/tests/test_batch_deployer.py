@@ -0,0 +1,107 @@
+import itertools
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from src import db
+from src.batch_deployer import BatchDeployer
+from src.services.repository_service import repository_provisioner
+
+
+class FakeManager:
+    images_resolved = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+    ids = itertools.count()
+
+    def __init__(self, client_id, repository_name=None, profile=None):
+        self.client_id = client_id
+        self.repository_name = repository_name
+        self.service_name = f"secure-app-{client_id}-{next(FakeManager.ids)}"
+
+    def resolve_image(self):
+        FakeManager.images_resolved += 1
+        if self.repository_name == "secure-app-no-push":
+            raise RuntimeError("push denied")
+        return f"{self.repository_name}/secure-app@sha256:abc", False
+
+    def create_service(self, image_uri):
+        with FakeManager.lock:
+            FakeManager.active += 1
+            FakeManager.max_active = max(FakeManager.max_active, FakeManager.active)
+        try:
+            time.sleep(0.05)
+            if self.client_id == "broken":
+                raise RuntimeError("quota exceeded")
+            return {"service_name": self.service_name, "image_tag": image_uri, "access_token": "token"}
+        finally:
+            with FakeManager.lock:
+                FakeManager.active -= 1
+
+
+class TestBatchDeployer(unittest.TestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.Base.metadata.create_all(bind=db.engine)
+        FakeManager.images_resolved = 0
+        FakeManager.max_active = 0
+
+    def test_builds_once_and_bounds_parallelism(self):
+        result = BatchDeployer(manager_factory=FakeManager, max_parallel=3).deploy(["alice"] * 9)
+
+        self.assertEqual(FakeManager.images_resolved, 1)
+        self.assertEqual(FakeManager.max_active, 3)
+        self.assertEqual(result["succeeded"], 9)
+        self.assertEqual(len(db.list_deployments("alice")), 9)
+        self.assertTrue(all(r["deployment"]["image_tag"] == result["images"][0]["image_tag"] for r in result["results"]))
+
+    def test_resolves_one_image_per_repository(self):
+        with patch.object(repository_provisioner, "mode", "per-client"):
+            result = BatchDeployer(manager_factory=FakeManager).deploy(["alice", "bob", "alice"])
+        self.assertEqual(FakeManager.images_resolved, 2)
+        self.assertEqual([image["repository"] for image in result["images"]], ["secure-app-alice", "secure-app-bob"])
+        self.assertTrue(result["results"][1]["deployment"]["image_tag"].startswith("secure-app-bob/"))
+
+        FakeManager.images_resolved = 0
+        with patch.object(repository_provisioner, "mode", "shared"):
+            result = BatchDeployer(manager_factory=FakeManager).deploy(["alice", "bob"])
+        self.assertEqual(FakeManager.images_resolved, 1)
+        self.assertEqual([image["repository"] for image in result["images"]], [repository_provisioner.shared_repository])
+
+    def test_image_failure_fails_only_its_repository(self):
+        with patch.object(repository_provisioner, "mode", "per-client"):
+            result = BatchDeployer(manager_factory=FakeManager).deploy(["alice", "no-push", "bob"])
+
+        self.assertEqual([r["status"] for r in result["results"]], ["succeeded", "failed", "succeeded"])
+        self.assertIn("push denied", result["results"][1]["error"])
+        self.assertEqual({image["repository"]: image["error"] for image in result["images"]}["secure-app-no-push"], "push denied")
+        self.assertEqual(len(db.list_deployments("bob")), 1)
+
+    def test_reports_stages_and_node_progress(self):
+        stages, progress = [], []
+        deployer = BatchDeployer(
+            manager_factory=FakeManager,
+            on_stage=lambda stage, event, elapsed: stages.append((stage, event)),
+            on_progress=lambda kind, data: progress.append((kind, data["client_id"], data["status"])),
+        )
+        deployer.deploy(["alice", "broken"])
+
+        self.assertEqual(
+            stages,
+            [("image", "started"), ("image", "completed"), ("services", "started"), ("services", "completed")],
+        )
+        self.assertEqual(sorted(progress), [("node", "alice", "succeeded"), ("node", "broken", "failed")])
+
+    def test_partial_failure_keeps_successful_nodes(self):
+        result = BatchDeployer(manager_factory=FakeManager).deploy(["alice", "broken", "bob"])
+
+        self.assertEqual((result["succeeded"], result["failed"]), (2, 1))
+        self.assertEqual([r["status"] for r in result["results"]], ["succeeded", "failed", "succeeded"])
+        self.assertEqual(result["results"][1]["error"], "quota exceeded")
+        self.assertEqual(len(db.list_deployments("broken")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
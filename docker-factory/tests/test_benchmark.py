@@ -0,0 +1,39 @@
+import unittest
+
+from benchmarks.deploy_benchmark import find_regressions, percentile, run_benchmark
+from benchmarks.fakes import Latencies
+
+
+class TestDeployBenchmark(unittest.TestCase):
+    def test_runs_the_pipeline_against_fakes(self):
+        latencies = Latencies(build=0, push=0, api=0, repository_create=0, service_create=0.01)
+        report = run_benchmark([1, 2], 2, latencies)
+
+        self.assertEqual([level["concurrency"] for level in report["levels"]], [1, 2])
+        for level in report["levels"]:
+            self.assertEqual(level["errors"], 0)
+            self.assertGreater(level["deploys_per_minute"], 0)
+            self.assertEqual(level["docker_builds"], 1)
+            self.assertIn("cloud_run_ready", level["stages"])
+
+    def test_warm_scenario_skips_build_and_push(self):
+        latencies = Latencies(build=0, push=0, api=0, repository_create=0, service_create=0)
+        level = run_benchmark([2], 4, latencies, scenario="warm")["levels"][0]
+
+        self.assertEqual(level["docker_pushes"], 1)
+        self.assertNotIn("push", level["stages"])
+
+    def test_regressions_are_flagged(self):
+        def report(p95, throughput):
+            return {"levels": [{"concurrency": 4, "latency": {"p95": p95}, "deploys_per_minute": throughput}]}
+
+        self.assertEqual(find_regressions(report(1.1, 100), report(1.0, 100), 0.2), [])
+        self.assertEqual(len(find_regressions(report(1.5, 70), report(1.0, 100), 0.2)), 2)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 99)), (50, 99))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.clients.registry import ClientRegistry
+
+
+class TestClientRegistry(unittest.TestCase):
+    @patch("src.clients.gcp_client.GCPClient")
+    def test_gcp_client_is_built_once_across_threads(self, mock_gcp):
+        registry = ClientRegistry()
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(registry.gcp_client)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_gcp.assert_called_once_with()
+        self.assertTrue(all(client is seen[0] for client in seen))
+
+    @patch("src.clients.docker_client.DockerClient")
+    @patch("src.clients.gcp_client.GCPClient")
+    def test_close_releases_and_resets_clients(self, mock_gcp, mock_docker):
+        registry = ClientRegistry()
+        gcp, docker = registry.gcp_client, registry.docker_client
+
+        registry.close()
+
+        gcp.close.assert_called_once_with()
+        docker.close.assert_called_once_with()
+        registry.gcp_client
+        self.assertEqual(mock_gcp.call_count, 2)
+
+    def test_close_without_clients_is_noop(self):
+        ClientRegistry().close()
+
+
+if __name__ == "__main__":
+    unittest.main()
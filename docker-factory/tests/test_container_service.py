@@ -0,0 +1,50 @@
+import tarfile
+import unittest
+from unittest.mock import Mock
+
+from src.services.container_service import BUILD_FILES, ContainerService
+from src.templates import TemplateManager
+
+
+class TestContainerService(unittest.TestCase):
+    def test_build_context_is_an_in_memory_tar_of_rendered_templates(self):
+        service = ContainerService(docker_client=None)
+        with tarfile.open(fileobj=service.build_context()) as tar:
+            self.assertEqual(sorted(tar.getnames()), sorted(BUILD_FILES.values()))
+            dockerfile = tar.extractfile("Dockerfile").read().decode()
+        self.assertEqual(dockerfile, TemplateManager().render_template("dockerfile"))
+
+    def test_build_context_is_deterministic(self):
+        service = ContainerService(docker_client=None)
+        self.assertEqual(service.build_context().getvalue(), service.build_context().getvalue())
+
+    def test_build_container_streams_context_to_docker(self):
+        docker_client = Mock()
+        ContainerService(docker_client).build_container("secure-app:abc")
+
+        tag = docker_client.build_image.call_args.args[0]
+        fileobj = docker_client.build_image.call_args.kwargs["fileobj"]
+        self.assertEqual(tag, "secure-app:abc")
+        self.assertTrue(tarfile.is_tarfile(fileobj))
+
+    def test_profile_values_render_only_into_rippled_cfg(self):
+        template_manager = Mock(wraps=TemplateManager())
+        service = ContainerService(docker_client=None)
+        service.template_manager = template_manager
+        files = service.render_context()
+
+        self.assertNotIn("${", files["rippled.cfg"].decode())
+        profiled = [call.args[0] for call in template_manager.render_template.call_args_list if call.kwargs]
+        self.assertEqual(profiled, ["rippled.cfg"])
+
+    def test_strict_render_rejects_missing_values(self):
+        with self.assertRaises(KeyError):
+            TemplateManager().render_template("rippled.cfg", strict=True, node_size="small")
+
+    def test_templates_are_parsed_once(self):
+        first = TemplateManager().load_template("rippled.cfg")
+        self.assertIs(first, TemplateManager().load_template("rippled.cfg"))
+
+
+if __name__ == "__main__":
+    unittest.main()
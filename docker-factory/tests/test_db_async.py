@@ -0,0 +1,81 @@
+import unittest
+
+from sqlalchemy import event
+
+from src import db
+
+
+def deployment(service_name):
+    return {
+        "service_name": service_name,
+        "rpc_endpoint": f"https://{service_name}.a.run.app/",
+        "ws_endpoint": f"wss://{service_name}.a.run.app/ws",
+    }
+
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        await db.startup()
+
+    async def asyncTearDown(self):
+        # Pooled connections belong to this test's event loop
+        await db.async_engine.dispose()
+
+    async def test_deployments_are_readable_from_handlers(self):
+        db.save_deployments([(deployment(f"node-{i}"), "alice") for i in range(5)])
+
+        row = await db.get_deployment_async("node-3")
+        self.assertEqual((row.client_id, row.status), ("alice", "RUNNING"))
+        rows, next_cursor = await db.list_deployments_page_async(client_id="alice", limit=3)
+        self.assertEqual(len(rows), 3)
+        self.assertIsNotNone(next_cursor)
+
+    async def test_jobs_are_readable_from_handlers(self):
+        db.save_job("job-1", "alice", "QUEUED")
+
+        job = await db.get_job_async("job-1")
+        self.assertEqual(job.status, "QUEUED")
+        self.assertEqual([job.id for job in await db.list_jobs_async(client_id="alice")], ["job-1"])
+        self.assertIsNone(await db.get_job_async("missing"))
+
+
+class TestSyncBulkWrites(unittest.TestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.init_db()
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self.record)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self.record)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("INSERT", "UPDATE")):
+            self.statements.append(statement)
+
+    def test_fleet_writes_are_one_statement(self):
+        db.save_deployments([(deployment(f"node-{i}"), "alice") for i in range(3)])
+        db.upsert_deployment_statuses([{"service_name": f"node-{i}", "status": "STOPPED"} for i in range(3)])
+
+        self.assertEqual(len(self.statements), 2)
+        row = db.get_deployment("node-1")
+        self.assertEqual((row.status, row.rpc_endpoint), ("STOPPED", "https://node-1.a.run.app/"))
+
+    def test_upsert_updates_existing_rows(self):
+        db.save_deployments([(deployment("node-1"), "alice")])
+        db.upsert_deployment_statuses([{"service_name": "node-1", "status": "FAILED"}])
+        self.assertEqual(db.get_deployment("node-1").status, "FAILED")
+
+    def test_status_comes_from_deployment_info_and_survives_redeploy(self):
+        db.save_deployment({**deployment("node-1"), "state": "DEPLOYING"}, "alice")
+        self.assertEqual(db.get_deployment("node-1").status, "DEPLOYING")
+
+        db.upsert_deployment_statuses([{"service_name": "node-1", "status": "FAILED"}])
+        db.save_deployment({**deployment("node-1"), "state": "RUNNING", "image_tag": "repo/app@sha256:new"}, "alice")
+        row = db.get_deployment("node-1")
+        self.assertEqual((row.status, row.image_tag), ("FAILED", "repo/app@sha256:new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock
+
+from src import db
+from src.services.cloud_run_service import CloudRunService
+from src.services.deployment_cache import CLOUD_RUN, DATABASE, MEMORY, DeploymentInfoCache
+
+
+class TestDeploymentInfoCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        await db.startup()
+        self.release = threading.Event()
+        self.cloud_run = CloudRunService(Mock(project_id="project"))
+        self.cloud_run.get_service_status = Mock(side_effect=lambda *args: self.release.wait(5) and "rev-2")
+        self.cloud_run.get_service_info = Mock(return_value={"service_name": "legacy", "status": "rev-1"})
+        self.cache = DeploymentInfoCache(ttl=60, max_entries=2, cloud_run_factory=lambda: self.cloud_run)
+
+    async def asyncTearDown(self):
+        self.release.set()
+        self.cache.shutdown()
+        await db.async_engine.dispose()
+
+    def save(self, service_name):
+        db.save_deployment(
+            {
+                "service_name": service_name,
+                "rpc_endpoint": f"https://{service_name}.a.run.app/",
+                "ws_endpoint": f"wss://{service_name}.a.run.app/ws",
+            },
+            "alice",
+        )
+
+    async def wait_for_refresh(self, service_name):
+        for _ in range(200):
+            if service_name not in self.cache._refreshing:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{service_name} was not refreshed")
+
+    async def test_row_is_used_and_then_served_from_memory(self):
+        self.save("node-1")
+
+        info, source, _ = await self.cache.get_async("node-1")
+        self.assertEqual(source, DATABASE)
+        self.assertEqual(info["rpc_endpoint"], "https://node-1.a.run.app/")
+        self.assertIn("https://node-1.a.run.app/", info["connection_examples"]["curl"])
+
+        _, source, _ = await self.cache.get_async("node-1")
+        self.assertEqual(source, MEMORY)
+        self.cloud_run.get_service_info.assert_not_called()
+
+    async def test_stale_row_is_answered_as_stored_and_refreshed_in_background(self):
+        self.save("node-1")
+
+        info, source, _ = await self.cache.get_async("node-1")
+        self.assertEqual((info["status"], source), ("RUNNING", DATABASE))
+
+        self.release.set()
+        await self.wait_for_refresh("node-1")
+        info, source, _ = await self.cache.get_async("node-1")
+        self.assertEqual((info["status"], source), ("rev-2", MEMORY))
+        self.assertEqual(self.cloud_run.get_service_status.call_count, 1)
+
+    async def test_stored_status_is_kept_when_cloud_run_fails(self):
+        self.save("node-1")
+        self.cloud_run.get_service_status = Mock(side_effect=RuntimeError("unavailable"))
+
+        await self.cache.get_async("node-1")
+        await self.wait_for_refresh("node-1")
+
+        info, _, _ = await self.cache.get_async("node-1")
+        self.assertEqual(info["status"], "RUNNING")
+
+    async def test_unknown_service_falls_through_to_cloud_run(self):
+        info, source, _ = await self.cache.get_async("legacy")
+        self.assertEqual((info["status"], source), ("rev-1", CLOUD_RUN))
+
+    async def test_invalidate_and_lru_eviction(self):
+        for name in ("node-1", "node-2", "node-3"):
+            self.save(name)
+            await self.cache.get_async(name)
+
+        self.assertEqual((await self.cache.get_async("node-1"))[1], DATABASE)
+        self.cache.invalidate("node-1")
+        self.assertEqual((await self.cache.get_async("node-1"))[1], DATABASE)
+        self.assertEqual((await self.cache.get_async("node-1"))[1], MEMORY)
+
+    async def test_expired_entries_are_reloaded(self):
+        self.save("node-1")
+        cache = DeploymentInfoCache(ttl=0, cloud_run_factory=lambda: self.cloud_run)
+        await cache.get_async("node-1")
+        self.assertEqual((await cache.get_async("node-1"))[1], DATABASE)
+        self.release.set()
+        cache.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
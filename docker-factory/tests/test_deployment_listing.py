@@ -0,0 +1,71 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src import db
+
+
+class TestDeploymentListing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.init_db()
+
+        created = datetime(2024, 1, 1)
+        with db.get_db() as session:
+            for i in range(7):
+                session.add(
+                    db.Deployment(
+                        service_name=f"node-{i}",
+                        client_id="alice" if i % 2 == 0 else "bob",
+                        status="RUNNING",
+                        rpc_endpoint=f"https://node-{i}.a.run.app/",
+                        ws_endpoint=f"wss://node-{i}.a.run.app/ws",
+                        # Two rows share a timestamp so the id breaks the tie
+                        created_at=created + timedelta(minutes=min(i, 5)),
+                    )
+                )
+            session.commit()
+
+    async def asyncTearDown(self):
+        await db.async_engine.dispose()
+
+    async def collect_pages(self, **filters):
+        names, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = await db.list_deployments_page_async(cursor=cursor, limit=2, **filters)
+            names.extend(row.service_name for row in rows)
+            pages += 1
+            if cursor is None:
+                return names, pages
+
+    async def test_pages_cover_every_row_newest_first(self):
+        names, pages = await self.collect_pages()
+        self.assertEqual(names, [f"node-{i}" for i in reversed(range(7))])
+        self.assertEqual(pages, 4)
+
+    async def test_filters_by_client(self):
+        names, _ = await self.collect_pages(client_id="alice")
+        self.assertEqual(names, ["node-6", "node-4", "node-2", "node-0"])
+
+    async def test_rows_are_projected(self):
+        rows, _ = await db.list_deployments_page_async(limit=1)
+        self.assertNotIn("access_token", rows[0]._fields)
+
+    async def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            await db.list_deployments_page_async(cursor="not-a-cursor")
+
+    def test_client_pages_use_the_composite_index(self):
+        with db.engine.connect() as connection:
+            plan = connection.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT service_name FROM deployments WHERE client_id = 'alice' "
+                    "ORDER BY created_at DESC, id DESC LIMIT 3"
+                )
+            ).fetchall()
+        self.assertIn("ix_deployments_client_created_id", " ".join(str(row) for row in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from src.services.docker_gc_service import GB, DockerGarbageCollector
+
+
+class FakeDocker:
+    def __init__(self, images, build_cache):
+        self.images = images
+        self.build_cache = build_cache
+        self.removed = []
+        self.keep_storage = None
+
+    def disk_usage(self):
+        return {
+            "LayersSize": sum(image["Size"] for image in self.images),
+            "Images": [dict(image) for image in self.images],
+            "BuildCache": [{"Size": self.build_cache, "Shared": False}],
+            "Containers": [],
+        }
+
+    def prune_containers(self):
+        pass
+
+    def prune_build_cache(self, keep_storage=None):
+        self.keep_storage = keep_storage
+        self.build_cache = keep_storage
+
+    def remove_image(self, ref):
+        self.removed.append(ref)
+        self.images = [image for image in self.images if ref not in image["RepoTags"]]
+
+
+def image(tag, size_gb, created, containers=0):
+    return {"Id": f"sha256:{tag}", "RepoTags": [tag], "Size": size_gb * GB, "Created": created, "Containers": containers}
+
+
+class TestDockerGarbageCollector(unittest.TestCase):
+    def collector(self, docker, pinned=()):
+        return DockerGarbageCollector(
+            lambda: docker, interval=60, high_watermark=10 * GB, low_watermark=5 * GB, pinned=list(pinned)
+        )
+
+    def test_below_high_watermark_does_nothing(self):
+        docker = FakeDocker([image("a:1", 4, created=1)], build_cache=2 * GB)
+        self.collector(docker).collect()
+        self.assertIsNone(docker.keep_storage)
+        self.assertEqual(docker.removed, [])
+
+    def test_trims_build_cache_before_images(self):
+        docker = FakeDocker([image("a:1", 4, created=1)], build_cache=8 * GB)
+        usage = self.collector(docker).collect()
+        self.assertEqual(docker.keep_storage, 1 * GB)
+        self.assertEqual(docker.removed, [])
+        self.assertEqual(usage, 5 * GB)
+
+    def test_evicts_least_recently_used_unpinned_images(self):
+        docker = FakeDocker(
+            [
+                image("ubuntu:22.04", 3, created=1),
+                image("old:1", 3, created=2),
+                image("busy:1", 3, created=3, containers=1),
+                image("recent:1", 3, created=4),
+            ],
+            build_cache=0,
+        )
+        collector = self.collector(docker, pinned=["ubuntu:22.04"])
+        collector.touch("old:1")
+
+        collector.collect()
+
+        self.assertEqual(docker.removed, ["recent:1", "old:1"])
+
+    def test_runtime_pins_are_reference_counted(self):
+        docker = FakeDocker([image("node:1", 12, created=1)], build_cache=0)
+        collector = self.collector(docker)
+        collector.pin("node:1")
+        collector.pin("node:1")
+        collector.unpin("node:1")
+
+        collector.collect()
+        self.assertEqual(docker.removed, [])
+
+        collector.unpin("node:1")
+        collector.collect()
+        self.assertEqual(docker.removed, ["node:1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+
+from . import NODE_TEMPLATES
+
+sys.path.insert(0, NODE_TEMPLATES)
+from health_poller import HealthPoller  # noqa: E402
+
+
+def server_info(**overrides):
+    info = {
+        "server_state": "full",
+        "complete_ledgers": "1000-2000",
+        "peers": 10,
+        "load_factor": 1,
+        "validated_ledger": {"seq": 2000, "age": 2},
+    }
+    info.update(overrides)
+    return {"result": {"info": info, "status": "success"}}
+
+
+class TestHealthPoller(unittest.TestCase):
+    def setUp(self):
+        self.now = [1000.0]
+        self.response = server_info()
+        self.calls = 0
+
+        def query(method):
+            self.calls += 1
+            return self.response
+
+        self.poller = HealthPoller(query, interval=2, min_peers=3, max_load_factor=100, clock=lambda: self.now[0])
+
+    def test_probes_do_not_call_rippled(self):
+        self.poller.poll()
+        for _ in range(10):
+            self.poller.liveness()
+            self.poller.readiness()
+        self.assertEqual(self.calls, 1)
+
+    def test_synced_node_is_ready(self):
+        self.poller.poll()
+        body, ready = self.poller.readiness()
+        self.assertTrue(ready)
+        self.assertEqual(body["rippled"]["validated_ledger_seq"], 2000)
+        self.assertEqual(self.poller.liveness()["rippled_status"], "healthy")
+
+    def test_not_ready_reasons(self):
+        self.response = server_info(server_state="syncing", complete_ledgers="empty", peers=1, load_factor=500)
+        self.poller.poll()
+        body, ready = self.poller.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(len(body["reasons"]), 4)
+
+    def test_unreachable_rippled(self):
+        self.response = {"error": "Rippled connection failed"}
+        self.poller.poll()
+        body, ready = self.poller.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(body["reasons"], ["rippled not responding"])
+        liveness = self.poller.liveness()
+        self.assertEqual((liveness["status"], liveness["rippled_status"]), ("healthy", "rippled not responding"))
+
+    def test_stale_snapshot_is_not_ready(self):
+        self.assertFalse(self.poller.readiness()[1])
+        self.poller.poll()
+        self.now[0] += 7
+        body, ready = self.poller.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(body["reasons"], ["no recent sample from rippled"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import google.api_core.exceptions
+
+from src import db
+from src.services.artifact_service import ArtifactService
+from src.services.container_service import ContainerService
+from src.services.image_cache import NodeImageCache
+
+
+class TestNodeImageCache(unittest.TestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.Base.metadata.create_all(bind=db.engine)
+        self.cache = NodeImageCache()
+
+    def test_hit_skips_build(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return "repo/secure-app@sha256:abc"
+
+        self.assertEqual(self.cache.get_or_build("h1", "repo", build), ("repo/secure-app@sha256:abc", False))
+        self.assertEqual(self.cache.get_or_build("h1", "repo", build), ("repo/secure-app@sha256:abc", True))
+        self.assertEqual(len(builds), 1)
+
+    def test_index_survives_process_restart(self):
+        self.cache.get_or_build("h1", "repo", lambda: "repo/secure-app@sha256:abc")
+        self.assertEqual(NodeImageCache().lookup("h1", "repo"), "repo/secure-app@sha256:abc")
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return "repo/secure-app@sha256:abc"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_build("h1", "repo", build)[0]))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, ["repo/secure-app@sha256:abc"] * 8)
+
+    def test_failed_build_is_not_cached(self):
+        def build():
+            raise RuntimeError("push failed")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_build("h1", "repo", build)
+        self.assertIsNone(self.cache.lookup("h1", "repo"))
+
+    def test_deleted_image_is_rebuilt(self):
+        images = iter(["repo/secure-app@sha256:abc", "repo/secure-app@sha256:def"])
+        self.cache.get_or_build("h1", "repo", lambda: next(images))
+
+        result = self.cache.get_or_build("h1", "repo", lambda: next(images), exists=lambda image_uri: False)
+
+        self.assertEqual(result, ("repo/secure-app@sha256:def", False))
+        self.assertEqual(NodeImageCache().lookup("h1", "repo"), "repo/secure-app@sha256:def")
+
+    def test_existing_image_is_a_hit(self):
+        self.cache.get_or_build("h1", "repo", lambda: "repo/secure-app@sha256:abc")
+        checked = []
+
+        def exists(image_uri):
+            checked.append(image_uri)
+            return True
+
+        result = self.cache.get_or_build("h1", "repo", lambda: "unused", exists=exists)
+
+        self.assertEqual(result, ("repo/secure-app@sha256:abc", True))
+        self.assertEqual(checked, ["repo/secure-app@sha256:abc"])
+
+
+class TestImageExists(unittest.TestCase):
+    def setUp(self):
+        self.gcp_client = Mock(project_id="project")
+        self.service = ArtifactService(self.gcp_client, docker_client=None)
+
+    def test_digest_reference_is_looked_up(self):
+        self.assertTrue(self.service.image_exists("us-central1-docker.pkg.dev/project/repo/secure-app@sha256:abc"))
+        request = self.gcp_client.artifact_client.get_docker_image.call_args.kwargs["request"]
+        self.assertEqual(
+            request.name,
+            "projects/project/locations/us-central1/repositories/repo/dockerImages/secure-app@sha256:abc",
+        )
+
+    def test_not_found_is_missing(self):
+        self.gcp_client.artifact_client.get_tag.side_effect = google.api_core.exceptions.NotFound("gone")
+        with patch("src.services.artifact_service.repository_provisioner") as provisioner:
+            self.assertFalse(self.service.image_exists("us-central1-docker.pkg.dev/project/repo/secure-app:h1"))
+        provisioner.invalidate.assert_called_once_with("projects/project/locations/us-central1/repositories/repo")
+
+    def test_failed_push_forgets_repository(self):
+        self.service.docker_client = Mock()
+        self.service.docker_client.push_image.side_effect = RuntimeError("name unknown: repository not found")
+        with patch("src.services.artifact_service.repository_provisioner") as provisioner:
+            with self.assertRaises(RuntimeError):
+                self.service.push_to_registry("repo/secure-app:h1", "us-central1-docker.pkg.dev", repository_path="repo")
+        provisioner.invalidate.assert_called_once_with("repo")
+
+    def test_other_errors_assume_present(self):
+        self.gcp_client.artifact_client.get_docker_image.side_effect = RuntimeError("unavailable")
+        self.assertTrue(self.service.image_exists("us-central1-docker.pkg.dev/project/repo/secure-app@sha256:abc"))
+
+
+class TestContextHash(unittest.TestCase):
+    def test_hash_is_stable_and_content_addressed(self):
+        service = ContainerService(docker_client=None)
+        first = service.context_hash()
+        self.assertEqual(first, service.context_hash())
+        self.assertEqual(len(first), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from api.routes.deployments import _job_event_stream
+from src.job_events import JobEventBus, JobEventLog
+
+
+def fake_job(job_id):
+    return SimpleNamespace(
+        id=job_id, client_id="acme", profile=None, batch=None, status="RUNNING", stage="build", stages=[], result=None, error=None,
+        created_at=datetime(2024, 1, 1), started_at=None, finished_at=None,
+    )
+
+
+class TestJobEventLog(unittest.TestCase):
+    def test_buffer_is_bounded_and_reports_dropped_events(self):
+        log = JobEventLog(maxlen=3)
+        for i in range(5):
+            log.publish("build", f"line {i}")
+
+        events, dropped = log.since(0)
+        self.assertEqual([event["data"] for event in events], ["line 2", "line 3", "line 4"])
+        self.assertEqual(dropped, 2)
+        self.assertEqual(log.since(4), ([events[-1]], 0))
+
+    def test_publish_from_worker_thread_wakes_async_subscriber(self):
+        log = JobEventLog(maxlen=10)
+
+        async def subscribe():
+            threading.Timer(0.05, log.publish, args=("stage", {"name": "build"})).start()
+            await log.wait(0, timeout=5)
+            return log.since(0)[0]
+
+        events = asyncio.run(subscribe())
+        self.assertEqual(events[0]["data"], {"name": "build"})
+
+    def test_bus_retains_only_recent_finished_jobs(self):
+        bus = JobEventBus(buffer_size=10, retained=2)
+        for job_id in ("a", "b", "c"):
+            bus.publish(job_id, "status", {})
+            bus.close(job_id)
+        bus.publish("running", "status", {})
+
+        self.assertIsNone(bus.get("a"))
+        self.assertIsNotNone(bus.get("c"))
+        self.assertIsNotNone(bus.get("running"))
+
+
+class TestJobEventStream(unittest.TestCase):
+    def test_late_subscriber_replays_then_follows_live_events(self):
+        from src.job_events import job_events
+
+        job_events.publish("stream-job", "stage", {"name": "build", "status": "started"})
+
+        async def collect():
+            received = []
+            threading.Timer(0.05, lambda: (job_events.publish("stream-job", "build", "Step 1/9"),
+                                           job_events.close("stream-job"))).start()
+            async for event in _job_event_stream(fake_job("stream-job")):
+                if event is not None:
+                    received.append(event["type"])
+            return received
+
+        self.assertEqual(asyncio.run(collect()), ["snapshot", "stage", "build"])
+
+    def test_unknown_log_yields_snapshot_only(self):
+        async def collect():
+            return [event async for event in _job_event_stream(fake_job("finished-elsewhere"))]
+
+        events = asyncio.run(collect())
+        self.assertEqual([event["type"] for event in events], ["snapshot"])
+        self.assertEqual(events[0]["data"]["created_at"], "2024-01-01T00:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from src import db
+from src.job_queue import DeploymentJobQueue, FAILED, QUEUED, RUNNING, SUCCEEDED
+
+
+class FakeManager:
+    release = threading.Event()
+    fail = False
+
+    def __init__(self, client_id, on_stage=None, on_progress=None, profile=None):
+        self.client_id = client_id
+        self.on_stage = on_stage
+
+    def deploy(self):
+        self.on_stage("build", "started", None)
+        self.release.wait(5)
+        if self.fail:
+            self.on_stage("build", "failed", 0.01)
+            raise RuntimeError("build exploded")
+        self.on_stage("build", "completed", 0.01)
+        return {"service_name": f"secure-app-{self.client_id}"}
+
+
+class FakeBatchDeployer:
+    def __init__(self, max_parallel=None, on_stage=None, on_progress=None):
+        self.on_stage = on_stage
+        self.on_progress = on_progress
+
+    def deploy(self, client_ids, profile=None):
+        self.on_stage("image", "started", None)
+        self.on_stage("image", "completed", 0.01)
+        for client_id in client_ids:
+            self.on_progress("node", {"client_id": client_id, "status": "succeeded", "error": None})
+        return {"requested": len(client_ids), "profile": profile}
+
+
+def wait_for_status(job_id, status, stage=None, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = db.get_job(job_id)
+        if job.status == status and (stage is None or job.stage == stage):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+class TestDeploymentJobQueue(unittest.TestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.Base.metadata.create_all(bind=db.engine)
+        FakeManager.release = threading.Event()
+        FakeManager.fail = False
+        self.queue = DeploymentJobQueue(
+            manager_factory=FakeManager, batch_factory=FakeBatchDeployer, max_workers=1, max_pending=2
+        )
+
+    def tearDown(self):
+        FakeManager.release.set()
+        self.queue.shutdown(wait=True)
+
+    def test_submit_returns_before_deploy_finishes(self):
+        self.queue.start()
+        job = self.queue.submit("acme")
+        self.assertEqual(job.status, QUEUED)
+
+        running = wait_for_status(job.id, RUNNING, stage="build")
+        self.assertEqual(running.stages[0]["status"], "running")
+
+        FakeManager.release.set()
+        done = wait_for_status(job.id, SUCCEEDED)
+        self.assertEqual(done.result, {"service_name": "secure-app-acme"})
+        self.assertEqual([stage["status"] for stage in done.stages], ["completed"])
+
+    def test_failed_deploy_records_error(self):
+        FakeManager.fail = True
+        FakeManager.release.set()
+        self.queue.start()
+        job = self.queue.submit("acme")
+
+        done = wait_for_status(job.id, FAILED)
+        self.assertEqual(done.error, "build exploded")
+        self.assertEqual(done.stages[0]["status"], "failed")
+
+    def test_finish_hook_runs_on_success_and_failure(self):
+        finished = []
+        self.queue.on_finish = lambda job_id, status: finished.append((job_id, status))
+        FakeManager.release.set()
+        self.queue.start()
+        succeeded = self.queue.submit("acme")
+        wait_for_status(succeeded.id, SUCCEEDED)
+        FakeManager.fail = True
+        failed = self.queue.submit("acme")
+        wait_for_status(failed.id, FAILED)
+
+        deadline = time.monotonic() + 2
+        while len(finished) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(finished, [(succeeded.id, SUCCEEDED), (failed.id, FAILED)])
+
+    def test_batch_runs_as_one_job(self):
+        self.queue.start()
+        job = self.queue.submit_batch(["alice", "bob"], profile="standard", max_parallel=4)
+        self.assertIsNone(job.client_id)
+
+        done = wait_for_status(job.id, SUCCEEDED)
+        self.assertEqual(done.batch, {"client_ids": ["alice", "bob"], "max_parallel": 4})
+        self.assertEqual(done.result, {"requested": 2, "profile": "standard"})
+        self.assertEqual([stage["name"] for stage in done.stages], ["image"])
+
+    def test_rejects_jobs_beyond_pending_limit(self):
+        from src.job_queue import QueueFullError
+
+        self.queue.start()
+        self.queue.submit("a")
+        self.queue.submit("b")
+        with self.assertRaises(QueueFullError):
+            self.queue.submit("c")
+
+    def test_recovers_persisted_jobs_on_start(self):
+        db.save_job("queued-job", "acme", QUEUED)
+        db.save_job("running-job", "acme", RUNNING)
+        FakeManager.release.set()
+
+        self.queue.start()
+
+        self.assertEqual(wait_for_status("queued-job", SUCCEEDED).client_id, "acme")
+        self.assertEqual(db.get_job("running-job").status, FAILED)
+
+    def test_jobs_leased_by_a_live_process_are_not_failed(self):
+        db.save_job("live-job", "acme", QUEUED)
+        db.save_job("dead-job", "acme", QUEUED)
+        self.assertTrue(db.claim_job("live-job", "other-process", lease_seconds=60))
+        self.assertTrue(db.claim_job("dead-job", "other-process", lease_seconds=-1))
+
+        self.queue.start()
+
+        self.assertEqual(db.get_job("live-job").status, RUNNING)
+        self.assertEqual(db.get_job("dead-job").status, FAILED)
+
+    def test_a_job_is_claimed_once(self):
+        db.save_job("job", "acme", QUEUED)
+        self.assertTrue(db.claim_job("job", "first", lease_seconds=60))
+        self.assertFalse(db.claim_job("job", "second", lease_seconds=60))
+        self.assertEqual(db.get_job("job").owner, "first")
+
+    def test_running_jobs_keep_their_lease(self):
+        queue = DeploymentJobQueue(
+            manager_factory=FakeManager, batch_factory=FakeBatchDeployer, max_workers=1, lease_seconds=0.3
+        )
+        queue.start()
+        try:
+            job = queue.submit("acme")
+            wait_for_status(job.id, RUNNING, stage="build")
+            time.sleep(0.6)
+            self.assertEqual(db.get_job(job.id).status, RUNNING)
+            self.assertGreater(db.get_job(job.id).lease_expires_at, datetime.utcnow())
+        finally:
+            FakeManager.release.set()
+            queue.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
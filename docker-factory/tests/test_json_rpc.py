@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+import unittest
+
+import jwt
+
+from src.utils.security import SecurityUtils
+
+from . import NODE_TEMPLATES
+
+sys.path.insert(0, NODE_TEMPLATES)
+from json_rpc import PUBLIC_METHODS, BatchRunner, MethodPolicy, parse_calls  # noqa: E402
+
+
+class TestMethodPolicy(unittest.TestCase):
+    def test_admin_methods_are_always_denied(self):
+        policy = MethodPolicy.for_claims({"rpc_allow": ["stop", "account_info"]}, allow=["stop", "account_info"])
+        self.assertFalse(policy.permits("stop"))
+        self.assertTrue(policy.permits("account_info"))
+
+    def test_unlisted_methods_are_refused(self):
+        policy = MethodPolicy.for_claims({})
+        for method in ("feature", "unl_list", "blacklist", "some_future_admin_method"):
+            self.assertNotIn(method, PUBLIC_METHODS)
+            self.assertFalse(policy.permits(method))
+        self.assertTrue(policy.permits("account_info"))
+
+    def test_token_allow_list_narrows_node_allow_list(self):
+        policy = MethodPolicy.for_claims({"rpc_allow": ["account_info", "tx"]}, allow=["account_info", "ledger"])
+        self.assertTrue(policy.permits("account_info"))
+        self.assertFalse(policy.permits("tx"))
+        self.assertFalse(policy.permits("ledger"))
+
+    def test_token_and_node_deny_lists_combine(self):
+        policy = MethodPolicy.for_claims({"rpc_deny": ["submit"]}, deny=["tx"])
+        self.assertFalse(policy.permits("submit"))
+        self.assertFalse(policy.permits("tx"))
+        self.assertTrue(policy.permits("account_info"))
+
+    def test_tokens_carry_method_claims(self):
+        security = SecurityUtils("client-1")
+        token = security.generate_access_token(allow_methods=["account_info"], deny_methods=["submit"])
+        claims = jwt.decode(token, security.jwt_secret, algorithms=["HS256"])
+        self.assertEqual(claims["rpc_allow"], ["account_info"])
+        self.assertEqual(claims["rpc_deny"], ["submit"])
+        self.assertNotIn("rpc_allow", jwt.decode(security.generate_access_token(), security.jwt_secret, algorithms=["HS256"]))
+
+
+class TestParseCalls(unittest.TestCase):
+    def test_single_call_and_batch(self):
+        self.assertEqual(parse_calls({"method": "ping"}, 10), ([{"method": "ping"}], False))
+        self.assertEqual(parse_calls([{"method": "ping"}], 10), ([{"method": "ping"}], True))
+
+    def test_rejects_empty_oversized_and_non_json_bodies(self):
+        for body in ([], [{"method": "ping"}] * 11, None, "ping"):
+            with self.assertRaises(ValueError):
+                parse_calls(body, 10)
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_results_keep_request_order(self):
+        def query(method, params):
+            time.sleep(params["delay"])
+            return {"result": {"account": params["account"]}}
+
+        runner = BatchRunner(query, workers=8, parallelism=8)
+        calls = [
+            {"method": "account_info", "params": [{"account": f"r{i}", "delay": (5 - i) * 0.01}], "id": i}
+            for i in range(5)
+        ]
+        results = runner.run(calls, MethodPolicy())
+        self.assertEqual([result["id"] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual([result["result"]["account"] for result in results], [f"r{i}" for i in range(5)])
+
+    def test_parallelism_caps_calls_in_flight(self):
+        lock = threading.Lock()
+        in_flight, peak = [0], [0]
+
+        def query(method, params):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return {"result": {}}
+
+        runner = BatchRunner(query, workers=16, parallelism=3)
+        runner.run([{"method": "ledger_current"}] * 12, MethodPolicy())
+        self.assertEqual(peak[0], 3)
+
+    def test_denied_and_malformed_calls_answer_in_place(self):
+        runner = BatchRunner(lambda method, params: {"result": {"status": "success"}})
+        results = runner.run(
+            [{"method": "ping", "id": "a"}, {"method": "stop", "id": "b"}, {"params": []}],
+            MethodPolicy(),
+        )
+        self.assertEqual(results[0], {"result": {"status": "success"}, "id": "a"})
+        self.assertEqual(results[1]["id"], "b")
+        self.assertEqual(results[1]["result"]["error"], "noPermission")
+        self.assertEqual(results[2]["result"]["error"], "invalidParams")
+
+
+if __name__ == "__main__":
+    unittest.main()
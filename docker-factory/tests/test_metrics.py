@@ -0,0 +1,46 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from api.main import app, check_rate_limit, rate_limiter
+from api.security import API_KEY, API_KEY_NAME
+from src.container_manager import SecureGCPContainerManager
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stage_durations_are_observed(self):
+        clients = SimpleNamespace(gcp_client=Mock(project_id="project"), docker_client=Mock())
+        manager = SecureGCPContainerManager("alice", clients=clients)
+        before = sample("deploy_stage_duration_seconds_count", stage="push", outcome="failed")
+
+        with self.assertRaises(RuntimeError):
+            with manager._stage("push"):
+                raise RuntimeError("registry unavailable")
+
+        self.assertEqual(sample("deploy_stage_duration_seconds_count", stage="push", outcome="failed"), before + 1)
+
+    def test_rate_limit_rejections_are_counted(self):
+        before = sample("rate_limit_rejections_total", bucket="ip")
+        for _ in range(rate_limiter.limit + 2):
+            check_rate_limit("203.0.113.9")
+        self.assertGreaterEqual(sample("rate_limit_rejections_total", bucket="ip"), before + 1)
+
+    def test_metrics_endpoint_labels_requests_by_route(self):
+        client = TestClient(app)
+        client.get("/health")
+        self.assertIn(client.get("/metrics").status_code, (401, 403))
+        response = client.get("/metrics", headers={API_KEY_NAME: API_KEY})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/health",status="200"}', response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
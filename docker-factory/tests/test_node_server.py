@@ -0,0 +1,65 @@
+import importlib.util
+import os
+import unittest
+from unittest.mock import patch
+
+from src.templates import TemplateManager
+
+from . import NODE_TEMPLATES
+
+
+def load_gunicorn_config():
+    spec = importlib.util.spec_from_file_location("node_gunicorn_conf", os.path.join(NODE_TEMPLATES, "gunicorn.conf.py"))
+    module = importlib.util.module_from_spec(spec)
+    # The config sets PROMETHEUS_MULTIPROC_DIR for the workers; keep it out of this process
+    with patch.dict("os.environ"):
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestNodeServer(unittest.TestCase):
+    def setUp(self):
+        self.config = load_gunicorn_config()
+
+    def files(self, contents):
+        return patch.object(self.config, "_read", side_effect=lambda path: contents.get(path))
+
+    def test_cpu_limit_reads_cgroup_v2_quota(self):
+        with self.files({self.config.CGROUP_V2_CPU_MAX: "800000 100000"}):
+            self.assertEqual(self.config.cpu_limit(), 8)
+
+    def test_cpu_limit_rounds_fractional_quota_up(self):
+        with self.files({self.config.CGROUP_V2_CPU_MAX: "150000 100000"}):
+            self.assertEqual(self.config.cpu_limit(), 2)
+
+    def test_cpu_limit_reads_cgroup_v1_quota(self):
+        contents = {self.config.CGROUP_V1_CPU_QUOTA: "400000", self.config.CGROUP_V1_CPU_PERIOD: "100000"}
+        with self.files(contents):
+            self.assertEqual(self.config.cpu_limit(), 4)
+
+    def test_cpu_limit_falls_back_to_cpu_count_without_quota(self):
+        contents = {self.config.CGROUP_V2_CPU_MAX: "max 100000"}
+        with self.files(contents), patch.object(self.config.os, "cpu_count", return_value=6):
+            self.assertEqual(self.config.cpu_limit(), 6)
+
+    def test_worker_settings(self):
+        self.assertEqual(self.config.default_workers(8), 4)
+        self.assertEqual(self.config.default_workers(1), 2)
+        self.assertEqual(self.config.worker_class, "gevent")
+        self.assertGreaterEqual(self.config.worker_connections, 2000)
+        self.assertLess(self.config.graceful_timeout, 10)
+
+    def test_workers_env_override(self):
+        with patch.dict("os.environ", {"GUNICORN_WORKERS": "3", "PORT": "9000"}):
+            config = load_gunicorn_config()
+        self.assertEqual(config.workers, 3)
+        self.assertEqual(config.bind, "0.0.0.0:9000")
+
+    def test_supervisord_serves_the_api_with_gunicorn(self):
+        supervisord = TemplateManager().render_template("supervisord.conf")
+        self.assertIn("gunicorn --config /app/gunicorn.conf.py", supervisord)
+        self.assertNotIn("python3 /app/app.py", supervisord)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from src import db
+from src.container_manager import SecureGCPContainerManager
+from src.pipeline import Stage, StagePipeline
+
+
+def sleeper(seconds, value=None):
+    def run(results):
+        time.sleep(seconds)
+        return value
+
+    return run
+
+
+class TestStagePipeline(unittest.TestCase):
+    def test_independent_stages_overlap(self):
+        pipeline = StagePipeline(
+            [
+                Stage("build", sleeper(0.2, "image")),
+                Stage("repository", sleeper(0.2, "repo")),
+                Stage("push", lambda results: (results["build"], results["repository"]), after=["build", "repository"]),
+            ]
+        )
+
+        started = time.monotonic()
+        results = pipeline.run()
+
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual(results["push"], ("image", "repo"))
+
+    def test_critical_path_follows_slowest_dependency(self):
+        pipeline = StagePipeline(
+            [
+                Stage("build", sleeper(0.15)),
+                Stage("repository", sleeper(0.01)),
+                Stage("push", sleeper(0.01), after=["build", "repository"]),
+            ]
+        )
+        pipeline.run()
+
+        self.assertEqual([name for name, _ in pipeline.critical_path()], ["build", "push"])
+
+    def test_failure_stops_dependents_and_raises(self):
+        ran = []
+
+        def fail(results):
+            raise RuntimeError("build failed")
+
+        pipeline = StagePipeline(
+            [
+                Stage("build", fail),
+                Stage("repository", sleeper(0.05)),
+                Stage("push", lambda results: ran.append("push"), after=["build", "repository"]),
+            ]
+        )
+
+        with self.assertRaisesRegex(RuntimeError, "build failed"):
+            pipeline.run()
+        self.assertEqual(ran, [])
+        self.assertIn("repository", pipeline.results)
+
+    def test_unknown_dependency_is_rejected(self):
+        with self.assertRaises(ValueError):
+            StagePipeline([Stage("push", sleeper(0), after=["build"])])
+
+
+class TestOverlappedDeploy(unittest.TestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.Base.metadata.create_all(bind=db.engine)
+
+    def test_iam_is_set_while_service_rolls_out(self):
+        events = []
+        lock = threading.Lock()
+
+        def on_stage(stage, event, elapsed):
+            with lock:
+                events.append((stage, event))
+
+        rollout_done = threading.Event()
+
+        def result():
+            time.sleep(0.1)
+            rollout_done.set()
+            return SimpleNamespace(uri="https://node.a.run.app", latest_ready_revision="rev-1")
+
+        clients = SimpleNamespace(gcp_client=Mock(project_id="project"), docker_client=Mock())
+        manager = SecureGCPContainerManager("alice", on_stage=on_stage, clients=clients)
+        manager.cloud_run_service = Mock()
+        manager.cloud_run_service.start_deploy.return_value = SimpleNamespace(result=result)
+        manager.cloud_run_service.set_iam_policy.side_effect = lambda *args: self.assertFalse(rollout_done.is_set())
+        manager.cloud_run_service.service_info.return_value = {"service_name": manager.service_name}
+
+        with patch("src.container_manager.node_image_cache") as cache:
+            cache.get_or_build.return_value = ("repo/secure-app@sha256:abc", True)
+            with patch.object(manager.security, "get_env_vars", return_value={}):
+                info = manager.deploy()
+
+        manager.cloud_run_service.get_service_info.assert_not_called()
+        self.assertEqual(db.get_deployment(manager.service_name).image_tag, "repo/secure-app@sha256:abc")
+        self.assertEqual(
+            [step["stage"] for step in info["critical_path"]],
+            ["template", "image", "cloud_run_create", "cloud_run_ready", "db"],
+        )
+        self.assertIn(("iam", "completed"), events)
+        self.assertNotIn(("image", "started"), events)
+
+
+if __name__ == "__main__":
+    unittest.main()
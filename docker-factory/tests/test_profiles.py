@@ -0,0 +1,97 @@
+import re
+import unittest
+from unittest.mock import Mock
+
+from src.profiles import PROFILES, PerformanceProfile, get_profile
+from src.services.cloud_run_service import CloudRunService
+from src.services.container_service import ContainerService
+
+ENV_VARS = {"CLIENT_ID": "client-1", "JWT_SECRET": "secret"}
+
+
+def rippled_sections(config):
+    """{section: [lines]} of a rippled.cfg"""
+    sections, current = {}, None
+    for line in config.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = re.fullmatch(r"\[(\w+)\]", line)
+        if match:
+            current = sections.setdefault(match.group(1), [])
+        elif current is not None:
+            current.append(line)
+    return sections
+
+
+class TestProfiles(unittest.TestCase):
+    def assert_profile(self, name, cpu, memory, node_size, ledger_history, online_delete):
+        profile = get_profile(name)
+        profile.validate()
+
+        config = ContainerService(docker_client=None, profile=profile).render_context()["rippled.cfg"].decode()
+        self.assertNotIn("$", config)
+        sections = rippled_sections(config)
+        self.assertEqual(sections["node_size"], [node_size])
+        self.assertEqual(sections["ledger_history"], [str(ledger_history)])
+        self.assertEqual(sections["workers"], [str(cpu)])
+        self.assertIn(f"online_delete={online_delete}", sections["node_db"])
+
+        gcp_client = Mock(project_id="project")
+        CloudRunService(gcp_client).start_deploy("svc", "image", "us-central1", ENV_VARS, profile.resource_limits())
+        request = gcp_client.cloud_run_client.create_service.call_args.kwargs["request"]
+        limits = dict(request.service.template.containers[0].resources.limits)
+        self.assertEqual(limits, {"cpu": str(cpu), "memory": memory})
+
+    def test_light_client(self):
+        self.assert_profile("light-client", 2, "4Gi", "tiny", 256, 256)
+
+    def test_standard(self):
+        self.assert_profile("standard", 8, "4Gi", "small", 256, 256)
+
+    def test_api_heavy(self):
+        self.assert_profile("api-heavy", 8, "16Gi", "medium", 2048, 2048)
+
+    def test_full_history_lite(self):
+        self.assert_profile("full-history-lite", 8, "32Gi", "large", 32768, 32768)
+
+    def test_every_profile_is_tested(self):
+        tested = {name[len("test_"):].replace("_", "-") for name in dir(self) if name.startswith("test_")}
+        self.assertLessEqual(set(PROFILES), tested)
+
+    def test_default_profile_keeps_original_sizing(self):
+        self.assertEqual(get_profile().name, "standard")
+        gcp_client = Mock(project_id="project")
+        CloudRunService(gcp_client).start_deploy("svc", "image", "us-central1", ENV_VARS)
+        request = gcp_client.cloud_run_client.create_service.call_args.kwargs["request"]
+        self.assertEqual(dict(request.service.template.containers[0].resources.limits), {"cpu": "8", "memory": "4Gi"})
+
+    def test_profiles_build_different_images(self):
+        hashes = {ContainerService(None, profile).context_hash() for profile in PROFILES.values()}
+        self.assertEqual(len(hashes), len(PROFILES))
+
+    def test_garbage_collector_pins_every_profile_image(self):
+        from src.container_manager import current_node_image_tags
+
+        self.assertEqual(len(set(current_node_image_tags())), len(PROFILES))
+
+    def test_unknown_profile(self):
+        with self.assertRaisesRegex(ValueError, "Unknown profile"):
+            get_profile("huge-node")
+
+    def test_invalid_combinations_are_rejected(self):
+        for kwargs, error in (
+            ({"cpu": 3, "memory_gi": 4}, "does not offer"),
+            ({"cpu": 2, "memory_gi": 16}, "allow"),
+            ({"node_size": "large"}, "needs at least"),
+            ({"online_delete": 128, "ledger_history": 128}, "at least 256"),
+            ({"ledger_history": 512}, "cannot exceed"),
+        ):
+            values = {"cpu": 2, "memory_gi": 4, "node_size": "small", "ledger_history": 256, "online_delete": 256}
+            values.update(kwargs)
+            with self.assertRaisesRegex(ValueError, error):
+                PerformanceProfile("bad", "", **values).validate()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+from api.rate_limit import MemoryBackend, RateLimiter, RedisBackend, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Local stand-in for the handful of Redis commands the backend uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key))
+
+    def get(self, key):
+        self.commands.append(("get", key))
+
+    def execute(self):
+        results = []
+        for command, key in self.commands:
+            if command == "incr":
+                self.redis.data[key] = self.redis.data.get(key, 0) + 1
+                results.append(self.redis.data[key])
+            elif command == "expire":
+                results.append(True)
+            else:
+                value = self.redis.data.get(key)
+                results.append(None if value is None else str(value).encode())
+        return results
+
+
+class TestRateLimiter(unittest.TestCase):
+    def assert_limits(self, backend):
+        clock = FakeClock(now=1200.0)
+        limiter = RateLimiter(backend, limit=3, window=60, clock=clock)
+
+        results = [limiter.check("ip:1.2.3.4") for _ in range(4)]
+        self.assertEqual([result.allowed for result in results], [True, True, True, False])
+        self.assertEqual(results[0].headers()["X-RateLimit-Remaining"], "2")
+        self.assertEqual(results[3].headers()["Retry-After"], "60")
+
+        # Half-way through the next window the previous window still counts for half
+        clock.now += 90
+        self.assertTrue(limiter.check("ip:1.2.3.4").allowed)
+        self.assertFalse(limiter.check("ip:1.2.3.4").allowed)
+
+        self.assertTrue(limiter.check("ip:5.6.7.8").allowed)
+
+    def test_memory_backend(self):
+        self.assert_limits(MemoryBackend())
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assert_limits(SQLiteBackend(os.path.join(directory, "limits.db")))
+
+    def test_redis_backend(self):
+        self.assert_limits(RedisBackend(FakeRedis()))
+
+    def test_only_io_backends_block(self):
+        self.assertFalse(RateLimiter(MemoryBackend(), limit=3, window=60).blocking)
+        self.assertTrue(RateLimiter(RedisBackend(FakeRedis()), limit=3, window=60).blocking)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertTrue(RateLimiter(SQLiteBackend(os.path.join(directory, "limits.db")), limit=3, window=60).blocking)
+
+    def test_sqlite_backend_is_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "limits.db")
+            clock = FakeClock()
+            worker_a = RateLimiter(SQLiteBackend(path), limit=2, window=60, clock=clock)
+            worker_b = RateLimiter(SQLiteBackend(path), limit=2, window=60, clock=clock)
+
+            self.assertTrue(worker_a.check("ip:1").allowed)
+            self.assertTrue(worker_b.check("ip:1").allowed)
+            self.assertFalse(worker_a.check("ip:1").allowed)
+
+    def test_memory_backend_is_bounded(self):
+        backend = MemoryBackend(max_keys=100)
+        limiter = RateLimiter(backend, limit=10, window=60, clock=FakeClock())
+        for i in range(1000):
+            limiter.check(f"ip:{i}")
+        self.assertEqual(len(backend), 100)
+
+    def test_idle_keys_expire(self):
+        backend = MemoryBackend()
+        clock = FakeClock()
+        limiter = RateLimiter(backend, limit=10, window=60, clock=clock)
+        limiter.check("ip:idle")
+        clock.now += 600
+        limiter.check("ip:active")
+        self.assertEqual(len(backend), 1)
+
+    def test_api_key_limits(self):
+        limiter = RateLimiter(MemoryBackend(), limit=1, window=60, key_limits={"partner": 5}, clock=FakeClock())
+        self.assertEqual(limiter.limit_for("partner"), 5)
+        self.assertEqual(limiter.limit_for(None), 1)
+        self.assertNotIn("partner", limiter.client_key("1.2.3.4", "partner"))
+
+
+if __name__ == "__main__":
+    unittest.main()
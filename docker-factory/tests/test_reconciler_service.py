@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from google.cloud import run_v2
+
+from src import db
+from src.services.deployment_cache import DATABASE, MEMORY, DeploymentInfoCache
+from src.services.reconciler_service import DELETED, DEPLOYING, FAILED, RUNNING, CloudRunReconciler
+
+
+def service(name, state=run_v2.Condition.State.CONDITION_SUCCEEDED, reconciling=False, revision="rev-1"):
+    return SimpleNamespace(
+        name=f"projects/project/locations/us-central1/services/{name}",
+        reconciling=reconciling,
+        terminal_condition=SimpleNamespace(state=state),
+        latest_ready_revision=revision,
+        uri=f"https://{name}.a.run.app",
+    )
+
+
+class TestCloudRunReconciler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        db.Base.metadata.drop_all(bind=db.engine)
+        db.init_db()
+        db.save_deployments(
+            [
+                ({"service_name": name, "rpc_endpoint": f"https://{name}.a.run.app/", "status": "rev-1"}, "alice")
+                for name in ("node-1", "node-2", "node-3", "node-4")
+            ]
+        )
+        self.services = [
+            service("node-1"),
+            service("node-2", state=run_v2.Condition.State.CONDITION_FAILED),
+            service("node-3", reconciling=True, revision="rev-2"),
+            service("not-ours"),
+        ]
+        self.gcp_client = Mock(project_id="project")
+        self.gcp_client.cloud_run_client.list_services.side_effect = lambda request: iter(self.services)
+        self.reconciler = CloudRunReconciler(
+            lambda: self.gcp_client, regions=["us-central1"], interval=60, fast_interval=5
+        )
+
+    def test_updates_statuses_and_marks_missing_services_deleted(self):
+        changed = self.reconciler.reconcile()
+
+        statuses = {name: db.get_deployment(name).status for name in ("node-1", "node-2", "node-3", "node-4")}
+        self.assertEqual(statuses, {"node-1": RUNNING, "node-2": FAILED, "node-3": DEPLOYING, "node-4": DELETED})
+        self.assertEqual(changed, 3)
+        self.assertIsNone(db.get_deployment("not-ours"))
+        self.assertEqual(db.get_deployment("node-1").uri, "https://node-1.a.run.app")
+        self.gcp_client.cloud_run_client.list_services.assert_called_once()
+
+    def test_interval_speeds_up_during_rollouts(self):
+        self.reconciler.reconcile()
+        self.assertEqual(self.reconciler._delay, 5)
+
+        self.services[2] = service("node-3", revision="rev-2")
+        self.reconciler.reconcile()
+        self.assertEqual(self.reconciler._delay, 60)
+
+    def test_failed_listing_changes_nothing(self):
+        self.gcp_client.cloud_run_client.list_services.side_effect = RuntimeError("unavailable")
+        with self.assertRaises(RuntimeError):
+            self.reconciler.reconcile()
+        self.assertEqual(db.get_deployment("node-4").status, RUNNING)
+
+    async def asyncTearDown(self):
+        # Pooled connections belong to this test's event loop
+        await db.async_engine.dispose()
+
+    async def test_lookups_use_reconciled_rows_without_cloud_run(self):
+        self.reconciler.reconcile()
+        cloud_run_factory = Mock()
+        cache = DeploymentInfoCache(cloud_run_factory=cloud_run_factory, max_status_age=60)
+
+        info, source, _ = await cache.get_async("node-3")
+
+        self.assertEqual((info["status"], info["state"], source), ("rev-2", DEPLOYING, DATABASE))
+        cloud_run_factory.assert_not_called()
+
+    async def test_stale_rows_are_refreshed_from_cloud_run(self):
+        db.upsert_deployment_statuses(
+            [{"service_name": "node-1", "last_seen_at": datetime.utcnow() - timedelta(minutes=10)}]
+        )
+        cloud_run = Mock()
+        cloud_run.get_service_status.return_value = "rev-9"
+        cache = DeploymentInfoCache(cloud_run_factory=lambda: cloud_run, max_status_age=60)
+
+        await cache.get_async("node-1")
+        for _ in range(200):
+            info, source, _ = await cache.get_async("node-1")
+            if info["status"] == "rev-9":
+                break
+            await asyncio.sleep(0.01)
+        cache.shutdown()
+        self.assertEqual((info["status"], source), ("rev-9", MEMORY))
+
+
+if __name__ == "__main__":
+    unittest.main()
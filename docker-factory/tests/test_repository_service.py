@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+import google.api_core.exceptions
+
+from src.services.repository_service import RepositoryProvisioner
+
+
+def fake_gcp_client():
+    gcp_client = Mock()
+    gcp_client.project_id = "proj"
+    return gcp_client
+
+
+class TestRepositoryProvisioner(unittest.TestCase):
+    def test_known_repository_is_cached(self):
+        gcp_client = fake_gcp_client()
+        provisioner = RepositoryProvisioner(ttl=60)
+
+        path = provisioner.ensure(gcp_client, "secure-app-acme")
+        provisioner.ensure(gcp_client, "secure-app-acme")
+
+        self.assertEqual(path, "projects/proj/locations/us-central1/repositories/secure-app-acme")
+        gcp_client.artifact_client.get_repository.assert_called_once()
+
+    def test_invalidated_repository_is_checked_again(self):
+        gcp_client = fake_gcp_client()
+        provisioner = RepositoryProvisioner(ttl=60)
+
+        path = provisioner.ensure(gcp_client, "secure-app-acme")
+        provisioner.invalidate(path)
+        provisioner.ensure(gcp_client, "secure-app-acme")
+
+        self.assertEqual(gcp_client.artifact_client.get_repository.call_count, 2)
+
+    def test_cache_entry_expires(self):
+        gcp_client = fake_gcp_client()
+        provisioner = RepositoryProvisioner(ttl=0)
+
+        provisioner.ensure(gcp_client, "secure-app-acme")
+        provisioner.ensure(gcp_client, "secure-app-acme")
+
+        self.assertEqual(gcp_client.artifact_client.get_repository.call_count, 2)
+
+    def test_concurrent_deploys_trigger_one_create(self):
+        gcp_client = fake_gcp_client()
+        gcp_client.artifact_client.get_repository.side_effect = google.api_core.exceptions.NotFound("missing")
+
+        def slow_create(request):
+            time.sleep(0.1)
+            return Mock()
+
+        gcp_client.artifact_client.create_repository.side_effect = slow_create
+        provisioner = RepositoryProvisioner(ttl=60)
+
+        threads = [
+            threading.Thread(target=provisioner.ensure, args=(gcp_client, "secure-app-acme")) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        gcp_client.artifact_client.create_repository.assert_called_once()
+
+    def test_other_errors_are_not_treated_as_missing(self):
+        gcp_client = fake_gcp_client()
+        gcp_client.artifact_client.get_repository.side_effect = google.api_core.exceptions.PermissionDenied("no")
+        provisioner = RepositoryProvisioner(ttl=60)
+
+        with self.assertRaises(google.api_core.exceptions.PermissionDenied):
+            provisioner.ensure(gcp_client, "secure-app-acme")
+        gcp_client.artifact_client.create_repository.assert_not_called()
+
+    def test_concurrent_creation_elsewhere_is_tolerated(self):
+        gcp_client = fake_gcp_client()
+        gcp_client.artifact_client.get_repository.side_effect = google.api_core.exceptions.NotFound("missing")
+        gcp_client.artifact_client.create_repository.return_value.result.side_effect = (
+            google.api_core.exceptions.AlreadyExists("exists")
+        )
+
+        RepositoryProvisioner(ttl=60).ensure(gcp_client, "secure-app-acme")
+
+    def test_repository_naming_modes(self):
+        self.assertEqual(
+            RepositoryProvisioner(mode="per-client").repository_name("Acme_Corp@x.com"), "secure-app-acme-corp"
+        )
+        self.assertEqual(
+            RepositoryProvisioner(mode="shared", shared_repository="nodes").repository_name("acme"), "nodes"
+        )
+
+    def test_prefetch_only_in_preprovision_mode(self):
+        gcp_client = fake_gcp_client()
+        self.assertIsNone(RepositoryProvisioner(preprovision=False).prefetch(gcp_client, "acme"))
+
+        provisioner = RepositoryProvisioner(preprovision=True, ttl=60)
+        provisioner.prefetch(gcp_client, "acme").result(timeout=5)
+        provisioner.shutdown()
+        gcp_client.artifact_client.get_repository.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
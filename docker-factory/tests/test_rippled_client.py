@@ -0,0 +1,96 @@
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import requests
+
+from . import NODE_TEMPLATES
+
+sys.path.insert(0, NODE_TEMPLATES)
+from rippled_client import RippledClient  # noqa: E402
+
+
+def response(result, status_code=200):
+    return Mock(status_code=status_code, json=Mock(return_value=result))
+
+
+class TestRippledClient(unittest.TestCase):
+    def setUp(self):
+        self.client = RippledClient("http://rippled:5005", cache_ttl=60)
+        self.posts = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def post(url, json, timeout):
+            self.posts.append(json)
+            call = len(self.posts)
+            self.release.wait(5)
+            return response({"result": {"method": json["method"], "call": call}})
+
+        self.client.session.post = post
+
+    def test_sends_json_rpc_payload(self):
+        result = self.client.query("account_info", {"account": "rAlice"})
+        self.assertEqual(result["result"]["method"], "account_info")
+        self.assertEqual(self.posts, [{"method": "account_info", "params": [{"account": "rAlice"}]}])
+
+    def test_identical_concurrent_requests_share_one_call(self):
+        self.release.clear()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(self.client.query, "account_info", {"account": "rAlice"}) for _ in range(10)]
+            time.sleep(0.1)
+            self.release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(self.posts), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_non_idempotent_methods_are_not_coalesced(self):
+        for method, params in (("random", None), ("submit", {"tx_blob": "1200"})):
+            self.posts.clear()
+            self.release.clear()
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(self.client.query, method, params) for _ in range(3)]
+                time.sleep(0.1)
+                self.release.set()
+                results = [future.result() for future in futures]
+
+            self.assertEqual(len(self.posts), 3)
+            self.assertEqual(len({result["result"]["call"] for result in results}), 3)
+
+    def test_different_params_are_not_coalesced(self):
+        self.client.query("account_info", {"account": "rAlice"})
+        self.client.query("account_info", {"account": "rBob"})
+        self.assertEqual(len(self.posts), 2)
+
+    def test_server_info_is_cached(self):
+        first = self.client.query("server_info")
+        self.assertIs(self.client.query("server_info"), first)
+        self.assertEqual(len(self.posts), 1)
+
+    def test_uncached_methods_reach_rippled_every_time(self):
+        self.client.query("ledger_current")
+        self.client.query("ledger_current")
+        self.assertEqual(len(self.posts), 2)
+
+    def test_cache_expires(self):
+        self.client.cache_ttl = 0.05
+        self.client.query("server_state")
+        time.sleep(0.1)
+        self.client.query("server_state")
+        self.assertEqual(len(self.posts), 2)
+
+    def test_errors_are_returned_and_not_cached(self):
+        self.client.session.post = Mock(side_effect=requests.exceptions.ConnectionError())
+        self.assertEqual(self.client.query("server_info"), {"error": "Rippled connection failed"})
+
+        self.client.session.post = Mock(return_value=response({}, status_code=503))
+        self.assertEqual(self.client.query("server_info"), {"error": "Rippled error: 503"})
+        self.assertEqual(self.client.session.post.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from src.clients.docker_client import DockerClient
+from src.clients.token_provider import TokenProvider
+
+
+class FakeCredentials:
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.utcnow() + timedelta(seconds=self.lifetime)
+
+
+class TestTokenProvider(unittest.TestCase):
+    def test_token_is_cached_until_near_expiry(self):
+        credentials = FakeCredentials(lifetime=3600)
+        provider = TokenProvider(credentials, refresh_margin=300, request_factory=Mock)
+
+        self.assertEqual(provider.get_token(), "token-1")
+        self.assertEqual(provider.get_token(), "token-1")
+        self.assertEqual(credentials.refreshes, 1)
+        provider.close()
+
+    def test_expiring_token_is_refreshed(self):
+        credentials = FakeCredentials(lifetime=3600)
+        provider = TokenProvider(credentials, refresh_margin=300, request_factory=Mock)
+        provider.get_token()
+
+        credentials.expiry = datetime.utcnow() + timedelta(seconds=60)
+        self.assertEqual(provider.get_token(), "token-2")
+        provider.close()
+
+    def test_background_refresh_runs_before_expiry(self):
+        credentials = FakeCredentials(lifetime=2.5)
+        provider = TokenProvider(credentials, refresh_margin=1, request_factory=Mock)
+        provider.get_token()
+
+        deadline = time.monotonic() + 5
+        while credentials.refreshes < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        provider.close()
+        self.assertGreaterEqual(credentials.refreshes, 2)
+
+
+class TestRegistryLogin(unittest.TestCase):
+    @patch("docker.from_env")
+    def test_login_is_reused_until_token_changes(self, mock_from_env):
+        docker_client = DockerClient()
+
+        docker_client.login_registry("https://registry", "oauth2accesstoken", "token-1")
+        docker_client.login_registry("https://registry", "oauth2accesstoken", "token-1")
+        docker_client.login_registry("https://registry", "oauth2accesstoken", "token-2")
+
+        self.assertEqual(mock_from_env.return_value.login.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+import jwt
+
+from src.utils.security import SecurityUtils
+
+from . import NODE_TEMPLATES
+
+sys.path.insert(0, NODE_TEMPLATES)
+from token_verifier import TokenVerifier  # noqa: E402
+
+
+class TestTokenVerifier(unittest.TestCase):
+    def setUp(self):
+        self.security = SecurityUtils("client-1")
+        self.now = [time.time()]
+        self.verifier = TokenVerifier(self.security.jwt_secret, "client-1", max_entries=2, clock=lambda: self.now[0])
+
+    def test_second_use_of_a_token_skips_decoding(self):
+        token = self.security.generate_access_token()
+        claims, cached = self.verifier.verify(token)
+        self.assertFalse(cached)
+
+        with patch("token_verifier.jwt.decode") as decode:
+            self.assertEqual(self.verifier.verify(token), (claims, True))
+        decode.assert_not_called()
+        self.assertEqual((self.verifier.hits, self.verifier.misses), (1, 1))
+
+    def test_cached_token_expires_at_its_exp(self):
+        token = self.security.generate_access_token(expiration_minutes=1)
+        self.verifier.verify(token)
+
+        self.now[0] += 61
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.verifier.verify(token)
+        self.assertEqual(len(self.verifier), 0)
+
+    def test_rejected_tokens_are_not_cached(self):
+        other = SecurityUtils("client-2")
+        for token in (other.generate_access_token(), "not-a-jwt", self.security.generate_access_token()[:-2]):
+            with self.assertRaises(jwt.InvalidTokenError):
+                self.verifier.verify(token)
+        self.assertEqual(len(self.verifier), 0)
+
+    def test_client_id_must_match(self):
+        token = jwt.encode({"client_id": "client-2"}, self.security.jwt_secret, algorithm="HS256")
+        with self.assertRaisesRegex(jwt.InvalidTokenError, "Client ID mismatch"):
+            self.verifier.verify(token)
+
+    def test_least_recently_used_token_is_evicted(self):
+        first, second, third = (self.security.generate_access_token() for _ in range(3))
+        self.verifier.verify(first)
+        self.verifier.verify(second)
+        self.verifier.verify(first)
+        self.verifier.verify(third)
+
+        self.assertEqual(len(self.verifier), 2)
+        self.assertTrue(self.verifier.verify(first)[1])
+        self.assertFalse(self.verifier.verify(second)[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.pipeline import Stage, StagePipeline
+from src.utils.tracing import (
+    NOOP_SPAN,
+    JsonlExporter,
+    OtlpHttpExporter,
+    Tracer,
+    correlation,
+    get_correlation_id,
+    run_in_context,
+)
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.exporter = ListExporter()
+        self.tracer = Tracer(sample_rate=1.0, exporters=[self.exporter])
+
+    def test_spans_nest_and_carry_the_correlation_id(self):
+        with correlation("job-1"):
+            with self.tracer.span("deploy"):
+                with self.tracer.span("docker.build_image"):
+                    pass
+
+        build, deploy = self.exporter.spans
+        self.assertEqual(build.parent_id, deploy.span_id)
+        self.assertEqual(build.trace_id, deploy.trace_id)
+        self.assertEqual(build.attributes["correlation_id"], "job-1")
+        self.assertIsNone(get_correlation_id())
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("cloud_run.create_service"):
+                raise RuntimeError("quota exceeded")
+        self.assertEqual(self.exporter.spans[0].error, "RuntimeError: quota exceeded")
+
+    def test_unsampled_traces_record_nothing(self):
+        tracer = Tracer(sample_rate=0.0, exporters=[self.exporter])
+        with tracer.span("deploy") as span:
+            with tracer.span("docker.build_image") as child:
+                pass
+        self.assertIs(span, NOOP_SPAN)
+        self.assertIs(child, NOOP_SPAN)
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_child_span_never_starts_a_trace(self):
+        with self.tracer.child_span("db.query"):
+            pass
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_context_follows_work_into_threads(self):
+        def build(results):
+            with self.tracer.span("docker.build_image"):
+                return get_correlation_id()
+
+        with ThreadPoolExecutor(max_workers=1) as executor, correlation("job-2"), self.tracer.span("deploy"):
+            future = run_in_context(executor, get_correlation_id)
+            results = StagePipeline([Stage("build", build)]).run()
+
+        self.assertEqual((future.result(), results["build"]), ("job-2", "job-2"))
+        build_span, deploy_span = self.exporter.spans
+        self.assertEqual(build_span.parent_id, deploy_span.span_id)
+
+    def test_log_records_carry_the_correlation_id(self):
+        with self.assertLogs("src.test", level="INFO") as logs, correlation("req-7"):
+            logging.getLogger("src.test").info("hello")
+        self.assertEqual(logs.records[0].correlation_id, "req-7")
+
+
+class TestExporters(unittest.TestCase):
+    def test_jsonl_exporter_writes_one_span_per_line(self):
+        path = os.path.join(tempfile.mkdtemp(), "spans.jsonl")
+        exporter = JsonlExporter(path)
+        tracer = Tracer(sample_rate=1.0, exporters=[exporter])
+        with tracer.span("deploy", client_id="alice"):
+            with tracer.span("stage.push"):
+                pass
+        exporter.shutdown()
+
+        with open(path) as f:
+            spans = [json.loads(line) for line in f]
+        self.assertEqual([span["name"] for span in spans], ["stage.push", "deploy"])
+        self.assertEqual(spans[1]["attributes"], {"client_id": "alice"})
+
+    def test_otlp_payload_shape(self):
+        exporter = OtlpHttpExporter("http://collector:4318", interval=3600)
+        tracer = Tracer(sample_rate=1.0, exporters=[ListExporter()])
+        with tracer.span("deploy", attempt=1):
+            pass
+        span = tracer.exporters[0].spans[0]
+
+        payload = exporter.payload([span])
+        otlp = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(exporter.url, "http://collector:4318/v1/traces")
+        self.assertEqual(otlp["traceId"], span.trace_id)
+        self.assertEqual(otlp["attributes"], [{"key": "attempt", "value": {"intValue": "1"}}])
+        self.assertNotIn("parentSpanId", otlp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import json
+import queue
+import sys
+import threading
+import time
+import unittest
+
+from . import NODE_TEMPLATES
+
+sys.path.insert(0, NODE_TEMPLATES)
+from ws_hub import Subscriber, SubscriptionHub, affected_accounts, parse_subscription  # noqa: E402
+
+
+class FakeUpstream:
+    """Stands in for the rippled WebSocket: records sent commands, replays pushed messages"""
+
+    def __init__(self):
+        self.sent = []
+        self.incoming = queue.Queue()
+
+    def send(self, text):
+        self.sent.append(json.loads(text))
+
+    def recv(self):
+        message = self.incoming.get()
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+class TestSubscriptionHub(unittest.TestCase):
+    def setUp(self):
+        self.upstreams = []
+
+        def connect():
+            upstream = FakeUpstream()
+            self.upstreams.append(upstream)
+            return upstream
+
+        self.hub = SubscriptionHub(connect, max_queue=4, max_dropped=10, reconnect_delay=0.01)
+
+    def connected(self):
+        wait_for(lambda: self.upstreams and self.hub._connection is self.upstreams[-1])
+        return self.upstreams[-1]
+
+    def test_many_subscribers_share_one_upstream_subscription(self):
+        subscribers = [self.hub.add_subscriber() for _ in range(100)]
+        for subscriber in subscribers:
+            self.hub.subscribe(subscriber, streams=["ledger"])
+        upstream = self.connected()
+
+        ledger_subscribes = [c for c in upstream.sent if c["command"] == "subscribe" and "ledger" in c.get("streams", [])]
+        self.assertEqual(len(ledger_subscribes), 1)
+        self.assertEqual(len(self.upstreams), 1)
+
+        upstream.incoming.put(json.dumps({"type": "ledgerClosed", "ledger_index": 7}))
+        wait_for(lambda: all(not s.queue.empty() for s in subscribers))
+        self.assertEqual(json.loads(subscribers[0].get(0))["ledger_index"], 7)
+
+    def test_last_unsubscribe_releases_upstream_subscription(self):
+        first, second = self.hub.add_subscriber(), self.hub.add_subscriber()
+        self.hub.subscribe(first, streams=["ledger"])
+        upstream = self.connected()
+        self.hub.subscribe(second, streams=["ledger"])
+
+        self.hub.unsubscribe(first)
+        self.assertNotIn("unsubscribe", [c["command"] for c in upstream.sent])
+        self.hub.unsubscribe(second)
+        self.assertEqual(upstream.sent[-1], {"command": "unsubscribe", "streams": ["ledger"]})
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+    def test_messages_route_by_stream_and_account(self):
+        ledger, alice = self.hub.add_subscriber(), self.hub.add_subscriber()
+        self.hub.subscribe(ledger, streams=["ledger"])
+        self.hub.subscribe(alice, accounts=["rAlice"])
+        upstream = self.connected()
+
+        self.hub.dispatch(json.dumps({"type": "transaction", "transaction": {"Account": "rAlice"}}))
+        self.hub.dispatch(json.dumps({"type": "transaction", "transaction": {"Account": "rBob"}}))
+        self.hub.dispatch(json.dumps({"type": "ledgerClosed"}))
+        self.hub.dispatch(json.dumps({"type": "response", "result": {}}))
+
+        self.assertEqual(alice.queue.qsize(), 1)
+        self.assertEqual(json.loads(ledger.get(0))["type"], "ledgerClosed")
+        self.assertIsNone(ledger.get(0))
+        self.assertIn(["rAlice"], [command.get("accounts") for command in upstream.sent])
+
+    def test_account_messages_match_parsed_accounts_not_text(self):
+        alice = self.hub.add_subscriber()
+        self.hub.subscribe(alice, accounts=["rAlice"])
+        self.connected()
+
+        # rAlice appears only in a memo and as a prefix of another address
+        self.hub.dispatch(json.dumps({
+            "type": "transaction",
+            "transaction": {"Account": "rAlice2", "Memos": [{"Memo": {"MemoData": "rAlice"}}]},
+        }))
+        self.assertEqual(alice.queue.qsize(), 0)
+
+        self.hub.dispatch(json.dumps({
+            "type": "transaction",
+            "transaction": {"Account": "rBob", "Destination": "rCarol"},
+            "meta": {"AffectedNodes": [
+                {"ModifiedNode": {"LedgerEntryType": "RippleState",
+                                  "FinalFields": {"HighLimit": {"issuer": "rAlice"}, "LowLimit": {"issuer": "rBob"}}}},
+            ]},
+        }))
+        self.assertEqual(alice.queue.qsize(), 1)
+
+    def test_reconnect_resubscribes_current_topics(self):
+        subscriber = self.hub.add_subscriber()
+        self.hub.subscribe(subscriber, streams=["ledger", "validations"])
+        first = self.connected()
+
+        first.incoming.put(ConnectionError("gone"))
+        wait_for(lambda: len(self.upstreams) == 2)
+        second = self.connected()
+        self.assertEqual(second.sent, [{"command": "subscribe", "streams": ["ledger", "validations"]}])
+
+
+class TestSubscriber(unittest.TestCase):
+    def test_full_queue_drops_oldest_messages(self):
+        subscriber = Subscriber(max_queue=2, max_dropped=10)
+        for message in ("a", "b", "c"):
+            subscriber.offer(message)
+        self.assertEqual([subscriber.get(0), subscriber.get(0)], ["b", "c"])
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertFalse(subscriber.closed.is_set())
+
+    def test_slow_consumer_is_closed(self):
+        subscriber = Subscriber(max_queue=1, max_dropped=3)
+        for index in range(10):
+            subscriber.offer(str(index))
+        self.assertTrue(subscriber.closed.is_set())
+
+    def test_pump_sends_queued_messages_until_closed(self):
+        subscriber = Subscriber(max_queue=4, max_dropped=10)
+        sent = []
+        sender = threading.Thread(target=subscriber.pump, args=(sent.append,))
+        sender.start()
+        subscriber.offer("a")
+        subscriber.offer("b")
+        wait_for(lambda: sent == ["a", "b"])
+        subscriber.close()
+        sender.join(timeout=1)
+        self.assertFalse(sender.is_alive())
+        subscriber.offer("c")
+        self.assertEqual(sent, ["a", "b"])
+
+    def test_slow_consumer_close_wakes_the_sender(self):
+        subscriber = Subscriber(max_queue=1, max_dropped=1)
+        for index in range(5):
+            subscriber.offer(str(index))
+        subscriber.pump(self.fail)
+        self.assertTrue(subscriber.closed.is_set())
+
+
+class TestClientLimit(unittest.TestCase):
+    def test_admit_rejects_clients_over_the_cap(self):
+        hub = SubscriptionHub(FakeUpstream, max_clients=2)
+        self.assertTrue(hub.admit())
+        self.assertTrue(hub.admit())
+        self.assertFalse(hub.admit())
+        hub.release()
+        self.assertTrue(hub.admit())
+
+
+class TestAffectedAccounts(unittest.TestCase):
+    def test_collects_sender_destination_and_metadata_owners(self):
+        message = {
+            "transaction": {"Account": "rAlice", "Destination": "rBob"},
+            "meta": {"AffectedNodes": [
+                {"CreatedNode": {"LedgerEntryType": "Offer", "NewFields": {"Account": "rCarol"}}},
+                {"DeletedNode": {"LedgerEntryType": "Escrow", "FinalFields": {"Owner": "rDave"}}},
+                {"ModifiedNode": {"LedgerEntryType": "AccountRoot", "PreviousFields": {"Balance": "1"}}},
+            ]},
+        }
+        self.assertEqual(affected_accounts(message), {"rAlice", "rBob", "rCarol", "rDave"})
+
+    def test_malformed_metadata_is_ignored(self):
+        self.assertEqual(affected_accounts({"transaction": "x", "meta": {"AffectedNodes": [1, {"x": 2}]}}), set())
+
+
+class TestParseSubscription(unittest.TestCase):
+    def test_valid_and_invalid_requests(self):
+        self.assertEqual(parse_subscription({"streams": ["ledger"], "accounts": ["rA"]}, 5), (["ledger"], ["rA"]))
+        for command, error in (
+            ({"streams": ["peer_status"]}, "malformedStream"),
+            ({"accounts": [""]}, "actMalformed"),
+            ({"accounts": ["r1", "r2"]}, "invalidParams"),
+        ):
+            with self.assertRaisesRegex(ValueError, error):
+                parse_subscription(command, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()